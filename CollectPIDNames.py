@@ -13,7 +13,9 @@ Created on Wed May 15 11:21:01 2024
 
 
 import os
+import sys
 import ansa
+import getpass
 from datetime import datetime
 
 
@@ -21,72 +23,76 @@ from ansa import base
 from ansa import constants
 from ansa import utils
 
-print("Select save directory for output Excel file.")
-output_filepath = utils.SelectSaveDir(os.getcwd())
-# Export to current working directory
-filename = "Unique_PIDs.xlsx"  # User defined
-
-pids = base.CollectEntities(constants.NASTRAN, None, "PSHELL")
-
-# Clean all PID names in ANSA file be removing all whitespaces in the names of the PIDs
-for pid in pids:
-    base.SetEntityCardValues(constants.NASTRAN, pid, {"Name": pid._name.strip()})
-
-pid_list = []
-
-for pid in pids:
-    pid_list = pid_list + [pid._name.strip()]
-
-unique_pid_list = []
-names_to_check = []
-
-for i in range(len(pid_list)):
-    if ".I." in pid_list[i]:
-        names_to_check = pid_list[i].split(".I.")
-        for name in names_to_check:
-            if name not in unique_pid_list:
-                unique_pid_list.append(name)
+# helper modules are stored next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pid_catalog import build_catalog
+from name_cache import NameCache, pid_fingerprint
+from xlsx_writer import write_xlsx
+
+
+def rename_pid(pid, clean_name):
+    base.SetEntityCardValues(constants.NASTRAN, pid, {"Name": clean_name})
+
+
+def collect_pid_names(output_filepath=None):
+    # writes the unique part list of the PSHELL names to output_filepath/Unique_PIDs.xlsx and returns it
+    # output_filepath is selected by the user if it is not given (the export daemon passes it)
+    if output_filepath is None:
+        print("Select save directory for output Excel file.")
+        output_filepath = utils.SelectSaveDir(os.getcwd())
+    # Export to current working directory
+    filename = "Unique_PIDs.xlsx"  # User defined
+    # reuse the part list of the last run if no PSHELL was added or renamed (name_cache.py)
+    use_name_cache = True
+
+    pids = base.CollectEntities(constants.NASTRAN, None, "PSHELL")
+
+    # Clean all PID names in ANSA file be removing all whitespaces in the names of the PIDs
+    # Only the PIDs whose name changes are renamed, the unique list of parts is built while reading the names
+    unique_pid_list = None
+    if use_name_cache:
+        name_cache = NameCache(output_filepath, base.DataBaseName())
+        unique_pid_list = name_cache.unique_pid_list(pid_fingerprint(pids))
+    if unique_pid_list is None:
+        catalog = build_catalog(pids, rename_pid)
+        unique_pid_list = catalog.unique_pid_list
+        if use_name_cache:
+            # the names after renaming, which is what the next run and OutputPIDtoNastran.py find
+            name_cache.set_unique_pid_list(
+                pid_fingerprint(pids, catalog.pid_names), unique_pid_list
+            )
+            name_cache.save()
     else:
-        if pid_list[i] not in unique_pid_list:
-            unique_pid_list.append(pid_list[i])
-    names_to_check.clear()
-
-xl_object = utils.XlsxCreate()
-# write traceability data into excel sheet
-# script version
-trace_script_version = "28092023"
-# username of script user
-trace_user = os.getlogin()
-# date/time script was run
-now = datetime.now()
-trace_runtime = now.strftime("%d%m%Y, %H:%M:%S")
-# ansa model name
-trace_ansa_db = base.DataBaseName()
-utils.XlsxInsertSheet(xl_object)
-trace_data_header = ["Script Version", "User", "Run Time", "ANSA DB Name"]
-trace_data = [trace_script_version, trace_user, trace_runtime, trace_ansa_db]
-xl_row = 0
-for i in range(len(trace_data_header)):
-    utils.XlsxSetCellValue(
-        xl_object,
-        "Sheet2",
-        xl_row,
-        0,
-        trace_data_header[i],
-    )
-    utils.XlsxSetCellValue(
-        xl_object,
-        "Sheet2",
-        xl_row,
-        1,
-        trace_data[i],
+        print("No PSHELL was added or renamed, the part list of the last run is used.")
+
+    # write traceability data into excel sheet
+    # script version
+    trace_script_version = "28092023"
+    # username of script user
+    trace_user = getpass.getuser()
+    # date/time script was run
+    now = datetime.now()
+    trace_runtime = now.strftime("%d%m%Y, %H:%M:%S")
+    # ansa model name
+    trace_ansa_db = base.DataBaseName()
+    trace_data_header = ["Script Version", "User", "Run Time", "ANSA DB Name"]
+    trace_data = [trace_script_version, trace_user, trace_runtime, trace_ansa_db]
+
+    # write the part list (Sheet1) and the traceability data (Sheet2) in one go
+    write_xlsx(
+        os.path.join(output_filepath, filename),
+        [
+            ("Sheet1", [[name] for name in unique_pid_list]),
+            (
+                "Sheet2",
+                [[trace_data_header[i], trace_data[i]] for i in range(len(trace_data))],
+            ),
+        ],
     )
-    xl_row += 1
 
-for i in range(len(unique_pid_list)):
-    utils.XlsxSetCellValue(xl_object, "Sheet1", i, 0, unique_pid_list[i])
+    print("Done.")
+    return unique_pid_list
 
-utils.XlsxSave(xl_object, os.path.join(output_filepath, filename))
-utils.XlsxClose(xl_object)
 
-print("Done.")
+if __name__ == "__main__":
+    collect_pid_names()
@@ -30,416 +30,1124 @@
 
 import os
 import sys
-import re
-import math
+import shutil
 import time
 import datetime as dt
 from datetime import datetime
 import getpass
+import logging
 
 from ansa import base
 from ansa import constants
 from ansa import utils
 from ansa import mesh
 
+# helper modules are stored next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pid_matching import INTERFACE_SEPARATOR, PidClassifier
+from nastran_deck import (
+    INCLUDE_DIR,
+    split_nastran_deck,
+    inline_includes,
+    validate_deck,
+)
+from parallel_export import read_job
+from export_manifest import ExportManifest, fingerprint
+from summary_writer import (
+    SUMMARY_HEADERS,
+    SummaryRow,
+    SummaryWriter,
+    AnsaXlsxSink,
+    XlsxSink,
+    CsvSink,
+    ShardSummarySink,
+    MemorySummarySink,
+)
+from free_edges import free_edge_index
+from export_log import (
+    LOGGER_NAME,
+    setup_logger,
+    close_logger,
+    ProgressLog,
+    log_file_name,
+)
+from part_schedule import schedule_parts, visibility_delta
+from deck_sinks import FileDeckSink, GzipDeckSink, BundleDeckSink, bundle_file_name
+from phase_timing import PHASE_HEADERS, PhaseTimer, trace_file_name
+from export_pipeline import ExportPipeline
+from export_daemon import serve_jobs, default_socket_path
+from name_cache import NameCache, cache_file_name, classifier_key, pid_fingerprint
+from xlsx_reader import (
+    part_list_file,
+    read_part_list,
+    check_part_names,
+    write_reject_report,
+)
+from export_plan import (
+    plan_file_name,
+    write_plan,
+    read_plan,
+    part_costs,
+    assign_shards,
+    stratified_sample,
+)
 
-def output_pid_to_nastran():
+# name of the PSOLIDs created by mesh.VolumesDetect
+AUTO_VOLUME_NAME = "Auto Detected Volume"
+
+# options used for every base.OutputNastran call
+NASTRAN_OUTPUT_OPTIONS = dict(
+    mode="visible",
+    write_comments="above_key",
+    format="short",
+    continuation_lines="on",
+    enddata="on",
+    disregard_includes="on",
+    second_as_first="on",
+    beginbulk="on",
+    version="msc nastran",
+)
+
+
+def output_pid_to_nastran(
+    output_dir=None,
+    shard_index=0,
+    shard_count=1,
+    shard_summary_file=None,
+    part_names=None,
+    session=None,
+    summary_sink=None,
+):
+    # output_dir is selected by the user if it is not given
+    # the export daemon (serve()) exports part_names instead of the parts of Unique_PIDs.xlsx, keeps the
+    # PSHELLs and their classified names in session (ModelSession) and gets the rows in summary_sink
+    # parallel_export.py runs this function in several sessions: each one exports every shard_count-th
+    # part starting at shard_index and writes its summary rows to shard_summary_file instead of the xlsx
+    # console output: "warning" (warnings only), "info" (progress too) or "debug" (every message). The log
+    # file in output_dir gets every message down to "info"
+    verbosity = "warning"
+    # run without exporting anything, only the matching PIDs are listed
     debug_mode = False
+    # export the whole model once and split it into the part files instead of one export per part
+    single_export = False
+    # skip parts whose PIDs and Nastran file did not change since the last run (see export_manifest.py)
+    use_manifest = True
+    # keep the classification of the PID names in output_dir/pid_name_cache.json.gz (name_cache.py),
+    # only new or renamed PIDs are parsed again
+    use_name_cache = True
+    # count closed volumes on the written Nastran file (volume_analysis.py) instead of mesh.VolumesDetect
+    offline_volume_check = False
+    # summary file format: "ansa" (ANSA xlsx functions), "xlsx" (pure Python) or "csv"
+    summary_format = "ansa"
+    # write the buffered summary rows every n parts so they survive a crash (0: only at the end)
+    summary_flush_rows = 100
+    # add the time of every export phase to the summary and write a Chrome trace file (phase_timing.py)
+    phase_timing = False
+    # delete the "Auto Detected Volume" PSOLIDs once at the end of the run instead of after every part
+    # with volumes, which collects every PSOLID of the model each time
+    defer_volume_pid_cleanup = True
+    # run the free edge check once on the whole model and look up every part (free_edges.py)
+    whole_model_free_edges = False
+    # export parts that share PIDs one after the other and only show/hide the PIDs that differ from the
+    # previous part instead of base.All() + base.Or() for every part (part_schedule.py)
+    visibility_deltas = False
+    # with visibility_deltas, show the part with base.All() + base.Or() again every n parts, so a focus
+    # that drifted from the shown PIDs (e.g. entities shown by another ANSA function) does not last
+    visibility_resync_parts = 50
+    # write every interface PID shared by two parts once to nastran_files/interfaces/<name>.inc and
+    # INCLUDE it from both part decks (uses the split of single_export), inline_interface_includes
+    # copies the includes back into the part decks for solvers that need standalone files
+    interface_includes = False
+    inline_interface_includes = False
+    # what is kept of the part decks (deck_sinks.py): "files" (nastran_files/<part>.nas), "gzip"
+    # (<part>.nas.gz) or "bundle" (one nastran_files.tar with an index of the decks)
+    deck_output = "files"
+    # also write every part as output_dir/mesh_bundles/<part>.npz: GRIDs, elements and PSHELL ids and
+    # names as NumPy arrays (mesh_bundle.py, needs numpy), converted back with mesh_bundle.py to-nas
+    mesh_bundles = False
+    # threads that check, hash and store the written part decks while the next part is exported
+    # (export_pipeline.py), 0 runs this in the export loop. They are only started when the deck is
+    # parsed (offline_volume_check, validate_decks or mesh_bundles), hashing it is cheaper than a
+    # thread switch. validate_decks reads every written deck again and warns about decks without
+    # ENDDATA, with elements whose GRIDs or PSHELLs whose materials are missing
+    post_process_workers = 2
+    validate_decks = False
+    # dry run: only match the PIDs of every part, count their elements and nodes and write
+    # export_plan.json (export_plan.py). The plan weights the time estimate, samples list_fraction and
+    # balances the parts of parallel_export.py workers
+    plan_only = False
+    if interface_includes:
+        single_export = True
+    # settings that change the Nastran files or the summary rows stored in the manifest
+    manifest_options = dict(
+        NASTRAN_OUTPUT_OPTIONS,
+        offline_volume_check=offline_volume_check,
+        interface_includes=interface_includes and not inline_interface_includes,
+    )
+    if mesh_bundles:
+        # parts exported before the bundles were switched on are exported again
+        manifest_options["mesh_bundles"] = True
 
     # User must input an output file path for location to store output file summary xls. This is also the root directory where a folder called 			"nastran_files" will be created to store all the nastran files. This directory must also include the input Excel file ('Unique_PIDs.xlsx') which should contain a unique list of parts that the user wants to export to NASTRAN files. Part names should start in A1.
-    print("Select save directory for output NASTRAN files.")
-    output_dir = utils.SelectSaveDir(os.getcwd())
+    if output_dir is None:
+        print("Select save directory for output NASTRAN files.")
+        output_dir = utils.SelectSaveDir(os.getcwd())
+    log_file = log_file_name(
+        output_dir, shard_index if shard_summary_file is not None else None
+    )
+    log = setup_logger(log_file, verbosity)
     input_xl_file = os.path.join(output_dir, "Unique_PIDs.xlsx")
-    print("Input Excel file: " + input_xl_file)
+    log.info("Input Excel file: " + input_xl_file)
     # Output summary xls file showing how many volumes were identified for each part in the InputXlFile
     output_xl_file = os.path.join(
         output_dir, os.path.basename(input_xl_file).split(".")[0] + "_Summary.xlsx"
     )
-    print("Output Excel summary file: " + output_xl_file)
-    m = utils.Messenger()
-    m.clear()
-    m.echo(False)
-
-    # Check to see if InputXLFile exists and is a file
-    if os.path.isfile(input_xl_file):
-        # Read parts list from Excel worksheet
-        unique_pid_list = []
-
-        xl_wb = utils.XlsxOpen(input_xl_file)
-        m.print("Read Input File:" + input_xl_file)
+    log.info("Output Excel summary file: " + output_xl_file)
+
+    # Check to see if InputXLFile (or Unique_PIDs.csv) exists and is a file
+    input_file = part_list_file(input_xl_file)
+    if part_names is not None:
+        unique_pid_list, rejected_names = check_part_names(part_names)
+        input_file = "(export daemon job)"
+    elif input_file is not None:
+        # Read parts list from the first column of Sheet1, streamed from the file (xlsx_reader.py)
+        unique_pid_list, rejected_names = read_part_list(input_file)
+        log.info("Read Input File:" + input_file)
     else:
-        m.print("Following file could not be found:" + input_xl_file)
+        log.error("Following file could not be found:" + input_xl_file)
+        close_logger(log)
         sys.exit()
+    # names with an empty segment between dots, e.g. from xls files that were modified by the user
+    # by deleting certain parts (for some reason, a " was being found in these modified files)
+    reject_report = os.path.join(output_dir, "Unique_PIDs_Rejected.csv")
+    if part_names is None and (shard_summary_file is None or shard_index == 0):
+        write_reject_report(reject_report, rejected_names)
+    if rejected_names and part_names is not None:
+        # daemon jobs do not write the reject report, the names are listed instead
+        log.warning(
+            "%d part names of the job are invalid and skipped: %s",
+            len(rejected_names),
+            ", ".join(
+                "%s (%s)" % (name, reason) for row, name, reason in rejected_names
+            ),
+        )
+    elif rejected_names:
+        log.warning(
+            "%d part names of %s are invalid and skipped, see %s",
+            len(rejected_names),
+            input_file,
+            reject_report,
+        )
 
     output_filepath = os.path.join(output_dir, "nastran_files")
-    print("NASTRAN files saved to: " + output_filepath)
+    log.info("NASTRAN files saved to: " + output_filepath)
 
     if os.path.isdir(output_filepath) == False:
         os.makedirs(output_filepath)
 
+    # decks are compressed or bundled in a background thread once a part is done
+    if deck_output == "gzip":
+        deck_sink = GzipDeckSink(output_filepath)
+    elif deck_output == "bundle":
+        if shard_summary_file is not None:
+            # merged into nastran_files.tar by parallel_export.py
+            deck_sink = BundleDeckSink(
+                bundle_file_name(output_dir, shard_index),
+                base_bundle_file=bundle_file_name(output_dir),
+            )
+        else:
+            deck_sink = BundleDeckSink(bundle_file_name(output_dir))
+    else:
+        deck_sink = FileDeckSink(output_filepath)
+    mesh_bundle_dir = None
+    if mesh_bundles:
+        from mesh_bundle import MESH_BUNDLE_DIR
+
+        # created by the first write_mesh_bundle()
+        mesh_bundle_dir = os.path.join(output_dir, MESH_BUNDLE_DIR)
+
     # remember start directory to return at end of script
     start_dir = os.getcwd()
     os.chdir(output_filepath)
+    pipeline = None
+    summary = None
+    manifest = None
+    try:
 
-    # read excel sheet to make a list of PIDs
-    i = 0
-    while (utils.XlsxGetCellValue(xl_wb, "Sheet1", i, 0)) != None:
-        part_name = utils.XlsxGetCellValue(xl_wb, "Sheet1", i, 0)
-        print("Splitting " + part_name + "...")
-        split_part_name = []
-        split_part_name = part_name.split(".")
-
-        # this block of code is needed for xls files that were modified by the user by deleting certain parts. For some reason, a " was being found in these modified files.
-        num_true = 0
-        for n in range(len(split_part_name)):
-            if len(split_part_name[n]) != 0:
-                num_true = num_true + 1
-        if num_true == len(split_part_name):
-            unique_pid_list.append(part_name)
-        i = i + 1
-    utils.XlsxClose(xl_wb)
-
-    # write header row of excel sheet
-    xl_summary = utils.XlsxCreate()  # Excel Summary Object
-    xl_headers = [
-        "Part Name",
-        "Number of Volumes Identified",
-        "Number of Volumes Deleted",
-        "Free Edges Detected",
-        "Number of Matching Entities",
-        "Matching Entities",
-    ]
-    xl_col = 0
-    for i in range(len(xl_headers)):
-        utils.XlsxSetCellValue(
-            xl_summary,
-            "Sheet1",
-            0,
-            xl_col,
-            xl_headers[i],
-        )
-        xl_col += 1
-
-    # PIDs to ignore based on naming convention
-    ignore_prefix_list = ["AIR_EXT"]
-    ignore_pid_list = ["INLET", "OUTLET", "AIR_EXT"]
-    ignore_suffix_list = [
-        "_CS",
-        "_VS",
-        "_MI",
-        "_INLET",
-        "_OUTLET",
-        "_Q",
-        "_CR",
-        "_AIR_EXT_",
-    ]
-    # fraction of PID list to go through (for faster testing)
-    list_fraction = 1
-
-    # write traceability data into excel sheet
-    # script version
-    trace_script_version = "07162024"
-    # username of script user
-    trace_user = getpass.getuser()
-    # date/time script was run
-    now = datetime.now()
-    trace_runtime = now.strftime("%d%m%Y, %H:%M:%S")
-    # input/output excel names
-    trace_input_file = input_xl_file
-    # ansa model name
-    trace_ansa_db = base.DataBaseName()
-    utils.XlsxInsertSheet(xl_summary)
-    trace_data_header = [
-        "Script Version",
-        "User",
-        "Run Time",
-        "Input File",
-        "ANSA DB Name",
-    ]
-    trace_data = [
-        trace_script_version,
-        trace_user,
-        trace_runtime,
-        trace_input_file,
-        trace_ansa_db,
-    ]
-    xl_row = 0
-    for i in range(len(trace_data_header)):
-        utils.XlsxSetCellValue(
-            xl_summary,
-            "Sheet2",
-            xl_row,
-            0,
-            trace_data_header[i],
+        # PIDs to ignore based on naming convention
+        ignore_prefix_list = ["AIR_EXT"]
+        ignore_pid_list = ["INLET", "OUTLET", "AIR_EXT"]
+        ignore_suffix_list = [
+            "_CS",
+            "_VS",
+            "_MI",
+            "_INLET",
+            "_OUTLET",
+            "_Q",
+            "_CR",
+            "_AIR_EXT_",
+        ]
+        # fraction of PID list to go through (for faster testing), spread over the list or, with an export
+        # plan, over the part costs
+        list_fraction = 1
+
+        # write traceability data into excel sheet
+        # script version
+        trace_script_version = "07162024"
+        # username of script user
+        trace_user = getpass.getuser()
+        # date/time script was run
+        now = datetime.now()
+        trace_runtime = now.strftime("%d%m%Y, %H:%M:%S")
+        # input/output excel names
+        trace_input_file = input_file
+        # ansa model name
+        trace_ansa_db = base.DataBaseName()
+        trace_data_header = [
+            "Script Version",
+            "User",
+            "Run Time",
+            "Input File",
+            "ANSA DB Name",
+        ]
+        trace_data = [
+            trace_script_version,
+            trace_user,
+            trace_runtime,
+            trace_input_file,
+            trace_ansa_db,
+        ]
+        trace = [[trace_data_header[i], trace_data[i]] for i in range(len(trace_data))]
+
+        # summary rows are buffered and written to the summary file every summary_flush_rows parts
+        if summary_sink is not None:
+            log.info("Summary rows are returned to the export daemon client")
+        elif shard_summary_file is not None:
+            summary_sink = ShardSummarySink(shard_summary_file)
+        elif summary_format == "xlsx":
+            summary_sink = XlsxSink(output_xl_file)
+        elif summary_format == "csv":
+            summary_sink = CsvSink(os.path.splitext(output_xl_file)[0] + ".csv")
+        else:
+            summary_sink = AnsaXlsxSink(output_xl_file)
+        summary_headers = SUMMARY_HEADERS
+        if phase_timing:
+            summary_headers = SUMMARY_HEADERS + PHASE_HEADERS
+        timer = PhaseTimer(thread_id=shard_index, enabled=phase_timing)
+
+        # Cycle thru all PSHELL entities in the model to find surfaces that belong to each part to export
+        # parse every PID name once and index the matching PIDs of every part
+        if session is None:
+            session = ModelSession()
+        with timer.phase("part_index", "(all parts)"):
+            if session.refresh(
+                output_dir,
+                PidClassifier(ignore_suffix_list, ignore_prefix_list, ignore_pid_list),
+                unique_pid_list,
+                use_name_cache,
+            ):
+                log.info(
+                    "%d of %d PID names classified, the others were cached",
+                    session.num_classified,
+                    len(session.all_pids),
+                )
+            else:
+                log.info("No PSHELL or part changed since the last job")
+        all_pids = session.all_pids
+        classifier = session.classifier
+        part_index = session.part_index
+        invalid_pid_names = session.invalid_pid_names
+        for pid_name in invalid_pid_names:
+            log.warning(
+                pid_name
+                + "Name is invalid because it has more than one '.I.' separator"
+            )
+
+        # PSHELL id: (id, name, number of elements, number of nodes)
+        pid_data_cache = {}
+        if plan_only:
+            plan_parts = []
+            for part_to_export in unique_pid_list:
+                if classifier.ignore_reason(part_to_export):
+                    continue
+                pid_data = [
+                    pidData(pid, pid_data_cache) for pid in part_index[part_to_export]
+                ]
+                plan_parts.append(
+                    {
+                        "part": part_to_export,
+                        "pids": len(pid_data),
+                        "elements": sum(data[2] for data in pid_data),
+                        "nodes": sum(data[3] for data in pid_data),
+                    }
+                )
+            plan_file = plan_file_name(output_dir)
+            write_plan(plan_file, trace_ansa_db, plan_parts)
+            log.info(
+                "Export plan of %d parts written to %s", len(plan_parts), plan_file
+            )
+            log.info("Done.")
+            close_logger(log)
+            print("Done. Log file: " + log_file)
+            return
+
+        # PSOLIDs created by mesh.VolumesDetect, found by their id instead of a name check of every PSOLID
+        volume_pids = None
+        if not debug_mode and not offline_volume_check:
+            volume_pids = VolumePidTracker()
+
+        # parts handled by this session: every shard_count-th part of the sample or, with an export plan,
+        # one of shard_count lists of about the same cost, most expensive parts first
+        plan = read_plan(plan_file_name(output_dir))
+        if plan is not None:
+            log.info("Part costs read from " + plan_file_name(output_dir))
+            if plan["database"] != trace_ansa_db:
+                log.warning("The export plan was made for " + str(plan["database"]))
+        # ignored parts are skipped at once, they cost nothing
+        costs = [
+            0 if classifier.ignore_reason(part_name) else cost
+            for part_name, cost in zip(
+                unique_pid_list, part_costs(plan, unique_pid_list)
+            )
+        ]
+        part_numbers = list(range(len(unique_pid_list)))
+        if list_fraction < 1:
+            part_numbers = stratified_sample(
+                [part_num for part_num in part_numbers if costs[part_num]],
+                costs,
+                list_fraction,
+            )
+        if plan is not None and shard_count > 1:
+            part_numbers = assign_shards(part_numbers, costs, shard_count)[shard_index]
+        else:
+            part_numbers = part_numbers[shard_index::shard_count]
+        # parts with a summary row, in list order
+        summary_parts = sorted(
+            part_num
+            for part_num in part_numbers
+            if classifier.ignore_reason(unique_pid_list[part_num]) is None
         )
-        utils.XlsxSetCellValue(
-            xl_summary,
-            "Sheet2",
-            xl_row,
-            1,
-            trace_data[i],
+        part_order = part_numbers
+        row_order = None
+        if visibility_deltas and not debug_mode:
+            part_order = schedule_parts(
+                part_numbers,
+                dict(
+                    (
+                        part_num,
+                        [pid._id for pid in part_index[unique_pid_list[part_num]]],
+                    )
+                    for part_num in summary_parts
+                ),
+            )
+            row_order = summary_parts
+        summary = SummaryWriter(
+            summary_sink, summary_headers, trace, summary_flush_rows, row_order
         )
-        xl_row += 1
-
-    # Cycle thru all PSHELL entities in the model to find surfaces that belong to each part to export
-    all_pids = base.CollectEntities(constants.NASTRAN, None, "PSHELL")
-    excel_row = 1  # row number to start printing data in xls summary file
-
-    start = time.time()
-    for part_num in range(math.floor(len(unique_pid_list) * list_fraction)):
-        # script timing
-        cur_iter = part_num + 1
-        max_iter = math.floor(len(unique_pid_list) * list_fraction)
-        prstime = calcProcessTime(start, cur_iter, max_iter)
-        if cur_iter > 1:  # skip the first PID since time estimate will be absurd
-            print(
-                "time elapsed: %s(s), time left: %s(s), estimated finish time: %s"
-                % prstime
+        # summary rows come back from the pipeline in export order
+        parses_decks = offline_volume_check or validate_decks or mesh_bundles
+        pipeline = ExportPipeline(post_process_workers if parses_decks else 0)
+
+        if use_manifest and not debug_mode:
+            manifest = ExportManifest(
+                output_dir, shard_index if shard_summary_file is not None else None
             )
+        part_fingerprints = {}
 
-        # filter out exported part if PID matches ignore list
-        part_to_export = unique_pid_list[part_num]
-        print(part_to_export)
-        if any(
-            re.search("\w+" + suffix + "+(\d*\w*)*$", part_to_export)
-            for suffix in ignore_suffix_list
-        ):
-            print(part_to_export + " contains an ignored suffix.")
-            continue
-        elif any(
-            re.search("^" + prefix + "\w+", part_to_export)
-            for prefix in ignore_prefix_list
-        ):
-            print(part_to_export + " begins with an ignored prefix.")
-            continue
-        elif part_to_export in ignore_pid_list:
-            print(part_to_export + " is an ignored PID.")
-            continue
-
-        # find any PIDs related to PartToExport that match PartToExport or PartToExport + an identifier (including ignore list)
-        # this list will provide the entities that belong to each part to export
-        matching_entities = []
-        matching_entity_names = []  # list of names for the matching entities
-        print("Finding matches for " + part_to_export + "...")
-        for pid in all_pids:
-            split_pid = []
-            split_pid = pid._name.split(".I.")
-            if (part_to_export in pid._name) and debug_mode:
-                print(pid._name + " may be associated with " + part_to_export)
-            if len(split_pid) > 2:
-                m.print(
-                    pid._name
-                    + "Name is invalid because it has more than one '.I.' separator"
-                )
-            elif len(split_pid) == 1:
-                if split_pid[0] == part_to_export or any(
-                    re.search(
-                        part_to_export + "(_AUX\d*)*" + suffix + "+(\d*\w*)*$",
-                        split_pid[0],
+        # whole model deck of single_export and whole_model_free_edges
+        full_model_file = os.path.join(output_dir, "full_model.nas")
+        if shard_count > 1:
+            full_model_file = os.path.join(
+                output_dir, "full_model_" + str(shard_index) + ".nas"
+            )
+
+        if single_export and not debug_mode:
+            # write all PIDs to one deck and split it into nastran_files/<part>.nas
+            part_pids = {}
+            for part_num in part_numbers:
+                part_to_export = unique_pid_list[part_num]
+                if classifier.ignore_reason(part_to_export) is not None:
+                    continue
+                if manifest is not None:
+                    part_fingerprints[part_to_export] = partFingerprint(
+                        part_index[part_to_export], pid_data_cache, manifest_options
                     )
-                    for suffix in ignore_suffix_list
-                ):
-                    print("Matching " + pid._name + " with " + part_to_export)
-                    matching_entities.append(pid)
+                    # with interface includes every part is split again: which GRIDs go to an include
+                    # depends on the elements of the other parts
+                    if not interface_includes and manifest.summary_row(
+                        part_to_export,
+                        part_fingerprints[part_to_export],
+                        os.path.join(output_filepath, part_to_export + ".nas"),
+                        deck_sink,
+                    ):
+                        continue
+                part_pids[part_to_export] = [
+                    pid._id for pid in part_index[part_to_export]
+                ]
+            log.info("Exporting full model to " + full_model_file + "...")
+            with timer.phase("output_nastran", "(full model)"):
+                base.All()
+                base.OutputNastran(full_model_file, **NASTRAN_OUTPUT_OPTIONS)
+            # interface PIDs that are part of more than one exported part
+            interface_pids = {}
+            if interface_includes:
+                pid_count = {}
+                for pids in part_pids.values():
+                    for pid in set(pids):
+                        pid_count[pid] = pid_count.get(pid, 0) + 1
+                for part_to_export in part_pids:
+                    for pid in part_index[part_to_export]:
+                        if pid_count[pid._id] > 1 and INTERFACE_SEPARATOR in pid._name:
+                            interface_pids[pid._id] = pid._name
+            log.info(
+                "Splitting full model into " + str(len(part_pids)) + " part files..."
+            )
+            with timer.phase("split_deck", "(full model)"):
+                part_files = split_nastran_deck(
+                    full_model_file,
+                    part_pids,
+                    output_filepath,
+                    interface_includes=interface_pids,
+                    log=log,
+                )
+                if interface_pids and inline_interface_includes:
+                    for part_file in part_files.values():
+                        inline_includes(part_file)
+                    shutil.rmtree(os.path.join(output_filepath, INCLUDE_DIR))
+
+        free_edges = None
+        if whole_model_free_edges and not debug_mode:
+            if not single_export:
+                log.info("Exporting full model to " + full_model_file + "...")
+                with timer.phase("output_nastran", "(full model)"):
+                    base.All()
+                    base.OutputNastran(full_model_file, **NASTRAN_OUTPUT_OPTIONS)
+            log.info("Checking free edges of the whole model...")
+            with timer.phase("single_bounds", "(full model)"):
+                free_edges = wholeModelFreeEdges(full_model_file)
+
+        # at most one progress line every 5 seconds
+        progress = ProgressLog(log, 5.0)
+        start = time.time()
+        # {id: PSHELL} shown for the previous part with visibility_deltas
+        visible_pids = None
+        delta_parts = 0  # parts shown by a visibility delta since the last base.All()
+        # the time left is estimated from the cost of the parts that were exported and the parts left,
+        # parts skipped by the manifest take no time and are taken out of the total
+        total_cost = sum(costs[part_num] for part_num in summary_parts)
+        done_cost = 0
+        for iter_num, part_num in enumerate(part_order):
+            # script timing
+            cur_iter = iter_num + 1
+            max_iter = len(part_numbers)
+            if done_cost:  # skip the first PID since time estimate will be absurd
+                prstime = calcProcessTime(start, done_cost, total_cost)
+                progress(
+                    "time elapsed: %s(s), time left: %s(s), estimated finish time: %s (%d/%d)",
+                    *(prstime + (cur_iter, max_iter))
+                )
+
+            # filter out exported part if PID matches ignore list
+            part_to_export = unique_pid_list[part_num]
+            log.debug(part_to_export)
+            timer.start_part(part_to_export)
+            ignore_reason = classifier.ignore_reason(part_to_export)
+            if ignore_reason:
+                log.debug(ignore_reason)
+                continue
+
+            # find any PIDs related to PartToExport that match PartToExport or PartToExport + an identifier (including ignore list)
+            # this list will provide the entities that belong to each part to export
+            log.debug("Finding matches for " + part_to_export + "...")
+            with timer.phase("matching"):
+                if debug_mode:
+                    for pid in all_pids:
+                        if part_to_export in pid._name:
+                            log.info(
+                                pid._name + " may be associated with " + part_to_export
+                            )
+                matching_entities = list(part_index[part_to_export])
+                matching_entity_names = []  # list of names for the matching entities
+                for pid in matching_entities:
+                    log.debug("Matching " + pid._name + " with " + part_to_export)
                     matching_entity_names.append(pid._name)
-            elif len(split_pid) == 2:
-                # if either element of PIDsplit contains the PartToExport or PartToExport + IgnoreSuffix, add to MatchingEntities
-                if split_pid[0] == part_to_export or any(
-                    re.search(
-                        part_to_export + "(_AUX\d*)*" + suffix + "+(\d*\w*)*$",
-                        split_pid[0],
+
+            # skip the export if the manifest has this part with the same PIDs and an unchanged file
+            part_filename = os.path.join(output_filepath, part_to_export + ".nas")
+            if manifest is not None:
+                if part_to_export not in part_fingerprints:
+                    part_fingerprints[part_to_export] = partFingerprint(
+                        matching_entities, pid_data_cache, manifest_options
                     )
-                    for suffix in ignore_suffix_list
-                ):
-                    print("Matching " + pid._name + " with " + part_to_export)
-                    matching_entities.append(pid)
-                    matching_entity_names.append(pid._name)
-                if split_pid[1] == part_to_export or any(
-                    re.search(
-                        part_to_export + "(_AUX\d*)*" + suffix + "+(\d*\w*)*$",
-                        split_pid[1],
+                summary_row = manifest.summary_row(
+                    part_to_export,
+                    part_fingerprints[part_to_export],
+                    part_filename,
+                    deck_sink,
+                )
+                if summary_row is not None:
+                    log.info(part_to_export + " is up to date, export skipped.")
+                    total_cost -= costs[part_num]
+                    pipeline.add(
+                        part_num,
+                        summaryCells(summary_row, partTimes(timer, phase_timing)),
                     )
-                    for suffix in ignore_suffix_list
-                ):
-                    print("Matching " + pid._name + " with " + part_to_export)
-                    matching_entities.append(pid)
-                    matching_entity_names.append(pid._name)
+                    continue
+            done_cost += costs[part_num]
 
-        # Determine the id for each PID in the list of entities that belong to each part to export
-        id_to_export = []
-        for i in range(len(matching_entities)):
-            id = matching_entities[i]._id
-            id_to_export.append(id)
-        # writes name to column 1
-        utils.XlsxSetCellValue(xl_summary, "Sheet1", excel_row, 0, part_to_export)
-
-        # export part and related PIDs to nastran file
-        print(
-            "Exporting "
-            + part_to_export
-            + "... ("
-            + str(part_num + 1)
-            + "/"
-            + str(len(unique_pid_list))
-            + ")"
-        )
-        if matching_entities == None:
-            m.print("There are no matching surfaces")
-        else:
-            if debug_mode:
-                m.print("Running in debug mode for :" + str(part_to_export))
-                # Writes 0 for number of volumes identified in column 2
-                utils.XlsxSetCellValue(xl_summary, "Sheet1", excel_row, 1, str(0))
-                # Writes number of volumes deleted in column 3
-                utils.XlsxSetCellValue(xl_summary, "Sheet1", excel_row, 2, str(0))
-                utils.XlsxSetCellValue(
-                    xl_summary, "Sheet1", excel_row, 3, "N/A"
-                )  # Writes number of free edges in column 4
-                utils.XlsxSetCellValue(
-                    xl_summary, "Sheet1", excel_row, 4, str(len(matching_entity_names))
-                )  # Writes number of matching entities in column 5
-                utils.XlsxSetCellValue(
-                    xl_summary, "Sheet1", excel_row, 5, str(matching_entity_names)
-                )  # Writes matching entities in column 6
+            # Determine the id for each PID in the list of entities that belong to each part to export
+            id_to_export = []
+            for i in range(len(matching_entities)):
+                id = matching_entities[i]._id
+                id_to_export.append(id)
+            # writes name to column 1
+            summary_row = [part_to_export, None, None, None, None, None]
+            post_process = False
+
+            # export part and related PIDs to nastran file
+            log.info(
+                "Exporting "
+                + part_to_export
+                + "... ("
+                + str(part_num + 1)
+                + "/"
+                + str(len(unique_pid_list))
+                + ")"
+            )
+            if matching_entities == None:
+                log.warning("There are no matching surfaces")
             else:
-                base.All()
-                base.Or(matching_entities, constants.NASTRAN, "PSHELL")
+                if debug_mode:
+                    log.info("Running in debug mode for :" + str(part_to_export))
+                    # Writes 0 for number of volumes identified in column 2
+                    summary_row[1] = str(0)
+                    # Writes number of volumes deleted in column 3
+                    summary_row[2] = str(0)
+                    summary_row[3] = "N/A"  # Writes number of free edges in column 4
+                    # Writes number of matching entities in column 5
+                    summary_row[4] = str(len(matching_entity_names))
+                    # Writes matching entities in column 6
+                    summary_row[5] = str(matching_entity_names)
+                else:
+                    with timer.phase("visibility"):
+                        # ANSA focus: the first base.Or() after base.All() shows only its entities,
+                        # further base.Or()/base.Not() calls add to / take from the shown entities
+                        # (the _new_focus rule of benchmarks/fake_ansa/ansa/base.py). The deltas rely
+                        # on the previous part still being shown and no base.All() since then
+                        if (
+                            visibility_deltas
+                            and visible_pids is not None
+                            and delta_parts < visibility_resync_parts
+                        ):
+                            show, hide = visibility_delta(
+                                visible_pids, matching_entities
+                            )
+                            if show:
+                                base.Or(show, constants.NASTRAN, "PSHELL")
+                            if hide:
+                                base.Not(hide, constants.NASTRAN, "PSHELL")
+                            delta_parts += 1
+                        else:
+                            base.All()
+                            base.Or(matching_entities, constants.NASTRAN, "PSHELL")
+                            delta_parts = 0
+                        visible_pids = dict((pid._id, pid) for pid in matching_entities)
+
+                        # Orient Surface Normals
+                        base.Orient
+
+                    # Now export parts and/or surfaces to Nastran File (Exporting of unclosed volumes is necessary for coolant inlet/outlets)
+                    # PartFileName = OutputFilePath + '\\' + PartToExport + '.nas'
+
+                    if not single_export:
+                        with timer.phase("output_nastran"):
+                            base.OutputNastran(part_filename, **NASTRAN_OUTPUT_OPTIONS)
+
+                    # Check to see if the selected entities form a closed volume
+                    num_volumes = 0  # of volumes identified
+                    with timer.phase("volumes_detect"):
+                        if offline_volume_check:
+                            # watertight shells of the written file are counted by postProcessPart, no
+                            # volumes are created in the database
+                            volumes = None
+                        else:
+                            volumes = mesh.VolumesDetect(
+                                1,
+                                return_volumes=True,
+                                include_facets=False,
+                                whole_db=False,
+                            )
+
+                    # Check number of free edges found and report
+                    with timer.phase("single_bounds"):
+                        if free_edges is not None:
+                            # edges used by one element of the part's PIDs, from the whole model check
+                            error_entities = free_edges.part_has_free_edges(
+                                id_to_export
+                            )
+                        else:
+                            base.F11ShellsOptionsSet(
+                                "growth ratio", True, "OPEN-FOAM", 1.2
+                            )
+                            # Setting up quality parameter
+                            obj = base.checks.mesh.SingleBounds()
+                            check_reports = obj.execute(
+                                exec_mode=base.Check.EXEC_ON_VIS,
+                                report=base.Check.REPORT_NONE,
+                            )
+                            error_entities = None
+                            for check_report in check_reports:
+                                for issue in check_report.issues:
+                                    error_entities = issue.entities
+                    if error_entities:
+                        log.info("Free edges detected for part " + str(part_to_export))
+                        free_edges_detected = True
+                    else:
+                        free_edges_detected = False
 
-                # Orient Surface Normals
-                base.Orient
+                    # output summary to excel file, row by row
+                    if volumes == None:
+                        if not offline_volume_check:
+                            log.info(
+                                "No closed volumes identified for :"
+                                + str(part_to_export)
+                            )
+                        # Writes number of volumes identified in column 2 (0 unless checked offline)
+                        summary_row[1] = str(num_volumes)
+                        # Writes number of volumes deleted in column 3
+                        summary_row[2] = str(0)
+                        # Writes number of free edges in column 4
+                        summary_row[3] = str(free_edges_detected)
+                        # Writes number of matching entities in column 5
+                        summary_row[4] = str(len(matching_entity_names))
+                        # Writes matching entities in column 6
+                        summary_row[5] = str(matching_entity_names)
+                    else:
+                        num_volumes = len(volumes)
+                        log.info(
+                            str(num_volumes)
+                            + " closed volumes identified for:"
+                            + str(part_to_export)
+                        )
+                        # Writes number of volumes identified in column 2
+                        summary_row[1] = str(num_volumes)
+                        # Writes number of free edges in column 4
+                        summary_row[3] = str(free_edges_detected)
+                        # Writes number of matching entities in column 5
+                        summary_row[4] = str(len(matching_entity_names))
+                        # Writes matching entities in column 6
+                        summary_row[5] = str(matching_entity_names)
 
-                # Now export parts and/or surfaces to Nastran File (Exporting of unclosed volumes is necessary for coolant inlet/outlets)
-                # PartFileName = OutputFilePath + '\\' + PartToExport + '.nas'
+                        # Now Delete Volumes
+                        num_volumes_deleted = 0
+                        with timer.phase("volumes_delete"):
+                            for vol in volumes:
+                                # returns 1 if volume is deleted, otherwise returns 0
+                                volsDeleted = mesh.VolumesDelete(vol)
+                                num_volumes_deleted = num_volumes_deleted + volsDeleted
+                                volsDeleted = 0
+                        log.info(
+                            str(num_volumes_deleted) + " volumes have been deleted"
+                        )
+                        # Writes number of volumes deleted in column 3
+                        summary_row[2] = str(num_volumes_deleted)
 
-                part_filename = os.path.join(output_filepath, part_to_export + ".nas")
-                base.OutputNastran(
+                        # Now delete add PIDs
+                        volume_pids.add(num_volumes)
+                        if num_volumes and not defer_volume_pid_cleanup:
+                            with timer.phase("delete_volume_pids"):
+                                deleteVolumePIDs(volume_pids, log)
+
+                    post_process = True
+
+            part_times = partTimes(timer, phase_timing)
+            if post_process:
+                pipeline.submit(
+                    part_num,
+                    postProcessPart,
+                    part_to_export,
                     part_filename,
-                    mode="visible",
-                    write_comments="above_key",
-                    format="short",
-                    continuation_lines="on",
-                    enddata="on",
-                    disregard_includes="on",
-                    second_as_first="on",
-                    beginbulk="on",
-                    version="msc nastran",
+                    summary_row,
+                    part_times,
+                    offline_volume_check,
+                    validate_decks,
+                    mesh_bundle_dir,
+                    manifest,
+                    part_fingerprints.get(part_to_export),
+                    deck_sink,
+                    log,
                 )
+            else:
+                pipeline.add(part_num, summaryCells(summary_row, part_times))
+            for row_index, cells in pipeline.completed():
+                summary.add(row_index, cells)
 
-                # Check to see if the selected entities form a closed volume
-                num_volumes = 0  # of volumes identified
-                volumes = mesh.VolumesDetect(
-                    1, return_volumes=True, include_facets=False, whole_db=False
+        for row_index, cells in pipeline.close():
+            summary.add(row_index, cells)
+        if volume_pids is not None and (
+            volume_pids.num_volumes_detected or volume_pids.num_leftover
+        ):
+            with timer.phase("delete_volume_pids", "(all parts)"):
+                deleteVolumePIDs(volume_pids, log)
+        if phase_timing:
+            timer.end_part()
+            for line in timer.report():
+                log.info(line)
+            log.info("Slowest parts:")
+            for total, part in timer.slowest_parts():
+                log.info("%10.2f s  %s" % (total, part))
+            trace_file = trace_file_name(
+                output_dir, shard_index if shard_summary_file is not None else None
+            )
+            timer.write_trace(trace_file)
+            log.info("Phase timing trace written to " + trace_file)
+        # the INCLUDE lines of the decks name the .inc files, so they are only stored with the decks of
+        # a bundle. With gzip they stay uncompressed next to the .nas.gz files
+        include_dir = os.path.join(output_filepath, INCLUDE_DIR)
+        if deck_output == "bundle" and os.path.isdir(include_dir):
+            for include in sorted(os.listdir(include_dir)):
+                deck_sink.add(
+                    INCLUDE_DIR + "/" + include, os.path.join(include_dir, include)
                 )
+    finally:
+        # also when a part failed: back to the start directory, the post-processing is stopped and the
+        # decks and summary rows that are done are kept
+        os.chdir(start_dir)
+        if pipeline is not None:
+            pipeline.cancel()
+        deck_sink.close()
+        if manifest is not None:
+            manifest.close()
+        if summary is not None:
+            summary.close()
+    if manifest is not None and shard_summary_file is None:
+        manifest.compact()
+    # print('Nastran files output directory: ' + OutputFilePath)
+    # print('Excel summary file location: ' + OutputXlFile)
+    log.info("Done.")
+    close_logger(log)
+    # the only line printed to the console when there were no warnings
+    print("Done. Log file: " + log_file)
+    return
+
+
+def partTimes(timer, phase_timing):
+    # phase times of the current part if they are written to the summary, taken in the export loop
+    return timer.part_times() if phase_timing else []
+
+
+def summaryCells(summary_row, part_times):
+    # summary row of a part, followed by its phase times
+    return list(SummaryRow(*summary_row)) + list(part_times)
+
+
+def postProcessPart(
+    part_to_export,
+    part_filename,
+    summary_row,
+    part_times,
+    offline_volume_check,
+    validate_decks,
+    mesh_bundle_dir,
+    manifest,
+    part_fingerprint,
+    deck_sink,
+    log,
+):
+    # work on the written deck of a part that needs no ANSA calls, runs in an export_pipeline.py worker
+    # returns the summary cells of the part
+    if offline_volume_check:
+        from volume_analysis import analyse_shell_volumes
+
+        # watertight shells of the written file, replaces VolumesDetect
+        num_volumes = analyse_shell_volumes(part_filename).num_closed
+        if num_volumes:
+            log.info(
+                str(num_volumes)
+                + " closed shells found in the Nastran file of:"
+                + str(part_to_export)
+            )
+        else:
+            log.info("No closed volumes identified for :" + str(part_to_export))
+        summary_row[1] = str(num_volumes)
+    if validate_decks:
+        for problem in validate_deck(part_filename):
+            log.warning("Nastran file of " + part_to_export + ": " + problem)
+    if mesh_bundle_dir is not None:
+        from mesh_bundle import write_mesh_bundle
+
+        # before the deck sink, which may remove the .nas file
+        write_mesh_bundle(
+            part_filename, os.path.join(mesh_bundle_dir, part_to_export + ".npz")
+        )
+    if manifest is not None:
+        manifest.record(part_to_export, part_fingerprint, part_filename, summary_row)
+    deck_sink.add(part_to_export + ".nas", part_filename)
+    return summaryCells(summary_row, part_times)
+
 
-                # Check number of free edges found and report
-                base.F11ShellsOptionsSet("growth ratio", True, "OPEN-FOAM", 1.2)
-                # Setting up quality parameter
-                obj = base.checks.mesh.SingleBounds()
-                check_reports = obj.execute(
-                    exec_mode=base.Check.EXEC_ON_VIS, report=base.Check.REPORT_NONE
+class ModelSession:
+    # PSHELLs of the database, their classified names and the part index, kept between the jobs of the
+    # export daemon. refresh() collects the PSHELLs again, only new or renamed PSHELLs are classified and
+    # the part index is only rebuilt if a PSHELL, the ignore lists or the part list changed
+    def __init__(self):
+        self.classifier = None
+        self.all_pids = None
+        self.part_index = None
+        self.invalid_pid_names = []
+        self.num_classified = 0  # names classified by the last refresh()
+        self.num_jobs = 0
+        self._names = {}  # PSHELL name: PidName of self.classifier
+        self._name_cache = None
+        self._state = None  # what part_index was built from
+
+    def refresh(self, output_dir, classifier, part_names, use_name_cache):
+        # classifier replaces the one of the last refresh if its ignore lists are different
+        # returns False if nothing changed since the last refresh
+        key = classifier_key(classifier)
+        if self.classifier is None or classifier_key(self.classifier) != key:
+            self.classifier = classifier
+            self._names = {}
+        db_name = base.DataBaseName()
+        all_pids = base.CollectEntities(constants.NASTRAN, None, "PSHELL")
+        fingerprint = pid_fingerprint(all_pids)
+        state = (
+            db_name,
+            fingerprint,
+            key,
+            list(part_names),
+            use_name_cache and cache_file_name(output_dir),
+        )
+        self.num_classified = 0
+        if state == self._state:
+            return False
+        cached_index = None
+        if use_name_cache:
+            if (
+                self._name_cache is None
+                or self._name_cache.cache_file != cache_file_name(output_dir)
+                or self._name_cache.db_name != db_name
+            ):
+                self._name_cache = NameCache(output_dir, db_name)
+            cached_index = self._name_cache.part_index(
+                self.classifier, fingerprint, part_names
+            )
+        if cached_index is not None:
+            # no PSHELL and no part changed since the index was saved, no name is parsed
+            pid_by_id = dict((pid._id, pid) for pid in all_pids)
+            matches, self.invalid_pid_names = cached_index
+            self.part_index = dict(
+                (part, [pid_by_id[pid_id] for pid_id in pid_ids])
+                for part, pid_ids in matches.items()
+            )
+        else:
+            if use_name_cache:
+                pid_names = self._name_cache.classify(self.classifier, all_pids)
+                self.num_classified = self._name_cache.num_classified
+            else:
+                pid_names = []
+                for pid in all_pids:
+                    if pid._name not in self._names:
+                        self._names[pid._name] = self.classifier.classify(pid._name)
+                        self.num_classified += 1
+                    pid_names.append(self._names[pid._name])
+            self.part_index, self.invalid_pid_names = self.classifier.build_part_index(
+                all_pids, part_names, pid_names
+            )
+        if use_name_cache:
+            if cached_index is None:
+                self._name_cache.set_part_index(
+                    self.classifier,
+                    fingerprint,
+                    part_names,
+                    self.part_index,
+                    self.invalid_pid_names,
                 )
-                error_entities = None
-                for check_report in check_reports:
-                    for issue in check_report.issues:
-                        error_entities = issue.entities
-                if error_entities:
-                    print("Free edges detected for part " + str(part_to_export))
-                    free_edges_detected = True
-                else:
-                    free_edges_detected = False
+            # the ignore reasons of every part are saved with the cache, the export loop reads them
+            self.classifier.precompute_ignore_reasons(part_names)
+            self._name_cache.save()
+        self.all_pids = all_pids
+        self._state = state
+        return True
 
-                # output summary to excel file, row by row
-                if volumes == None:
-                    m.print("No closed volumes identified for :" + str(part_to_export))
-                    # Writes 0 for number of volumes identified in column 2
-                    utils.XlsxSetCellValue(xl_summary, "Sheet1", excel_row, 1, str(0))
-                    # Writes number of volumes deleted in column 3
-                    utils.XlsxSetCellValue(xl_summary, "Sheet1", excel_row, 2, str(0))
-                    utils.XlsxSetCellValue(
-                        xl_summary, "Sheet1", excel_row, 3, str(free_edges_detected)
-                    )  # Writes number of free edges in column 4
-                    utils.XlsxSetCellValue(
-                        xl_summary,
-                        "Sheet1",
-                        excel_row,
-                        4,
-                        str(len(matching_entity_names)),
-                    )  # Writes number of matching entities in column 5
-                    utils.XlsxSetCellValue(
-                        xl_summary, "Sheet1", excel_row, 5, str(matching_entity_names)
-                    )  # Writes matching entities in column 6
-                else:
-                    num_volumes = len(volumes)
-                    m.print(
-                        str(num_volumes)
-                        + " closed volumes identified for:"
-                        + str(part_to_export)
-                    )
-                    utils.XlsxSetCellValue(
-                        xl_summary, "Sheet1", excel_row, 1, str(num_volumes)
-                    )  # Writes number of volumes identified in column 2
-                    utils.XlsxSetCellValue(
-                        xl_summary, "Sheet1", excel_row, 3, str(free_edges_detected)
-                    )  # Writes number of free edges in column 4
-                    utils.XlsxSetCellValue(
-                        xl_summary,
-                        "Sheet1",
-                        excel_row,
-                        4,
-                        str(len(matching_entity_names)),
-                    )  # Writes number of matching entities in column 5
-                    utils.XlsxSetCellValue(
-                        xl_summary, "Sheet1", excel_row, 5, str(matching_entity_names)
-                    )  # Writes matching entities in column 6
-
-                    # Now Delete Volumes
-                    num_volumes_deleted = 0
-                    for vol in volumes:
-                        # returns 1 if volume is deleted, otherwise returns 0
-                        volsDeleted = mesh.VolumesDelete(vol)
-                        num_volumes_deleted = num_volumes_deleted + volsDeleted
-                        volsDeleted = 0
-                    m.print(str(num_volumes_deleted) + " volumes have been deleted")
-                    utils.XlsxSetCellValue(
-                        xl_summary, "Sheet1", excel_row, 2, str(num_volumes_deleted)
-                    )  # Writes number of volumes deleted in column 3
-
-                    # Now delete add PIDs
-                    deleteVolumePIDs()
-        excel_row = excel_row + 1
-
-    utils.XlsxSave(xl_summary, output_xl_file)
-    utils.XlsxClose(xl_summary)
-    # print('Nastran files output directory: ' + OutputFilePath)
-    # print('Excel summary file location: ' + OutputXlFile)
+    def open(self, database):
+        # the PSHELLs of the new database are collected and indexed by the next refresh
+        base.Open(database)
+        self._state = None
 
-    # change back to starting directory
-    os.chdir(start_dir)
-    print("Done.")
-    return
+    def reload_name_cache(self):
+        # the name cache file was written by CollectPIDNames.py, it is read again by the next refresh
+        self._name_cache = None
+
+
+def pidData(pid, pid_data_cache):
+    # id, name, number of elements and number of nodes of a PSHELL
+    if pid._id not in pid_data_cache:
+        elements = base.CollectEntities(
+            constants.NASTRAN, pid, "__ELEMENTS__", recursive=True
+        )
+        nodes = base.CollectEntities(constants.NASTRAN, elements, "GRID")
+        pid_data_cache[pid._id] = (pid._id, pid._name, len(elements), len(nodes))
+    return pid_data_cache[pid._id]
+
+
+def partFingerprint(matching_entities, pid_data_cache, options):
+    # fingerprint of the PIDs of a part for the export manifest: id, name, number of elements and nodes
+    pid_data = [pidData(pid, pid_data_cache) for pid in matching_entities]
+    return fingerprint(pid_data, options)
 
 
-def deleteVolumePIDs():
+def wholeModelFreeEdges(deck_file):
+    # one SingleBounds check on the whole database, the issue entities are mapped to their PSHELL ids
+    # edges that are only free for a subset of the PIDs come from the edges of the whole model deck
+    base.All()
+    base.F11ShellsOptionsSet("growth ratio", True, "OPEN-FOAM", 1.2)
+    obj = base.checks.mesh.SingleBounds()
+    check_reports = obj.execute(
+        exec_mode=base.Check.EXEC_ON_ALL, report=base.Check.REPORT_NONE
+    )
+    free_pids = set()
+    for check_report in check_reports:
+        for issue in check_report.issues:
+            for entity in issue.entities:
+                pid = base.GetEntityCardValues(constants.NASTRAN, entity, ("PID",))
+                if pid["PID"] is not None:
+                    free_pids.add(pid["PID"])
+    return free_edge_index(deck_file, free_pids)
+
+
+class VolumePidTracker:
     # When Auto Detect Volumes is run and volumes are found, PIDs are created named "Auto Detected Volume"
-    # This function searches for all PIDs with this name and deletes them
-    all_volume_pids = base.CollectEntities(constants.NASTRAN, None, "PSOLID")
-    for pid in all_volume_pids:
-        if pid._name == "Auto Detected Volume":
-            base.DeleteEntity(pid)
-    return
+    # The ids of all other PSOLIDs are collected once, the new PSOLIDs are the ones not in this set
+    def __init__(self):
+        self.known_ids = set()
+        # volumes detected since the PSOLIDs were last deleted, each one created a PSOLID (also when
+        # VolumesDelete did not delete it)
+        self.num_volumes_detected = 0
+        # "Auto Detected Volume" PSOLIDs left by an earlier run are deleted with the first batch
+        self.num_leftover = 0
+        for pid in base.CollectEntities(constants.NASTRAN, None, "PSOLID"):
+            if pid._name == AUTO_VOLUME_NAME:
+                self.num_leftover += 1
+            else:
+                self.known_ids.add(pid._id)
+
+    def add(self, num_volumes_detected):
+        self.num_volumes_detected += num_volumes_detected
+
+    def new_volume_pids(self):
+        new_pids = []
+        for pid in base.CollectEntities(constants.NASTRAN, None, "PSOLID"):
+            if pid._id in self.known_ids:
+                continue
+            if pid._name == AUTO_VOLUME_NAME:
+                new_pids.append(pid)
+            else:
+                self.known_ids.add(pid._id)
+        return new_pids
 
 
-def calcProcessTime(starttime, cur_iter, max_iter):
+def deleteVolumePIDs(volume_pids, log):
+    # deletes the PSOLIDs created by mesh.VolumesDetect since the last call, with one DeleteEntity call
+    # and checks that there was one PSOLID for every detected volume
+    new_pids = volume_pids.new_volume_pids()
+    if new_pids:
+        base.DeleteEntity(new_pids)
+    expected = volume_pids.num_volumes_detected + volume_pids.num_leftover
+    if len(new_pids) != expected:
+        log.warning(
+            str(len(new_pids))
+            + " '"
+            + AUTO_VOLUME_NAME
+            + "' PSOLIDs deleted for "
+            + str(volume_pids.num_volumes_detected)
+            + " detected volumes and "
+            + str(volume_pids.num_leftover)
+            + " left by an earlier run"
+        )
+    volume_pids.num_volumes_detected = 0
+    volume_pids.num_leftover = 0
+    return len(new_pids)
+
+
+def calcProcessTime(starttime, cost_done, cost_total):
+    # cost_done: cost of the parts that are done, cost_total: cost of all parts (export_plan.py)
     time_elapsed = time.time() - starttime
-    time_estimated = (time_elapsed / cur_iter) * (max_iter)
+    time_estimated = (time_elapsed / cost_done) * (cost_total)
     time_finish = starttime + time_estimated
     time_finish = dt.datetime.fromtimestamp(time_finish).strftime("%H:%M:%S")  # in time
     time_remaining = time_estimated - time_elapsed  # in seconds
     return (int(time_elapsed), int(time_remaining), time_finish)
 
 
+def serve(socket_path=None):
+    # export daemon (export_daemon.py): runs the jobs sent to socket_path in this session, the
+    # database stays open and the PSHELL names are only classified again if they changed
+    session = ModelSession()
+    handlers = {
+        "export": lambda job: exportJob(session, job),
+        "collect_names": lambda job: collectNamesJob(session, job),
+        "open": lambda job: openJob(session, job),
+        "status": lambda job: {
+            "database": base.DataBaseName(),
+            "pids": len(session.all_pids or ()),
+            "jobs": session.num_jobs,
+        },
+    }
+    serve_jobs(socket_path or default_socket_path(), handlers)
+
+
+def exportJob(session, job):
+    # exports the parts of the job, returns the summary rows in list order
+    summary_sink = MemorySummarySink()
+    session.num_jobs += 1
+    try:
+        output_pid_to_nastran(
+            job["output_dir"],
+            part_names=job.get("parts"),
+            session=session,
+            summary_sink=summary_sink,
+        )
+    finally:
+        # write the buffered log records if the export failed
+        close_logger(logging.getLogger(LOGGER_NAME))
+    return {
+        "headers": summary_sink.headers,
+        "rows": [row for index, row in sorted(summary_sink.rows)],
+        "classified": session.num_classified,
+    }
+
+
+def collectNamesJob(session, job):
+    # CollectPIDNames.py renames PSHELLs, the next export job classifies the renamed ones
+    from CollectPIDNames import collect_pid_names
+
+    unique_pid_list = collect_pid_names(job["output_dir"])
+    session.reload_name_cache()
+    return {"parts": len(unique_pid_list)}
+
+
+def openJob(session, job):
+    session.open(job["database"])
+    return {"database": base.DataBaseName()}
+
+
 def main():
-    output_pid_to_nastran()
+    # started by parallel_export.py: export the shard given in the job file
+    job = read_job()
+    try:
+        if job is not None:
+            output_pid_to_nastran(
+                job["output_dir"],
+                job["shard_index"],
+                job["shard_count"],
+                job["summary_file"],
+            )
+        else:
+            output_pid_to_nastran()
+    finally:
+        # write the buffered log records if the export failed
+        close_logger(logging.getLogger(LOGGER_NAME))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Stand-in for the ANSA scripting package, used to run the scripts outside of ANSA.
+
+Only the functions used by the scripts are implemented. The model is read from the JSON file given in
+the FAKE_ANSA_MODEL environment variable (see benchmarks/synthetic_names.py), or given to base.Open.
+utils.SelectSaveDir returns FAKE_ANSA_SAVE_DIR.
+"""
+
+from ansa import constants
+from ansa import base
+from ansa import utils
+from ansa import mesh
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Model of the stand-in ansa package: PSHELLs with a small strip of CQUAD4 elements each.
+
+Model file (JSON):
+    db_name: database name returned by base.DataBaseName()
+    pshells: list of [id, name]
+    elements_per_pid: number of CQUAD4 elements per PSHELL
+The mesh of PSHELL n uses grid ids n * 1000 + i and element ids n * 1000 + i, so it is the same every
+time the model is loaded.
+"""
+
+import os
+import json
+
+
+class Entity:
+    def __init__(self, ansa_type, id, name=None, **values):
+        self.ansa_type = ansa_type
+        self._id = id
+        self._name = name
+        self.values = values
+
+    def __repr__(self):
+        return "<%s %d %s>" % (self.ansa_type, self._id, self._name)
+
+
+class Model:
+    def __init__(self, model_file):
+        with open(model_file, "r") as f:
+            data = json.load(f)
+        self.db_name = data.get("db_name", os.path.basename(model_file))
+        self.elements_per_pid = data.get("elements_per_pid", 2)
+        self.pshells = [Entity("PSHELL", id, name) for id, name in data["pshells"]]
+        self.psolids = []
+        self.visible = set(pshell._id for pshell in self.pshells)
+        self._pshell_by_id = dict((pshell._id, pshell) for pshell in self.pshells)
+        self._elements = {}
+
+    def pshell(self, id):
+        return self._pshell_by_id[id]
+
+    def elements(self, pid):
+        # CQUAD4 strip of the PSHELL, each element is [id, pid, g1, g2, g3, g4]
+        if pid not in self._elements:
+            first = pid * 1000
+            self._elements[pid] = [
+                Entity(
+                    "CQUAD4",
+                    first + i,
+                    pid=pid,
+                    grids=(
+                        first + 2 * i,
+                        first + 2 * i + 2,
+                        first + 2 * i + 3,
+                        first + 2 * i + 1,
+                    ),
+                )
+                for i in range(self.elements_per_pid)
+            ]
+        return self._elements[pid]
+
+    def grid_coords(self, grid):
+        i = grid % 1000
+        return (float(i // 2), float(i % 2), float(grid // 1000))
+
+    def visible_elements(self):
+        for pshell in self.pshells:
+            if pshell._id in self.visible:
+                for element in self.elements(pshell._id):
+                    yield element
+
+
+_model = None
+
+
+def model():
+    if _model is None:
+        load_model(os.environ["FAKE_ANSA_MODEL"])
+    return _model
+
+
+def load_model(model_file):
+    global _model
+    _model = Model(model_file)
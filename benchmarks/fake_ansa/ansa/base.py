@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import collections
+
+from ansa._model import Entity, model, load_model
+
+
+def DataBaseName():
+    return model().db_name
+
+
+def Open(filename):
+    # filename: model file (JSON) that replaces the current model
+    load_model(filename)
+
+
+def CollectEntities(deck, containers, search_types, recursive=False, **kwargs):
+    if search_types == "PSHELL":
+        return list(model().pshells)
+    if search_types == "PSOLID":
+        return list(model().psolids)
+    if containers is None:
+        return []
+    if not isinstance(containers, (list, tuple)):
+        containers = [containers]
+    if search_types in ("__ELEMENTS__", "SHELL"):
+        elements = []
+        for container in containers:
+            if container.ansa_type == "PSHELL":
+                elements.extend(model().elements(container._id))
+        return elements
+    if search_types == "GRID":
+        grids = collections.OrderedDict()
+        for container in containers:
+            elements = [container]
+            if container.ansa_type == "PSHELL":
+                elements = model().elements(container._id)
+            for element in elements:
+                for grid in element.values.get("grids", ()):
+                    grids[grid] = None
+        return [Entity("GRID", grid) for grid in grids]
+    return []
+
+
+def GetEntityCardValues(deck, entity, fields):
+    values = {"Name": entity._name, "PID": entity.values.get("pid")}
+    return dict((field, values.get(field)) for field in fields)
+
+
+def SetEntityCardValues(deck, entity, values):
+    if "Name" in values:
+        entity._name = values["Name"]
+    return 0
+
+
+def DeleteEntity(entities, force=False):
+    if not isinstance(entities, (list, tuple)):
+        entities = [entities]
+    ids = set(id(entity) for entity in entities)
+    model().psolids = [psolid for psolid in model().psolids if id(psolid) not in ids]
+    return 0
+
+
+# Focus functions: All() shows everything and starts a new focus, Or() then shows only the given
+# entities (this is how the export loop shows one part), further Or() calls add to the visible set.
+_new_focus = False
+
+
+def All():
+    global _new_focus
+    model().visible = set(pshell._id for pshell in model().pshells)
+    _new_focus = True
+
+
+def Or(entities, deck=None, type=None):
+    global _new_focus
+    ids = set(entity._id for entity in entities)
+    if _new_focus:
+        model().visible = ids
+    else:
+        model().visible |= ids
+    _new_focus = False
+
+
+def Not(entities, deck=None, type=None):
+    global _new_focus
+    model().visible -= set(entity._id for entity in entities)
+    _new_focus = False
+
+
+def Orient(*args, **kwargs):
+    return 0
+
+
+def F11ShellsOptionsSet(*args, **kwargs):
+    return 0
+
+
+def _short(value):
+    if isinstance(value, float):
+        return ("%.6g" % value if "." in "%.6g" % value else "%g." % value)[:8]
+    return str(value)
+
+
+def OutputNastran(filename, mode="visible", **kwargs):
+    # short format deck of the visible PSHELLs: header, PSHELLs, GRIDs, CQUAD4s, ENDDATA
+    current = model()
+    elements = list(current.visible_elements())
+    pids = sorted(set(element.values["pid"] for element in elements))
+    grids = sorted(
+        set(grid for element in elements for grid in element.values["grids"])
+    )
+    with open(filename, "w") as f:
+        f.write("$ Nastran deck written by the stand-in ansa package\n")
+        f.write("BEGIN BULK\n")
+        for pid in pids:
+            f.write(
+                "$ANSA_NAME_COMMENT;%d;PSHELL;%s;\n" % (pid, current.pshell(pid)._name)
+            )
+            f.write("PSHELL  %8d%8d%8s%8d\n" % (pid, 1, "1.", 1))
+        f.write("MAT1    %8d%8s%8s%8s\n" % (1, "210000.", "", ".3"))
+        for grid in grids:
+            f.write(
+                "GRID    %8d%8s" % (grid, "")
+                + "".join("%8s" % _short(x) for x in current.grid_coords(grid))
+                + "\n"
+            )
+        for element in elements:
+            f.write(
+                "CQUAD4  %8d%8d" % (element._id, element.values["pid"])
+                + "".join("%8d" % grid for grid in element.values["grids"])
+                + "\n"
+            )
+        f.write("ENDDATA\n")
+    return 0
+
+
+class _Issue:
+    def __init__(self, entities):
+        self.entities = entities
+
+
+class _Report:
+    def __init__(self, issues):
+        self.issues = issues
+
+
+class Check:
+    EXEC_ON_VIS = 1
+    EXEC_ON_ALL = 2
+    REPORT_NONE = 0
+
+
+class _SingleBounds:
+    # free edges of the visible shells: edges used by one element only
+    def execute(self, exec_mode=Check.EXEC_ON_VIS, report=Check.REPORT_NONE, **kwargs):
+        current = model()
+        if exec_mode == Check.EXEC_ON_VIS:
+            elements = list(current.visible_elements())
+        else:
+            elements = [e for p in current.pshells for e in current.elements(p._id)]
+        edges = collections.defaultdict(list)
+        for element in elements:
+            grids = element.values["grids"]
+            for n in range(len(grids)):
+                edge = tuple(sorted((grids[n], grids[(n + 1) % len(grids)])))
+                edges[edge].append(element)
+        free = [users[0] for users in edges.values() if len(users) == 1]
+        if not free:
+            return []
+        return [_Report([_Issue([element]) for element in free])]
+
+
+class checks:
+    class mesh:
+        SingleBounds = _SingleBounds
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+
+
+def VolumesDetect(*args, **kwargs):
+    # the strips of the stand-in model never form a closed volume
+    return None
+
+
+def VolumesDelete(volume):
+    return 1
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(_here))))
+from xlsx_writer import write_xlsx
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def SelectSaveDir(initial_dir=None):
+    return os.environ.get("FAKE_ANSA_SAVE_DIR", initial_dir)
+
+
+class Messenger:
+    def clear(self):
+        pass
+
+    def echo(self, flag):
+        pass
+
+    def print(self, text):
+        print(text)
+
+
+class _Workbook:
+    def __init__(self):
+        self.sheets = {"Sheet1": {}}
+
+
+def XlsxCreate():
+    return _Workbook()
+
+
+def XlsxInsertSheet(workbook):
+    workbook.sheets["Sheet%d" % (len(workbook.sheets) + 1)] = {}
+    return 1
+
+
+def XlsxSetCellValue(workbook, sheet, row, col, value):
+    workbook.sheets.setdefault(sheet, {})[(row, col)] = value
+    return 1
+
+
+def XlsxGetCellValue(workbook, sheet, row, col):
+    return workbook.sheets.get(sheet, {}).get((row, col))
+
+
+def XlsxSave(workbook, filename):
+    sheets = []
+    for name, cells in workbook.sheets.items():
+        num_rows = max([row for row, col in cells] + [-1]) + 1
+        rows = [[] for n in range(num_rows)]
+        for (row, col), value in cells.items():
+            rows[row] += [None] * (col + 1 - len(rows[row]))
+            rows[row][col] = value
+        sheets.append((name, rows))
+    write_xlsx(filename, sheets)
+    return 1
+
+
+def XlsxClose(workbook):
+    return 1
+
+
+def XlsxOpen(filename):
+    # shared string or inline string text cells of the sheets named Sheet1, Sheet2, ...
+    workbook = _Workbook()
+    with zipfile.ZipFile(filename) as xlsx:
+        strings = []
+        if "xl/sharedStrings.xml" in xlsx.namelist():
+            root = ElementTree.fromstring(xlsx.read("xl/sharedStrings.xml"))
+            strings = ["".join(t.text or "" for t in si.iter(_NS + "t")) for si in root]
+        for name in xlsx.namelist():
+            match = re.match(r"xl/worksheets/sheet(\d+)\.xml", name)
+            if not match:
+                continue
+            cells = workbook.sheets.setdefault("Sheet" + match.group(1), {})
+            root = ElementTree.fromstring(xlsx.read(name))
+            for cell in root.iter(_NS + "c"):
+                ref = re.match(r"([A-Z]+)(\d+)", cell.get("r"))
+                col = 0
+                for letter in ref.group(1):
+                    col = col * 26 + ord(letter) - 64
+                value = cell.find(_NS + "v")
+                if cell.get("t") == "s":
+                    text = strings[int(value.text)]
+                elif cell.get("t") == "inlineStr":
+                    text = "".join(t.text or "" for t in cell.iter(_NS + "t"))
+                else:
+                    text = value.text if value is not None else None
+                cells[(int(ref.group(2)) - 1, col - 1)] = text
+    return workbook
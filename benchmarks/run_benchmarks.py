@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the PID matching and export steps on synthetic models, without ANSA.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --script-sizes 1000
+    python benchmarks/run_benchmarks.py --update-baselines
+
+The stages below are run for every model size, --repeat times each, and the median is reported. The
+in-process stages are timed and then run once more under tracemalloc for their peak memory, the script
+stages run CollectPIDNames.py and OutputPIDtoNastran.py with the stand-in ansa package in
+benchmarks/fake_ansa and report the peak resident memory of the process (not available on Windows).
+Every script run starts in an empty directory, so no manifest or name cache of an earlier run is used.
+
+The results are compared with baselines.json: a stage fails if it is slower or uses more memory than
+its baseline by more than --tolerance, and the run then exits with 1. The script stages also get
+SCRIPT_MIN_SECONDS of slack for the start of the Python process. Update the baselines (with the same
+--repeat) in the change that makes a stage slower on purpose, and say why.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import statistics
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+FAKE_ANSA_DIR = os.path.join(BENCHMARK_DIR, "fake_ansa")
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baselines.json")
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, FAKE_ANSA_DIR)
+
+from pid_matching import PidClassifier
+from pid_catalog import build_catalog
+from nastran_deck import split_nastran_deck
+from xlsx_reader import read_part_list
+from xlsx_writer import write_xlsx
+from synthetic_names import write_model
+
+# same lists as output_pid_to_nastran
+IGNORE_PREFIX_LIST = ["AIR_EXT"]
+IGNORE_PID_LIST = ["INLET", "OUTLET", "AIR_EXT"]
+IGNORE_SUFFIX_LIST = [
+    "_CS",
+    "_VS",
+    "_MI",
+    "_INLET",
+    "_OUTLET",
+    "_Q",
+    "_CR",
+    "_AIR_EXT_",
+]
+
+# a stage only fails if it is also slower than its baseline by this many seconds (resp. MB)
+MIN_SECONDS = 0.05
+MIN_MB = 1.0
+# script stages start a Python process and import the helper modules, which varies by a few tenths
+SCRIPT_STAGES = ("collect_pid_names", "output_pid_to_nastran")
+SCRIPT_MIN_SECONDS = 0.3
+
+
+def load_fake_model(model_file):
+    os.environ["FAKE_ANSA_MODEL"] = model_file
+    from ansa import _model
+
+    _model._model = None
+    return _model.model()
+
+
+def in_process_stages(work_dir, model_file):
+    # returns [(stage name, setup, stage)], setup() returns the arguments of stage()
+    def pshells():
+        return (load_fake_model(model_file).pshells,)
+
+    def classify_names(pids):
+        classifier = PidClassifier(
+            IGNORE_SUFFIX_LIST, IGNORE_PREFIX_LIST, IGNORE_PID_LIST
+        )
+        for pid in pids:
+            classifier.classify(pid._name)
+
+    def index_setup():
+        pids = load_fake_model(model_file).pshells
+        return pids, build_catalog(pids).unique_pid_list
+
+    def build_part_index(pids, parts):
+        classifier = PidClassifier(
+            IGNORE_SUFFIX_LIST, IGNORE_PREFIX_LIST, IGNORE_PID_LIST
+        )
+        classifier.build_part_index(pids, parts)
+
+    def split_setup():
+        from ansa import base
+
+        pids, parts = index_setup()
+        classifier = PidClassifier(
+            IGNORE_SUFFIX_LIST, IGNORE_PREFIX_LIST, IGNORE_PID_LIST
+        )
+        part_index, invalid = classifier.build_part_index(pids, parts)
+        part_pids = dict(
+            (part, [pid._id for pid in part_index[part]])
+            for part in parts
+            if classifier.ignore_reason(part) is None
+        )
+        deck_file = os.path.join(work_dir, "full_model.nas")
+        base.All()
+        base.OutputNastran(deck_file)
+        split_dir = os.path.join(work_dir, "split")
+        if os.path.isdir(split_dir):
+            shutil.rmtree(split_dir)
+        os.makedirs(split_dir)
+        return deck_file, part_pids, split_dir
+
+    def part_list_setup():
+        pids, parts = index_setup()
+        input_file = os.path.join(work_dir, "Unique_PIDs.xlsx")
+        write_xlsx(input_file, [("Sheet1", [[part] for part in parts])])
+        return (input_file,)
+
+    return [
+        ("classify_names", pshells, classify_names),
+        ("build_catalog", pshells, build_catalog),
+        ("build_part_index", index_setup, build_part_index),
+        ("split_deck", split_setup, split_nastran_deck),
+        ("read_part_list", part_list_setup, read_part_list),
+    ]
+
+
+def run_in_process(setup, stage, repeat=1):
+    # median time of repeat runs and the peak memory of one more run
+    times = []
+    for n in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        stage(*args)
+        times.append(time.perf_counter() - start)
+    seconds = statistics.median(times)
+
+    args = setup()
+    tracemalloc.start()
+    stage(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2.0**20
+
+
+def run_script(script, run_dir, model_file, inputs=()):
+    # runs script in an empty run_dir that only holds copies of the inputs files
+    if os.path.isdir(run_dir):
+        shutil.rmtree(run_dir)
+    os.makedirs(run_dir)
+    for input_file in inputs:
+        shutil.copy(input_file, run_dir)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([FAKE_ANSA_DIR, REPO_DIR])
+    env["FAKE_ANSA_MODEL"] = model_file
+    env["FAKE_ANSA_SAVE_DIR"] = run_dir
+    env.pop("ANSA_EXPORT_JOB", None)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, script)],
+        cwd=run_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    peak_mb = None
+    if hasattr(os, "wait4"):
+        # wait4 gives the resource usage of this child only (ru_maxrss is in KB on Linux)
+        stderr = process.stderr.read()
+        pid, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        scale = 1.0 if sys.platform == "darwin" else 1024.0
+        peak_mb = usage.ru_maxrss * scale / 2.0**20
+    else:
+        stderr = process.communicate()[1]
+    seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(script + " failed:\n" + stderr.decode(errors="replace"))
+    return seconds, peak_mb
+
+
+def run_script_median(script, run_dir, model_file, inputs=(), repeat=1):
+    runs = [run_script(script, run_dir, model_file, inputs) for n in range(repeat)]
+    peaks = [peak_mb for seconds, peak_mb in runs if peak_mb is not None]
+    return (
+        statistics.median(seconds for seconds, peak_mb in runs),
+        statistics.median(peaks) if peaks else None,
+    )
+
+
+def run_benchmarks(sizes, script_sizes, seed=0, repeat=1):
+    results = {}
+    for size in sorted(set(sizes) | set(script_sizes)):
+        work_dir = tempfile.mkdtemp(prefix="pid_benchmark_")
+        try:
+            model_file = os.path.join(work_dir, "model.json")
+            write_model(model_file, size, seed)
+            if size in sizes:
+                for name, setup, stage in in_process_stages(work_dir, model_file):
+                    results["%s@%d" % (name, size)] = run_in_process(
+                        setup, stage, repeat
+                    )
+                    print_result(name, size, *results["%s@%d" % (name, size)])
+            if size in script_sizes:
+                run_dir = os.path.join(work_dir, "run")
+                part_list = os.path.join(work_dir, "Unique_PIDs.xlsx")
+                for name, script, inputs in [
+                    ("collect_pid_names", "CollectPIDNames.py", []),
+                    ("output_pid_to_nastran", "OutputPIDtoNastran.py", [part_list]),
+                ]:
+                    results["%s@%d" % (name, size)] = run_script_median(
+                        script, run_dir, model_file, inputs, repeat
+                    )
+                    print_result(name, size, *results["%s@%d" % (name, size)])
+                    if not os.path.isfile(part_list):
+                        # written by CollectPIDNames.py, read by OutputPIDtoNastran.py
+                        shutil.copy(
+                            os.path.join(run_dir, "Unique_PIDs.xlsx"), part_list
+                        )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return dict(
+        (key, {"seconds": round(seconds, 4), "peak_mb": peak_mb and round(peak_mb, 2)})
+        for key, (seconds, peak_mb) in results.items()
+    )
+
+
+def print_result(name, size, seconds, peak_mb):
+    memory = "%10.1f MB" % peak_mb if peak_mb is not None else "%13s" % "n/a"
+    print("%-24s %8d PIDs %10.3f s %s" % (name, size, seconds, memory))
+
+
+def compare_with_baselines(results, baselines, tolerance):
+    # returns the list of regressions
+    regressions = []
+    for key, result in sorted(results.items()):
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        min_seconds = MIN_SECONDS
+        if key.split("@")[0] in SCRIPT_STAGES:
+            min_seconds = SCRIPT_MIN_SECONDS
+        limit = max(
+            baseline["seconds"] * (1 + tolerance), baseline["seconds"] + min_seconds
+        )
+        if result["seconds"] > limit:
+            regressions.append(
+                "%s: %.3f s, baseline %.3f s"
+                % (key, result["seconds"], baseline["seconds"])
+            )
+        if result["peak_mb"] is not None and baseline.get("peak_mb") is not None:
+            limit = max(
+                baseline["peak_mb"] * (1 + tolerance), baseline["peak_mb"] + MIN_MB
+            )
+            if result["peak_mb"] > limit:
+                regressions.append(
+                    "%s: %.1f MB, baseline %.1f MB"
+                    % (key, result["peak_mb"], baseline["peak_mb"])
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument(
+        "--script-sizes",
+        type=int,
+        nargs="*",
+        default=[1000],
+        help="model sizes the two scripts are run for",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="runs of every stage, the median is compared (default: %(default)s)",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--baselines", default=BASELINE_FILE)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.script_sizes, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    baselines = {}
+    if os.path.isfile(args.baselines):
+        with open(args.baselines, "r") as f:
+            baselines = json.load(f)
+    if args.update_baselines:
+        baselines.update(results)
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=1, sort_keys=True)
+        print("Baselines written to " + args.baselines)
+        return
+
+    regressions = compare_with_baselines(results, baselines, args.tolerance)
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic PSHELL names that follow the PID naming convention of OutputPIDtoNastran.py.
+
+Every part gets a few regions (base, _SI, _C, _SE) with boundary identifiers (_VS, _CS, _MI#A, _MI#B),
+some parts get _AUX current/voltage sources (PART_AUX#_CS), _INLET/_OUTLET or _Q# PIDs, and parts are
+joined by PART_A.I.PART_B interface PIDs. A few AIR_EXT PIDs are added since they are ignored.
+About 2% of the names get a trailing space, which CollectPIDNames.py strips.
+The names only depend on the requested count and the seed.
+"""
+
+import json
+import random
+
+REGIONS = ["", "_SI", "_C", "_SE"]
+BOUNDARIES = ["", "_VS", "_CS", "_MI1A", "_MI1B", "_MI2A"]
+
+
+def synthetic_names(num_pids, seed=0):
+    rng = random.Random(seed)
+    names = []
+    parts = []
+    while len(names) < num_pids:
+        part = "PART%05d" % len(parts)
+        parts.append(part)
+        names.append(part)
+        for region in rng.sample(REGIONS[1:], rng.randint(0, 2)):
+            names.append(part + region + rng.choice(BOUNDARIES))
+        if rng.random() < 0.1:
+            names.append(part + "_AUX%d_CS" % rng.randint(1, 3))
+        if rng.random() < 0.05:
+            names.append(part + rng.choice(["_INLET", "_OUTLET", "_Q1A"]))
+        if len(parts) > 1 and rng.random() < 0.5:
+            partner = rng.choice(parts[:-1])
+            names.append(part + rng.choice(REGIONS) + ".I." + partner)
+        if rng.random() < 0.01:
+            names.append("AIR_EXT_%d" % len(parts))
+    names = names[:num_pids]
+    for n in range(len(names)):
+        if rng.random() < 0.02:
+            names[n] += " "
+    return names
+
+
+def write_model(model_file, num_pids, seed=0, elements_per_pid=2):
+    # model file of the stand-in ansa package
+    names = synthetic_names(num_pids, seed)
+    with open(model_file, "w") as f:
+        json.dump(
+            {
+                "db_name": "synthetic_%d.ansa" % num_pids,
+                "pshells": [[n + 1, name] for n, name in enumerate(names)],
+                "elements_per_pid": elements_per_pid,
+            },
+            f,
+        )
+    return names
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Output of the exported part decks (nastran_files/<part>.nas).
+
+ANSA writes every deck to nastran_files, a deck sink then decides what is kept:
+    FileDeckSink: the .nas files as they are, like before
+    GzipDeckSink: <part>.nas.gz, the .nas file is removed
+    BundleDeckSink: every deck is appended to one tar file (nastran_files.tar), gzip compressed per
+        deck, and the .nas file is removed. The position of every deck in the tar file is appended to
+        nastran_files.tar.index.jsonl, so a part can be extracted without reading the rest:
+            python deck_sinks.py extract C:/exports/vehicle/nastran_files.tar PART_NAME
+The copying and compression runs in a background thread, add() only queues the file, so the export
+loop does not wait for it. close() waits for the queued files and raises the first error.
+
+Workers of parallel_export.py bundle their decks in nastran_files_<n>.tar, merge_bundles() appends
+them to nastran_files.tar when all workers are done. A worker also finds the decks of nastran_files.tar
+with stored_hash(), so the parts of an earlier parallel run are skipped.
+
+Every sink returns the sha1 of the original deck of a part with stored_hash(), used by the export
+manifest to check stored decks that are no longer in nastran_files.
+"""
+
+import io
+import os
+import sys
+import gzip
+import json
+import queue
+import shutil
+import hashlib
+import tarfile
+import argparse
+import threading
+
+from export_manifest import file_hash
+
+BUNDLE_NAME = "nastran_files"
+BUNDLE_INDEX_SUFFIX = ".index.jsonl"
+
+
+def bundle_file_name(output_dir, shard_index=None):
+    if shard_index is None:
+        return os.path.join(output_dir, BUNDLE_NAME + ".tar")
+    return os.path.join(output_dir, BUNDLE_NAME + "_" + str(shard_index) + ".tar")
+
+
+class _ThreadedDeckSink:
+    # add() queues (name, path), _store(name, path) runs in the worker thread
+    def __init__(self, max_queued=64):
+        self._queue = queue.Queue(max_queued)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is None:
+                try:
+                    self._store(*item)
+                except Exception as error:
+                    self._error = error
+
+    def add(self, name, path):
+        # name: path of the deck relative to nastran_files, e.g. PART.nas or interfaces/PART.I.B.inc
+        if self._error is not None:
+            raise self._error
+        self._queue.put((name, path))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+class FileDeckSink:
+    def __init__(self, output_filepath):
+        self.output_filepath = output_filepath
+
+    def add(self, name, path):
+        pass
+
+    def stored_hash(self, name):
+        path = os.path.join(self.output_filepath, name)
+        return file_hash(path) if os.path.isfile(path) else None
+
+    def close(self):
+        pass
+
+
+class GzipDeckSink(_ThreadedDeckSink):
+    def __init__(self, output_filepath, compresslevel=6):
+        self.output_filepath = output_filepath
+        self.compresslevel = compresslevel
+        _ThreadedDeckSink.__init__(self)
+
+    def _store(self, name, path):
+        temp_path = path + ".gz.tmp"
+        with open(path, "rb") as deck, gzip.open(
+            temp_path, "wb", compresslevel=self.compresslevel
+        ) as f:
+            shutil.copyfileobj(deck, f, 1 << 20)
+        os.replace(temp_path, path + ".gz")
+        os.remove(path)
+
+    def stored_hash(self, name):
+        path = os.path.join(self.output_filepath, name + ".gz")
+        if not os.path.isfile(path):
+            return None
+        sha = hashlib.sha1()
+        with gzip.open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+
+class BundleDeckSink(_ThreadedDeckSink):
+    # decks added again in a later run are appended again, the index points to the latest copy
+    # base_bundle_file: bundle whose decks are also found by stored_hash (nastran_files.tar for a worker)
+    def __init__(self, bundle_file, compresslevel=6, base_bundle_file=None):
+        self.bundle_file = bundle_file
+        self.index_file = bundle_file + BUNDLE_INDEX_SUFFIX
+        self.compresslevel = compresslevel
+        self.index = read_bundle_index(bundle_file)
+        self.base_index = {}
+        if base_bundle_file is not None:
+            self.base_index = read_bundle_index(base_bundle_file)
+        self._tar = tarfile.open(
+            bundle_file, "a" if os.path.isfile(bundle_file) else "w"
+        )
+        self._index = open(self.index_file, "a", encoding="utf-8")
+        _ThreadedDeckSink.__init__(self)
+
+    def _store(self, name, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        entry = _append_deck(
+            self._tar,
+            self._index,
+            name,
+            gzip.compress(data, self.compresslevel),
+            hashlib.sha1(data).hexdigest(),
+            os.path.getmtime(path),
+        )
+        self.index[name] = entry
+        os.remove(path)
+
+    def stored_hash(self, name):
+        entry = self.index.get(name, self.base_index.get(name))
+        return entry["sha1"] if entry is not None else None
+
+    def close(self):
+        try:
+            _ThreadedDeckSink.close(self)
+        finally:
+            self._tar.close()
+            self._index.close()
+
+
+def _append_deck(tar, index, name, compressed, sha1, mtime):
+    # appends a compressed deck to the tar file and its entry to the index file, returns the entry
+    tarinfo = tarfile.TarInfo(name + ".gz")
+    tarinfo.size = len(compressed)
+    tarinfo.mtime = mtime
+    header = tarinfo.tobuf(tar.format, tar.encoding, tar.errors)
+    entry = {
+        "name": name,
+        "offset": tar.offset + len(header),
+        "size": len(compressed),
+        "sha1": sha1,
+    }
+    tar.addfile(tarinfo, io.BytesIO(compressed))
+    tar.fileobj.flush()
+    index.write(json.dumps(entry) + "\n")
+    index.flush()
+    return entry
+
+
+def merge_bundles(bundle_files, bundle_file):
+    # appends the latest copy of every deck of bundle_files to bundle_file, without compressing them
+    # again, and removes bundle_files. Returns the number of decks
+    num_decks = 0
+    tar = tarfile.open(bundle_file, "a" if os.path.isfile(bundle_file) else "w")
+    index = open(bundle_file + BUNDLE_INDEX_SUFFIX, "a", encoding="utf-8")
+    try:
+        for other_file in bundle_files:
+            mtime = os.path.getmtime(other_file)
+            with open(other_file, "rb") as f:
+                for name, entry in sorted(read_bundle_index(other_file).items()):
+                    f.seek(entry["offset"])
+                    compressed = f.read(entry["size"])
+                    _append_deck(tar, index, name, compressed, entry["sha1"], mtime)
+                    num_decks += 1
+    finally:
+        tar.close()
+        index.close()
+    for other_file in bundle_files:
+        os.remove(other_file)
+        if os.path.isfile(other_file + BUNDLE_INDEX_SUFFIX):
+            os.remove(other_file + BUNDLE_INDEX_SUFFIX)
+    return num_decks
+
+
+def read_bundle_index(bundle_file):
+    # returns {name: index entry}, the latest entry of a name is used
+    index = {}
+    index_file = bundle_file + BUNDLE_INDEX_SUFFIX
+    if not os.path.isfile(index_file):
+        return index
+    with open(index_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # last line of a run that was killed while writing
+            index[entry["name"]] = entry
+    return index
+
+
+def read_bundled_deck(bundle_file, name, index=None):
+    # returns the bytes of one deck of the bundle, only that deck is read
+    if index is None:
+        index = read_bundle_index(bundle_file)
+    entry = index[name]
+    with open(bundle_file, "rb") as f:
+        f.seek(entry["offset"])
+        return gzip.decompress(f.read(entry["size"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="List or extract the decks of a nastran_files.tar bundle."
+    )
+    parser.add_argument("command", choices=["list", "extract"])
+    parser.add_argument("bundle_file")
+    parser.add_argument("parts", nargs="*", help="part names to extract (default: all)")
+    parser.add_argument("-o", "--output-dir", default=".")
+    args = parser.parse_args()
+
+    index = read_bundle_index(args.bundle_file)
+    if args.command == "list":
+        for name, entry in sorted(index.items()):
+            sys.stdout.write("%s %d\n" % (name, entry["size"]))
+        return
+    names = [part + ".nas" for part in args.parts] or sorted(index)
+    for name in names:
+        path = os.path.join(args.output_dir, name)
+        if not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+            os.makedirs(os.path.dirname(os.path.abspath(path)))
+        with open(path, "wb") as f:
+            f.write(read_bundled_deck(args.bundle_file, name, index))
+
+
+if __name__ == "__main__":
+    main()
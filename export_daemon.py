@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Export daemon: an ANSA session that keeps its database open and runs export jobs sent over a local
+Unix socket.
+
+Every run of OutputPIDtoNastran.py or CollectPIDNames.py starts with loading the database, selecting
+the output directory and collecting and classifying every PSHELL. The daemon does this once: the
+database stays open and the PSHELLs, their classified names and the part index are kept between jobs
+(OutputPIDtoNastran.ModelSession). Before every export the PSHELLs are collected again, only new or
+renamed PSHELLs are classified and the part index is only rebuilt if a PSHELL or the part list changed.
+
+Start the daemon in an ANSA batch session (the socket is ANSA_EXPORT_SOCKET, or ansa_export_<user>.sock
+in the temp directory):
+    ansa64.sh -b -nolauncher -i C:/models/vehicle.ansa -exec load_script:OutputPIDtoNastran.py -exec serve
+or without ANSA, with a stand-in ansa package on PYTHONPATH:
+    python -c "import OutputPIDtoNastran; OutputPIDtoNastran.serve()"
+
+Jobs are one JSON object per connection, answered with one JSON object ({"ok": true, ...} or
+{"ok": false, "error": traceback}), both on one line:
+    {"command": "export", "output_dir": dir, "parts": [names] or null}: exports the parts (null: the
+        parts of Unique_PIDs.xlsx) and returns the summary "headers" and "rows" instead of writing
+        the summary file
+    {"command": "collect_names", "output_dir": dir}: runs CollectPIDNames.py, returns "parts"
+    {"command": "open", "database": file}: opens another (or the updated) database
+    {"command": "status"}: "database", "pids" and "jobs" of the daemon
+    {"command": "shutdown"}: stops the daemon
+Jobs run one after the other, clients wait until the daemon accepts their connection. A client that
+does not send its job or take the response within JOB_TIMEOUT seconds is dropped, so it cannot block
+the daemon.
+
+    python export_daemon.py export C:/exports/vehicle PART_A PART_B
+    python export_daemon.py collect-names C:/exports/vehicle
+    python export_daemon.py shutdown
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import getpass
+import argparse
+import tempfile
+import traceback
+
+SOCKET_ENV = "ANSA_EXPORT_SOCKET"
+JOB_TIMEOUT = 30.0
+
+
+def default_socket_path():
+    return os.environ.get(SOCKET_ENV) or os.path.join(
+        tempfile.gettempdir(), "ansa_export_%s.sock" % getpass.getuser()
+    )
+
+
+def serve_jobs(socket_path, handlers, log=print, timeout=JOB_TIMEOUT):
+    # runs the jobs sent to socket_path until a shutdown job, handlers: {command: function(job)}
+    # returning a dict that is added to the response. A client has timeout seconds to send its job
+    # and to take the response (not counting the job itself), else its connection is dropped
+    if os.path.exists(socket_path):
+        if _daemon_running(socket_path):
+            raise RuntimeError("An export daemon is already running on " + socket_path)
+        # left by a daemon that was killed
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socket_path)
+        server.listen(8)
+        log("Export daemon listening on " + socket_path)
+        running = True
+        while running:
+            connection, _ = server.accept()
+            connection.settimeout(timeout)
+            with connection, connection.makefile("rwb") as stream:
+                try:
+                    line = stream.readline()
+                except socket.timeout:
+                    log("No job received in %g s, the connection is dropped" % timeout)
+                    continue
+                response, running = run_job(line, handlers)
+                try:
+                    stream.write(json.dumps(response).encode("utf-8") + b"\n")
+                    stream.flush()
+                except OSError:
+                    log("The client of the job closed its connection")
+            log(
+                "%s job %s in %.1f s"
+                % (
+                    response.get("command"),
+                    "done" if response["ok"] else "failed",
+                    response["seconds"],
+                )
+            )
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def run_job(line, handlers):
+    # returns the response to a job line and whether the daemon keeps running
+    start = time.time()
+    running = True
+    command = None
+    try:
+        job = json.loads(line.decode("utf-8"))
+        command = job.get("command")
+        if command == "shutdown":
+            running = False
+            result = {}
+        elif command in handlers:
+            result = handlers[command](job)
+        else:
+            raise ValueError(
+                "Unknown command %r, expected one of: %s"
+                % (command, ", ".join(sorted(handlers) + ["shutdown"]))
+            )
+        response = dict(result or {}, ok=True)
+    except (Exception, SystemExit):
+        # the export script calls sys.exit() if the part list is missing
+        response = {"ok": False, "error": traceback.format_exc()}
+    response["command"] = command
+    response["seconds"] = time.time() - start
+    return response, running
+
+
+def _daemon_running(socket_path):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        client.close()
+
+
+def send_job(job, socket_path=None, timeout=None):
+    # sends one job to the daemon and returns its response, waits for the job to finish
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    with client:
+        client.connect(socket_path or default_socket_path())
+        with client.makefile("rwb") as stream:
+            stream.write(json.dumps(job).encode("utf-8") + b"\n")
+            stream.flush()
+            line = stream.readline()
+    if not line:
+        raise RuntimeError("The export daemon closed the connection")
+    return json.loads(line.decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send jobs to the export daemon.")
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="socket of the daemon (default: %(default)s)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="export parts, print the summary")
+    export.add_argument("output_dir")
+    export.add_argument("parts", nargs="*", help="default: the parts of the list")
+    collect = subparsers.add_parser("collect-names", help="run CollectPIDNames.py")
+    collect.add_argument("output_dir")
+    open_db = subparsers.add_parser("open", help="open a database")
+    open_db.add_argument("database")
+    subparsers.add_parser("status")
+    subparsers.add_parser("shutdown")
+    args = parser.parse_args()
+
+    job = {"command": args.command.replace("-", "_")}
+    if args.command in ("export", "collect-names"):
+        job["output_dir"] = os.path.abspath(args.output_dir)
+    if args.command == "export":
+        job["parts"] = args.parts or None
+    elif args.command == "open":
+        job["database"] = os.path.abspath(args.database)
+    response = send_job(job, args.socket)
+    if not response["ok"]:
+        sys.stderr.write(response["error"])
+        sys.exit(1)
+    if args.command == "export":
+        for row in [response["headers"]] + response["rows"]:
+            sys.stdout.write(
+                "\t".join("" if cell is None else str(cell) for cell in row)
+            )
+            sys.stdout.write("\n")
+    else:
+        for name in sorted(response):
+            if name not in ("ok", "command"):
+                sys.stdout.write("%s: %s\n" % (name, response[name]))
+
+
+if __name__ == "__main__":
+    main()
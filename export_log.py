@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Logging of OutputPIDtoNastran.py.
+
+Printing every matched PID to the ANSA console slows down the export of large models, so messages go
+through a logger instead:
+    - the log file in output_dir gets every message at INFO level and above (DEBUG with verbosity
+      "debug"). One handler formats the records and writes them in blocks of buffer_records records
+      (a warning is written at once), the file is rotated at max_bytes
+    - the console only gets warnings, or every message down to the verbosity level
+Progress lines (time elapsed/left) are rate limited with ProgressLog.
+"""
+
+import os
+import sys
+import time
+import logging
+import logging.handlers
+
+LOGGER_NAME = "OutputPIDtoNastran"
+VERBOSITY_LEVELS = {
+    "warning": logging.WARNING,
+    "info": logging.INFO,
+    "debug": logging.DEBUG,
+}
+
+
+class BufferedFileHandler(logging.handlers.RotatingFileHandler):
+    # rotating log file that is written every buffer_records records, at a warning and at close
+    def __init__(self, log_file, max_bytes, backup_count, buffer_records):
+        logging.handlers.RotatingFileHandler.__init__(
+            self,
+            log_file,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        self.buffer_records = buffer_records
+        self._lines = []
+
+    def emit(self, record):
+        try:
+            self._lines.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._lines) >= self.buffer_records or record.levelno >= logging.WARNING:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            lines, self._lines = self._lines, []
+            if lines:
+                if self.stream is None:
+                    self.stream = self._open()
+                size = sum(len(line) for line in lines)
+                if self.maxBytes > 0 and self.stream.tell() + size > self.maxBytes:
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.writelines(lines)
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        logging.handlers.RotatingFileHandler.close(self)
+
+
+def setup_logger(
+    log_file,
+    verbosity="warning",
+    max_bytes=10 << 20,
+    backup_count=5,
+    buffer_records=1000,
+):
+    # returns the export logger, the handlers of an earlier run in the same ANSA session are closed
+    level = VERBOSITY_LEVELS[verbosity]
+    logger = logging.getLogger(LOGGER_NAME)
+    close_logger(logger)
+    logger.setLevel(min(level, logging.INFO))
+    logger.propagate = False
+
+    file_handler = BufferedFileHandler(
+        log_file, max_bytes, backup_count, buffer_records
+    )
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)-7s %(message)s")
+    )
+    logger.addHandler(file_handler)
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    logger.addHandler(console)
+    return logger
+
+
+def close_logger(logger):
+    # writes the buffered records and closes the log file
+    for handler in list(logger.handlers):
+        handler.close()
+        logger.removeHandler(handler)
+
+
+class ProgressLog:
+    # logs at most one progress line every interval seconds, the first call is always logged
+    def __init__(self, logger, interval=5.0):
+        self.logger = logger
+        self.interval = interval
+        self._last = None
+
+    def __call__(self, message, *args):
+        now = time.time()
+        if self._last is None or now - self._last >= self.interval:
+            self._last = now
+            self.logger.info(message, *args)
+
+
+def log_file_name(output_dir, shard_index=None):
+    if shard_index is None:
+        return os.path.join(output_dir, LOGGER_NAME + ".log")
+    return os.path.join(output_dir, LOGGER_NAME + "_" + str(shard_index) + ".log")
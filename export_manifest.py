@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest of the exported Nastran files, used to skip parts that did not change since the last run.
+
+The manifest is stored next to nastran_files/ as nastran_files_manifest.jsonl. Every exported part is
+appended as one JSON line as soon as it is done, so a run that dies part way can be restarted and only
+exports the parts that are missing. An entry holds:
+    part: part name
+    fingerprint: hash of the matching PIDs of the part (ids, names, element and node counts)
+    file_hash: hash of the written .nas file
+    summary_row: the row written to the summary workbook
+    time: time the entry was written, the latest entry of a part is used
+
+Sessions of parallel_export.py append to their own nastran_files_manifest_<shard>.jsonl file, compact()
+merges them back into the main file.
+"""
+
+import os
+import json
+import glob
+import time
+import hashlib
+import threading
+
+MANIFEST_NAME = "nastran_files_manifest"
+
+
+def file_hash(path, block_size=1 << 20):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        block = f.read(block_size)
+        while block:
+            sha.update(block)
+            block = f.read(block_size)
+    return sha.hexdigest()
+
+
+def fingerprint(pid_data, options=None):
+    # pid_data: list of (id, name, number of elements, number of nodes) of the matching PIDs
+    # options: anything else that changes the written file, e.g. the OutputNastran options
+    text = json.dumps([list(pid_data), options], sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ExportManifest:
+    def __init__(self, output_dir, shard_index=None):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME + ".jsonl")
+        self.journal = self.path
+        if shard_index is not None:
+            self.journal = os.path.join(
+                output_dir, MANIFEST_NAME + "_" + str(shard_index) + ".jsonl"
+            )
+        self.entries = self._load()
+        self._journal = None
+        # record() is called from the export_pipeline.py workers
+        self._lock = threading.Lock()
+
+    def _files(self):
+        files = glob.glob(os.path.join(self.output_dir, MANIFEST_NAME + "_*.jsonl"))
+        if os.path.isfile(self.path):
+            files.insert(0, self.path)
+        return files
+
+    def _load(self):
+        entries = {}
+        for path in self._files():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # last line of a run that was killed while writing
+                    current = entries.get(entry["part"])
+                    if current is None or entry["time"] >= current["time"]:
+                        entries[entry["part"]] = entry
+        return entries
+
+    def summary_row(self, part, part_fingerprint, part_filename, deck_sink=None):
+        # returns the stored summary row if the part and its file did not change, else None
+        # deck_sink: gives the hash of decks that were compressed or bundled (see deck_sinks.py)
+        entry = self.entries.get(part)
+        if entry is None or entry["fingerprint"] != part_fingerprint:
+            return None
+        if os.path.isfile(part_filename):
+            current_hash = file_hash(part_filename)
+        elif deck_sink is not None:
+            current_hash = deck_sink.stored_hash(os.path.basename(part_filename))
+        else:
+            return None
+        if current_hash != entry["file_hash"]:
+            return None
+        return list(entry["summary_row"])
+
+    def record(self, part, part_fingerprint, part_filename, summary_row):
+        entry = {
+            "part": part,
+            "fingerprint": part_fingerprint,
+            "file_hash": file_hash(part_filename),
+            "summary_row": summary_row,
+            "time": time.time(),
+        }
+        with self._lock:
+            self.entries[part] = entry
+            if self._journal is None:
+                self._journal = open(self.journal, "a", encoding="utf-8")
+            self._journal.write(json.dumps(entry) + "\n")
+            self._journal.flush()
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def compact(self):
+        # rewrite all entries to the main manifest file and remove the shard files
+        self.close()
+        self.entries = self._load()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(temp_path, self.path)
+        for path in self._files():
+            if path != self.path:
+                os.remove(path)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Post-processing of the exported parts in worker threads, while ANSA exports the next part.
+
+The export loop only makes the ANSA calls (visibility, OutputNastran, VolumesDetect, SingleBounds) and
+then submits the rest of the work of a part, e.g. the offline volume check, the deck validation, the
+manifest hash and the deck compression. Summary rows are handed back in submission order by
+completed(), so the main thread can write them (the ANSA xlsx functions must run in the ANSA thread).
+
+At most max_pending parts are post-processed or waiting for a worker: submit() waits for the oldest
+of them when there are more, so a slow disk holds the export back instead of queueing every part in
+memory. An exception raised by a
+task is raised again by submit(), completed() or close() in the main thread, after the tasks that were
+not started yet are cancelled.
+
+With workers=0 the tasks run in submit(), one after the other like before.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Done:
+    # result of a part that did not need any post-processing
+    def __init__(self, result):
+        self._result = result
+
+    def done(self):
+        return True
+
+    def result(self):
+        return self._result
+
+
+class ExportPipeline:
+    def __init__(self, workers=2, max_pending=16):
+        self.max_pending = max(1, max_pending)
+        self._executor = None
+        if workers > 0:
+            self._executor = ThreadPoolExecutor(
+                workers, thread_name_prefix="export_post"
+            )
+        self._pending = deque()  # (index, future) in submission order
+
+    def submit(self, index, task, *args):
+        # runs task(*args) in a worker, its result is returned by completed() for index
+        if self._executor is None:
+            self._pending.append((index, _Done(task(*args))))
+            return
+        while True:
+            running = [future for index, future in self._pending if not future.done()]
+            if len(running) < self.max_pending:
+                break
+            self._wait(running[0])
+        self._pending.append((index, self._executor.submit(task, *args)))
+
+    def add(self, index, result):
+        # result of a part without post-processing, returned in order with the others
+        self._pending.append((index, _Done(result)))
+
+    def _wait(self, future):
+        try:
+            future.result()
+        except BaseException:
+            self.cancel()
+            raise
+
+    def completed(self):
+        # returns [(index, result)] of the finished parts at the head of the pipeline, in order
+        results = []
+        while self._pending and self._pending[0][1].done():
+            index, future = self._pending[0]
+            self._wait(future)
+            self._pending.popleft()
+            results.append((index, future.result()))
+        return results
+
+    def close(self):
+        # waits for every part and returns the remaining [(index, result)], in order
+        results = []
+        while self._pending:
+            index, future = self._pending[0]
+            self._wait(future)
+            self._pending.popleft()
+            results.append((index, future.result()))
+        if self._executor is not None:
+            self._executor.shutdown()
+        return results
+
+    def cancel(self):
+        # cancels the parts that were not started and waits for the others, their results are dropped
+        for index, future in self._pending:
+            if hasattr(future, "cancel"):
+                future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._pending.clear()
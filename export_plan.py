@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Export plan: the estimated cost of every part, from a dry run of OutputPIDtoNastran.py (plan_only).
+
+The dry run only matches the PIDs of every part and counts their elements and nodes, nothing is
+exported. The plan is written to output_dir/export_plan.json and used by the next runs:
+    - calcProcessTime weights the time left by the cost of the parts left instead of their number
+    - list_fraction picks a sample of parts spread over the whole range of costs (stratified_sample)
+    - parallel_export.py gives every worker about the same total cost (assign_shards), and every worker
+      exports its most expensive parts first (longest_first), so no worker is left with one big part
+      at the end
+
+The cost of a part is PART_OVERHEAD + its elements + its nodes, in the unit of one element. Nodes on the
+interface of two PIDs of a part are counted for both. Parts that are not in the plan (e.g. added to
+Unique_PIDs.xlsx after the dry run) get the median cost of the plan.
+"""
+
+import os
+import json
+import time
+
+PLAN_FILE_NAME = "export_plan.json"
+# time of a part that does not depend on its size (visibility, output of the deck header, checks), in
+# elements
+PART_OVERHEAD = 100
+
+
+def plan_file_name(output_dir):
+    return os.path.join(output_dir, PLAN_FILE_NAME)
+
+
+def part_cost(num_elements, num_nodes):
+    return PART_OVERHEAD + num_elements + num_nodes
+
+
+def write_plan(plan_file, db_name, parts):
+    # parts: list of {"part", "pids", "elements", "nodes"} in list order, the cost is added
+    for entry in parts:
+        entry["cost"] = part_cost(entry["elements"], entry["nodes"])
+    plan = {"database": db_name, "time": time.time(), "parts": parts}
+    temp_file = plan_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=1)
+    os.replace(temp_file, plan_file)
+    return plan
+
+
+def read_plan(plan_file):
+    # returns the plan, or None if there is no plan file
+    if not os.path.isfile(plan_file):
+        return None
+    with open(plan_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def part_costs(plan, part_names):
+    # returns the cost of every name of part_names, 1 for every part without a plan
+    if plan is None:
+        return [1] * len(part_names)
+    costs = dict((entry["part"], entry["cost"]) for entry in plan["parts"])
+    known = sorted(costs.values())
+    default = known[len(known) // 2] if known else 1
+    return [costs.get(name, default) for name in part_names]
+
+
+def longest_first(part_numbers, costs):
+    # costs: cost of every part of the list, indexed by part number. Equal costs keep the list order
+    return sorted(part_numbers, key=lambda part_num: -costs[part_num])
+
+
+def assign_shards(part_numbers, costs, shard_count):
+    # splits the parts into shard_count lists of about the same total cost: the most expensive part
+    # that is left goes to the shard with the lowest total. Every list is in longest first order
+    shards = [[] for n in range(shard_count)]
+    totals = [0] * shard_count
+    for part_num in longest_first(part_numbers, costs):
+        shard = totals.index(min(totals))
+        shards[shard].append(part_num)
+        totals[shard] += costs[part_num]
+    return shards
+
+
+def stratified_sample(part_numbers, costs, fraction):
+    # returns about fraction of part_numbers in list order: the parts are sorted by cost and split into
+    # equal groups, the middle part of every group is taken. Without a plan (equal costs) the parts are
+    # spread evenly over the list
+    part_numbers = list(part_numbers)
+    if fraction >= 1 or not part_numbers:
+        return part_numbers
+    count = max(1, int(round(len(part_numbers) * fraction)))
+    ranked = sorted(part_numbers, key=lambda part_num: costs[part_num])
+    step = len(ranked) / float(count)
+    return sorted(ranked[int((n + 0.5) * step)] for n in range(count))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Free edge check of every exported part from one pass over the whole model.
+
+The export loop ran base.checks.mesh.SingleBounds on the visible shells of every part, i.e. an edge is
+free for a part if exactly one element of the part's PIDs uses it. This depends on the part: an edge
+between two PIDs is shared in the whole model but free for a part that only has one of them.
+
+FreeEdgeIndex keeps what is needed to answer this for any set of PIDs:
+    free_pids: PIDs with an edge that is free in the whole model (one SingleBounds check on the whole
+        database, or the deck), such an edge is free for every part with that PID
+    signatures: for every edge shared by elements of different PIDs, the PIDs of its elements (one per
+        element, sorted). Edges with the same PIDs give the same signature, so there are far fewer
+        signatures than edges
+A part has free edges if it has one of the free_pids, or if exactly one element of a signature of its
+PIDs belongs to the part.
+"""
+
+from collections import defaultdict
+
+from nastran_deck import DECK_ENCODING, SHELL_CARDS, iter_cards, element_grids
+
+
+class FreeEdgeIndex:
+    def __init__(self, free_pids, signatures):
+        self.free_pids = set(free_pids)
+        self.signatures = []
+        self.pid_signatures = defaultdict(list)  # pid: indices of its signatures
+        for signature in signatures:
+            for pid in set(signature):
+                self.pid_signatures[pid].append(len(self.signatures))
+            self.signatures.append(signature)
+
+    def part_has_free_edges(self, pids):
+        pids = set(pids)
+        if not pids.isdisjoint(self.free_pids):
+            return True
+        checked = set()
+        for pid in pids:
+            for index in self.pid_signatures.get(pid, ()):
+                if index in checked:
+                    continue
+                checked.add(index)
+                if sum(1 for other in self.signatures[index] if other in pids) == 1:
+                    return True
+        return False
+
+
+def deck_edges(deck_file):
+    # returns {edge: [pid of every element using the edge]} of the shell elements of a Nastran deck
+    edges = defaultdict(list)
+    with open(deck_file, "r", encoding=DECK_ENCODING, newline="") as deck:
+        for card in iter_cards(deck):
+            if card.name not in SHELL_CARDS:
+                continue
+            eid, pid, grids = element_grids(card)
+            for n in range(len(grids)):
+                start, end = grids[n], grids[(n + 1) % len(grids)]
+                edges[(start, end) if start < end else (end, start)].append(pid)
+    return edges
+
+
+def free_edge_index(deck_file, free_pids=None):
+    # free_pids: PIDs with free edges in the whole model (e.g. from SingleBounds), added to the PIDs
+    # with an edge of a single element in the deck
+    deck_free_pids = set()
+    signatures = set()
+    for pids in deck_edges(deck_file).values():
+        if len(pids) == 1:
+            deck_free_pids.add(pids[0])
+        elif len(set(pids)) > 1:
+            # an edge of a single PID is used by 0 or 2+ elements of any part, so it is never free
+            signatures.add(tuple(sorted(pids)))
+    if free_pids is not None:
+        deck_free_pids.update(free_pids)
+    return FreeEdgeIndex(deck_free_pids, sorted(signatures))
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Binary mesh bundles (.npz) of the exported part decks, and the conversion back to Nastran.
+
+The .nas files are fixed format text that every solver preprocessing step has to parse again. A mesh
+bundle holds the same part as NumPy arrays in a compressed .npz file:
+    grid_ids (n,), grid_coords (n, 3), grid_cp (n,), grid_cd (n,): GRID cards (CP and CD 0 if blank)
+    element_ids (m,), element_types (m,), element_pids (m,), connectivity (m, 4): shell elements,
+        element_types indexes element_type_names, the 4th grid of triangles is -1
+    pid_ids (k,), pid_names (k,): PSHELL ids and names (from the $ANSA_NAME_COMMENT lines)
+    grid_comment_ids, grid_comments, element_comment_ids, element_comments: the comment lines above
+        the GRIDs and elements that have any, by id
+    header: lines in front of BEGIN BULK
+    cards: every other card as text with its comment lines (PSHELL, MAT1, CORD2R, ...), and GRIDs or
+        elements with fields that are not stored in the arrays (PS, SEID, THETA, ZOFFS, ...)
+Ids are stored as int32 (short format fields hold at most 8 digits) and the arrays are compressed, so
+a bundle is a fraction of the size of the deck and loads without parsing text. Most of the load time
+of a compressed bundle is zlib (about 0.4 s for a million elements), bundles written with
+compress=False (to-npz --store) are about twice as large and load several times faster.
+
+write_nastran() writes a bundle back as a short format deck: the header, the cards, the GRIDs and the
+elements, then ENDDATA, every card with the comment lines it had. Coordinates are written with the
+fewest digits that read back as the same number, so a deck written by ANSA in short format and its
+converted bundle hold the same values. check_round_trip() compares a deck with the deck written from
+its bundle. The written deck is the same deck normalized: the GRIDs and elements come after the other
+cards, their fields are short format with CP and CD blank if 0, and comment lines that are not above a
+card are written in front of ENDDATA.
+
+    python mesh_bundle.py to-npz C:/exports/vehicle/nastran_files/PART.nas PART.npz
+    python mesh_bundle.py to-nas PART.npz PART.nas
+    python mesh_bundle.py check C:/exports/vehicle/nastran_files/PART.nas
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+from nastran_deck import (
+    DECK_ENCODING,
+    SHELL_CARDS,
+    is_begin_bulk,
+    iter_cards,
+    iter_deck_lines,
+    card_data,
+    field_int,
+    field_float,
+)
+
+MESH_BUNDLE_DIR = "mesh_bundles"
+ELEMENT_TYPE_NAMES = sorted(SHELL_CARDS)
+ANSA_NAME_COMMENT = "$ANSA_NAME_COMMENT;"
+
+MeshBundle = namedtuple(
+    "MeshBundle",
+    [
+        "grid_ids",
+        "grid_coords",
+        "grid_cp",
+        "grid_cd",
+        "element_ids",
+        "element_types",
+        "element_pids",
+        "connectivity",
+        "element_type_names",
+        "pid_ids",
+        "pid_names",
+        "header",
+        "cards",
+        "grid_comment_ids",
+        "grid_comments",
+        "element_comment_ids",
+        "element_comments",
+    ],
+)
+
+
+def mesh_bundle_file(output_dir, part):
+    return os.path.join(output_dir, MESH_BUNDLE_DIR, part + ".npz")
+
+
+def _blank(fields):
+    return all(not field for field in fields)
+
+
+def read_mesh_bundle(nas_file):
+    # returns the MeshBundle of a deck, included files are read as part of the deck
+    header = []
+    cards = []
+    grid_ids = []
+    grid_coords = []
+    grid_cp = []
+    grid_cd = []
+    element_ids = []
+    element_types = []
+    element_pids = []
+    connectivity = []
+    pid_names = {}
+    grid_comments = {}
+    element_comments = {}
+    lines = iter_deck_lines(nas_file)
+    for line in lines:
+        header.append(line)
+        if is_begin_bulk(line):
+            break
+    for card in iter_cards(lines):
+        if card.name == "ENDDATA":
+            cards.extend(card.comments)
+            continue
+        data = card_data(card)
+        if card.name == "GRID" and _blank(data[6:]):
+            data += [""] * (6 - len(data))
+            grid_ids.append(field_int(data[0]))
+            grid_cp.append(field_int(data[1], 0))
+            grid_coords.append([field_float(data[n], 0.0) for n in (2, 3, 4)])
+            grid_cd.append(field_int(data[5], 0))
+            if card.comments:
+                grid_comments[grid_ids[-1]] = "".join(card.comments)
+            continue
+        if card.name in SHELL_CARDS:
+            num_grids = SHELL_CARDS[card.name]
+            if _blank(data[2 + num_grids :]):
+                data += [""] * (2 + num_grids - len(data))
+                eid = field_int(data[0])
+                element_ids.append(eid)
+                element_types.append(ELEMENT_TYPE_NAMES.index(card.name))
+                element_pids.append(field_int(data[1], eid))
+                grids = [field_int(field, -1) for field in data[2 : 2 + num_grids]]
+                connectivity.append(grids + [-1] * (4 - num_grids))
+                if card.comments:
+                    element_comments[eid] = "".join(card.comments)
+                continue
+        if card.name == "PSHELL":
+            pid_names[field_int(data[0])] = ""
+            for comment in card.comments:
+                # $ANSA_NAME_COMMENT;id;PSHELL;name;
+                fields = comment.rstrip("\r\n").split(";")
+                if comment.startswith(ANSA_NAME_COMMENT) and len(fields) > 3:
+                    pid_names[field_int(data[0])] = fields[3]
+        cards.append("".join(card.comments + card.lines))
+    return MeshBundle(
+        np.array(grid_ids, dtype=np.int32),
+        np.array(grid_coords, dtype=np.float64).reshape(-1, 3),
+        np.array(grid_cp, dtype=np.int32),
+        np.array(grid_cd, dtype=np.int32),
+        np.array(element_ids, dtype=np.int32),
+        np.array(element_types, dtype=np.int8),
+        np.array(element_pids, dtype=np.int32),
+        np.array(connectivity, dtype=np.int32).reshape(-1, 4),
+        np.array(ELEMENT_TYPE_NAMES),
+        np.array(list(pid_names), dtype=np.int32),
+        np.array(list(pid_names.values()), dtype=str),
+        "".join(header),
+        np.array(cards, dtype=str),
+        np.array(list(grid_comments), dtype=np.int32),
+        np.array(list(grid_comments.values()), dtype=str),
+        np.array(list(element_comments), dtype=np.int32),
+        np.array(list(element_comments.values()), dtype=str),
+    )
+
+
+def save_mesh_bundle(bundle, npz_file, compress=True):
+    temp_file = npz_file + ".tmp.npz"
+    arrays = bundle._asdict()
+    arrays["header"] = np.array(bundle.header)
+    if compress:
+        np.savez_compressed(temp_file, **arrays)
+    else:
+        np.savez(temp_file, **arrays)
+    os.replace(temp_file, npz_file)
+
+
+def write_mesh_bundle(nas_file, npz_file, compress=True):
+    # converts a deck to a bundle, the directory of npz_file is created if needed
+    os.makedirs(os.path.dirname(os.path.abspath(npz_file)), exist_ok=True)
+    save_mesh_bundle(read_mesh_bundle(nas_file), npz_file, compress)
+
+
+def load_mesh_bundle(npz_file):
+    with np.load(npz_file, allow_pickle=False) as arrays:
+        values = dict(
+            (name, arrays[name]) for name in MeshBundle._fields if name in arrays
+        )
+    for name in MeshBundle._fields:
+        if name not in values:
+            # bundles written before the comments were kept
+            values[name] = np.array([], dtype=np.int32 if name.endswith("ids") else str)
+    values["header"] = str(values["header"])
+    return MeshBundle(**values)
+
+
+def short_real(value):
+    # text of at most 8 characters for a Nastran short field that reads back as value, with the
+    # fewest digits. The exponent is written without E (1.5-5). Values that need more digits than
+    # fit (e.g. from a long format deck) are rounded
+    text = _fixed_real(repr(float(value)))
+    if "e" not in text and "n" not in text and len(text) <= 8:
+        return text
+    candidates = []
+    for digits in range(8):
+        mantissa, exponent = ("%.*e" % (digits, value)).split("e")
+        mantissa = mantissa.rstrip("0") if "." in mantissa else mantissa + "."
+        text = mantissa + ("%+d" % int(exponent))
+        if len(text) <= 8:
+            if field_float(text) == value:
+                return text
+            candidates.append(text)
+    for digits in range(7, -1, -1):
+        text = _fixed_real("%.*f" % (digits, value))
+        if "." not in text:
+            # a real field needs the decimal point
+            text += "."
+        if len(text) <= 8:
+            candidates.append(text)
+            break
+    if not candidates:
+        raise ValueError("%r does not fit in a short field" % value)
+    return min(candidates, key=lambda text: abs(field_float(text) - value))
+
+
+def _fixed_real(text):
+    # 1.50 -> 1.5, 2.0 -> 2., 0.5 -> .5, -0.5 -> -.5
+    if "." not in text or "e" in text:
+        return text
+    text = text.rstrip("0")
+    if text.lstrip("-").startswith("0.") and not text.endswith("0."):
+        text = text.replace("0.", ".", 1)
+    return text
+
+
+def _short_int(value):
+    return "%8d" % value if value else "%8s" % ""
+
+
+def write_nastran(bundle, nas_file):
+    # writes the bundle as a short format deck
+    with open(nas_file, "w", encoding=DECK_ENCODING, newline="") as f:
+        f.write(bundle.header)
+        # comment lines that are not above a card (in front of ENDDATA) are written at the end
+        trailing = []
+        for card in bundle.cards:
+            if all(line.startswith("$") for line in card.splitlines()):
+                trailing.append(card)
+            else:
+                f.write(card)
+        grid_comments = dict(
+            zip(bundle.grid_comment_ids.tolist(), bundle.grid_comments.tolist())
+        )
+        element_comments = dict(
+            zip(bundle.element_comment_ids.tolist(), bundle.element_comments.tolist())
+        )
+        coords = bundle.grid_coords.tolist()
+        for n, grid_id in enumerate(bundle.grid_ids.tolist()):
+            if grid_id in grid_comments:
+                f.write(grid_comments[grid_id])
+            f.write(
+                "GRID    %8d%s%s%s\n"
+                % (
+                    grid_id,
+                    _short_int(int(bundle.grid_cp[n])),
+                    "".join("%8s" % short_real(x) for x in coords[n]),
+                    _short_int(int(bundle.grid_cd[n])).rstrip(),
+                )
+            )
+        names = [str(name) for name in bundle.element_type_names]
+        types = bundle.element_types.tolist()
+        pids = bundle.element_pids.tolist()
+        connectivity = bundle.connectivity.tolist()
+        for n, eid in enumerate(bundle.element_ids.tolist()):
+            name = names[types[n]]
+            grids = connectivity[n][: SHELL_CARDS[name]]
+            if eid in element_comments:
+                f.write(element_comments[eid])
+            f.write(
+                "%-8s%8d%8d%s\n"
+                % (name, eid, pids[n], "".join("%8d" % grid for grid in grids))
+            )
+        f.writelines(trailing)
+        f.write("ENDDATA\n")
+
+
+def bundles_equal(first, second):
+    # the fields of two bundles are equal (cards as text, arrays value by value)
+    for name in MeshBundle._fields:
+        a, b = getattr(first, name), getattr(second, name)
+        if name == "header":
+            if a != b:
+                return False
+        elif a.shape != b.shape or not np.array_equal(a, b):
+            return False
+    return True
+
+
+def check_round_trip(nas_file):
+    # writes the bundle of nas_file back to Nastran and checks that it reads as the same bundle
+    bundle = read_mesh_bundle(nas_file)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        npz_file = os.path.join(temp_dir, "part.npz")
+        save_mesh_bundle(bundle, npz_file)
+        loaded = load_mesh_bundle(npz_file)
+        written = os.path.join(temp_dir, "part.nas")
+        write_nastran(loaded, written)
+        return bundles_equal(bundle, loaded) and bundles_equal(
+            bundle, read_mesh_bundle(written)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert part decks to .npz mesh bundles and back."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_npz = subparsers.add_parser("to-npz", help="convert a deck to a bundle")
+    to_npz.add_argument("nas_file")
+    to_npz.add_argument("npz_file")
+    to_npz.add_argument(
+        "--store", action="store_true", help="do not compress the arrays"
+    )
+    to_nas = subparsers.add_parser("to-nas", help="convert a bundle to a deck")
+    to_nas.add_argument("npz_file")
+    to_nas.add_argument("nas_file")
+    check = subparsers.add_parser("check", help="round trip check of decks")
+    check.add_argument("nas_files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "to-npz":
+        write_mesh_bundle(args.nas_file, args.npz_file, not args.store)
+    elif args.command == "to-nas":
+        write_nastran(load_mesh_bundle(args.npz_file), args.nas_file)
+    else:
+        failed = [
+            nas_file for nas_file in args.nas_files if not check_round_trip(nas_file)
+        ]
+        for nas_file in failed:
+            sys.stdout.write("round trip differs: %s\n" % nas_file)
+        sys.stdout.write(
+            "%d of %d decks checked\n"
+            % (len(args.nas_files) - len(failed), len(args.nas_files))
+        )
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
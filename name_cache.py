@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of the PSHELL name facts derived by CollectPIDNames.py and OutputPIDtoNastran.py.
+
+Both scripts read every PSHELL name and derive the same things from it: the stripped name, the parts
+of an interface name, the base part, _AUX index and suffix of every side (pid_matching.PidClassifier)
+and whether a part is ignored. The cache keeps them next to Unique_PIDs.xlsx in two files:
+    pid_name_cache.json.gz:
+        database, fingerprint: ANSA database name and sha1 of the (id, name) of every PSHELL. When both
+            are unchanged, the unique part list of CollectPIDNames.py is taken as it is
+        classifiers: one section per set of ignore lists (classifier_key) with the ignore reason of
+            every part name and the part index of the last export (part name: PSHELL ids), stored with
+            the database, fingerprint and part list it was built from. When they are unchanged the
+            index is taken as it is and no name is parsed
+    pid_name_cache_names.json.gz: the classification of every PSHELL name, per classifier section. It is
+        only read when the part index has to be rebuilt: a name that is not in it (new or renamed
+        PSHELL) is classified, the others are not parsed again. Names that are no longer in the model
+        are dropped when the cache is saved
+
+The classification only depends on the name and the ignore lists, so the entries of a section are
+reused for another database as well. A file is only written again if something in it changed.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+
+from pid_matching import INTERFACE_SEPARATOR, PidName, PidSide
+
+CACHE_FILE_NAME = "pid_name_cache.json.gz"
+NAMES_FILE_NAME = "pid_name_cache_names.json.gz"
+CACHE_VERSION = 2
+
+
+def cache_file_name(output_dir):
+    return os.path.join(output_dir, CACHE_FILE_NAME)
+
+
+def names_file_name(output_dir):
+    return os.path.join(output_dir, NAMES_FILE_NAME)
+
+
+def pid_fingerprint(pids, names=None):
+    # sha1 of the id and name of every PSHELL, names replaces the names of the pids if given
+    sha = hashlib.sha1()
+    for n, pid in enumerate(pids):
+        name = names[n] if names is not None else pid._name
+        sha.update(("%s\t%s\n" % (pid._id, name)).encode("utf-8"))
+    return sha.hexdigest()
+
+
+def part_list_key(part_names):
+    return hashlib.sha1("\n".join(part_names).encode("utf-8")).hexdigest()
+
+
+def classifier_key(classifier):
+    # the classification depends on the ignore lists only
+    return hashlib.sha1(
+        json.dumps(
+            [
+                classifier.ignore_suffix_list,
+                classifier.ignore_prefix_list,
+                sorted(classifier.ignore_pid_list),
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def encode_name(parsed):
+    # compact form of a PidName: 0 if invalid, else [base, aux, suffix, cuts] of every side
+    if not parsed.valid:
+        return 0
+    return [
+        [side.base, side.aux, side.suffix, list(side.cuts)] for side in parsed.sides
+    ]
+
+
+def decode_name(name, entry):
+    if not entry:
+        return PidName(name, (), False)
+    texts = name.split(INTERFACE_SEPARATOR)
+    sides = []
+    for n, (base, aux, suffix, cuts) in enumerate(entry):
+        partner = texts[1 - n] if len(texts) == 2 else None
+        sides.append(PidSide(texts[n], base, aux, suffix, partner, tuple(cuts)))
+    return PidName(name, tuple(sides), True)
+
+
+def _read(cache_file):
+    # contents of a cache file, None if it is missing, damaged or of another version
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with gzip.open(cache_file, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None  # damaged cache, it is written again
+    if data.get("version") != CACHE_VERSION:
+        return None
+    return data
+
+
+def _write(cache_file, data):
+    temp_file = "%s.%d.tmp" % (cache_file, os.getpid())
+    with gzip.open(temp_file, "wt", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(temp_file, cache_file)
+
+
+class NameCache:
+    def __init__(self, output_dir, db_name):
+        self.cache_file = cache_file_name(output_dir)
+        self.names_file = names_file_name(output_dir)
+        self.db_name = db_name
+        self.data = _read(self.cache_file) or {
+            "version": CACHE_VERSION,
+            "classifiers": {},
+        }
+        self.num_classified = 0  # names classified by the last classify()
+        # classifier_key: {name: entry}, read by the first classify()
+        self._names = None
+        self._dirty = False
+        self._names_dirty = False
+        # classifier_key: classifier whose ignore reasons are saved
+        self._classifiers = {}
+
+    def _same_model(self, fingerprint):
+        return (
+            self.data.get("database") == self.db_name
+            and self.data.get("fingerprint") == fingerprint
+        )
+
+    def unique_pid_list(self, fingerprint):
+        # unique part list of CollectPIDNames.py if the model did not change, else None
+        if self._same_model(fingerprint):
+            return self.data.get("unique_pid_list")
+        return None
+
+    def set_unique_pid_list(self, fingerprint, unique_pid_list):
+        # fingerprint: of the PSHELL names after renaming
+        if self._same_model(fingerprint) and self.data.get("unique_pid_list") == list(
+            unique_pid_list
+        ):
+            return
+        self.data["database"] = self.db_name
+        self.data["fingerprint"] = fingerprint
+        self.data["unique_pid_list"] = list(unique_pid_list)
+        self._dirty = True
+
+    def _section(self, classifier):
+        key = classifier_key(classifier)
+        if key not in self._classifiers:
+            self._classifiers[key] = classifier
+            section = self.data["classifiers"].setdefault(key, {})
+            classifier.ignore_reasons.update(section.get("ignored", {}))
+        return self.data["classifiers"][key]
+
+    def part_index(self, classifier, fingerprint, part_names):
+        # ({part name: [PSHELL ids]}, invalid pid names) of the last export if the database, its
+        # PSHELLs and the part list did not change, else None
+        index = self._section(classifier).get("index")
+        if (
+            index is None
+            or index["database"] != self.db_name
+            or index["fingerprint"] != fingerprint
+            or index["parts"] != part_list_key(part_names)
+        ):
+            return None
+        return index["matches"], index["invalid"]
+
+    def set_part_index(self, classifier, fingerprint, part_names, matches, invalid):
+        # matches: {part name: [PSHELLs]} of PidClassifier.build_part_index
+        self._section(classifier)["index"] = {
+            "database": self.db_name,
+            "fingerprint": fingerprint,
+            "parts": part_list_key(part_names),
+            "matches": dict(
+                (part, [pid._id for pid in pids]) for part, pids in matches.items()
+            ),
+            "invalid": list(invalid),
+        }
+        self._dirty = True
+
+    def classify(self, classifier, pids):
+        # returns the PidName of every pid (same order), only names that are not in the cache are parsed
+        # the cached ignore reasons of the part names are added to the classifier
+        self._section(classifier)
+        key = classifier_key(classifier)
+        if self._names is None:
+            self._names = (_read(self.names_file) or {}).get("classifiers", {})
+        entries = self._names.get(key, {})
+        names = []
+        used_entries = {}
+        self.num_classified = 0
+        for pid in pids:
+            name = pid._name
+            entry = entries.get(name)
+            if entry is None:
+                parsed = classifier.classify(name)
+                entry = encode_name(parsed)
+                self.num_classified += 1
+            else:
+                parsed = decode_name(name, entry)
+            used_entries[name] = entry
+            names.append(parsed)
+        if self.num_classified or len(used_entries) != len(entries):
+            self._names_dirty = True
+        self._names[key] = used_entries
+        return names
+
+    def save(self):
+        # ignore reasons are taken from the classifiers, files are only written if they changed
+        for key, classifier in self._classifiers.items():
+            section = self.data["classifiers"][key]
+            if section.get("ignored") != classifier.ignore_reasons:
+                section["ignored"] = dict(classifier.ignore_reasons)
+                self._dirty = True
+        if self._dirty:
+            _write(self.cache_file, self.data)
+            self._dirty = False
+        if self._names_dirty:
+            _write(
+                self.names_file,
+                {"version": CACHE_VERSION, "classifiers": self._names},
+            )
+            self._names_dirty = False
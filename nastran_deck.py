@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+Reading of Nastran bulk data decks written by ANSA and splitting of one full deck into part decks.
+"""
+
+# Exporting every part with base.OutputNastran(mode="visible") re-serializes the shared GRIDs and the
+# header of the model once per part. Instead the model can be written once and split here into the
+# same nastran_files/<part>.nas files. The deck is read twice, line by line:
+#   pass 1: find the GRIDs referenced by the shell elements and the materials used by the PSHELLs
+#   pass 2: route every card (with the comment lines written above it) to the part decks
+# Only ids are kept in memory, card text is written out through small per-part buffers. The buffers of
+# all parts together hold at most memory_budget characters, above it the largest ones are written out.
+#
+# Each part deck gets:
+#   - the lines in front of BEGIN BULK (and BEGIN BULK itself)
+#   - the PSHELL cards of its PIDs and the shell elements that reference them
+#   - the GRIDs referenced by those elements and the materials (every MAT* card, e.g. MAT1 and MATT1)
+#     with the id of a MID1 to MID4 field of those PSHELLs
+#   - coordinate systems and PARAM cards
+#   - ENDDATA
+# Any other card (solid elements, other properties, rigid elements, ...) is not written to the part
+# decks, the number of such cards is logged as a warning.
+#
+# An interface PID PART_A.I.PART_B is part of both decks. With interface_includes its PSHELL, its
+# elements and the GRIDs used only by its elements are written once to interfaces/<name>.inc instead,
+# and both part decks get an INCLUDE 'interfaces/<name>.inc' line after BEGIN BULK. GRIDs that are also
+# used by other PIDs stay in the part decks, so no deck defines a GRID twice. inline_includes() turns
+# such a deck back into a standalone file.
+
+import os
+import re
+import gzip
+from collections import namedtuple
+
+# shell element cards and their number of grids
+SHELL_CARDS = {"CTRIA3": 3, "CQUAD4": 4, "CTRIAR": 3, "CQUADR": 4}
+# cards written to every part deck
+GLOBAL_CARDS = {"CORD1R", "CORD1C", "CORD1S", "CORD2R", "CORD2C", "CORD2S", "PARAM"}
+
+# read and write decks as latin-1 with line endings untouched, so the cards are copied byte for byte
+DECK_ENCODING = "latin-1"
+
+# directory of the interface include files, relative to the part decks
+INCLUDE_DIR = "interfaces"
+
+# name: card name in upper case without '*', lines: card lines, comments: comment lines above the card
+Card = namedtuple("Card", ["name", "lines", "comments"])
+
+
+def is_begin_bulk(line):
+    return line.strip().upper().replace(" ", "") == "BEGINBULK"
+
+
+def card_name(line):
+    if "," in line[:8]:
+        name = line.split(",", 1)[0]
+    else:
+        name = line[:8]
+    return name.strip().upper().rstrip("*")
+
+
+def card_fields(line):
+    # fields of the first line of a card, field 0 is the card name
+    line = line.rstrip("\r\n")
+    if "," in line:
+        return [field.strip() for field in line.split(",")]
+    width = 16 if line[:8].rstrip().endswith("*") else 8
+    fields = [line[:8].strip()]
+    for start in range(8, 72, width):
+        fields.append(line[start : start + width].strip())
+    return fields
+
+
+def card_data(card):
+    # data fields of all lines of a card, without the card name and continuation markers
+    # (a free field line is cut at 8 data fields and padded to 8 if the card goes on)
+    data = []
+    for n, line in enumerate(card.lines):
+        fields = card_fields(line)[1:]
+        if "," in line:
+            fields = fields[:8]
+            if n + 1 < len(card.lines):
+                fields += [""] * (8 - len(fields))
+        data.extend(fields)
+    return data
+
+
+def field_int(field, default=None):
+    try:
+        return int(field)
+    except ValueError:
+        return default
+
+
+_EXPONENT = re.compile(r"([0-9.])([+-])")
+
+
+def field_float(field, default=None):
+    # Nastran reals may leave out the E of the exponent (1.5-3) or use D (1.5D-3)
+    try:
+        return float(field)
+    except ValueError:
+        pass
+    try:
+        return float(_EXPONENT.sub(r"\1E\2", field.upper().replace("D", "E")))
+    except ValueError:
+        return default
+
+
+def is_material(name):
+    # MAT1, MAT2, ..., MAT10 and their temperature (MATT*) and nonlinear (MATS1) extensions, all with
+    # the material id in the first field
+    return name.startswith("MAT")
+
+
+_MATERIAL_DEFINITION = re.compile(r"MAT[0-9]+$")
+
+
+def pshell_mids(card):
+    # material ids of a PSHELL: MID1, MID2, MID3 and MID4 (on the continuation line)
+    data = card_data(card) + [""] * 11
+    mids = [field_int(data[n]) for n in (1, 3, 5, 10)]
+    return [mid for mid in mids if mid is not None]
+
+
+def include_file(line):
+    # file name of an INCLUDE 'file' line, None for other lines
+    if not line[:7].upper() == "INCLUDE":
+        return None
+    quoted = line[7:].strip()
+    if len(quoted) < 2 or quoted[0] not in "'\"":
+        return None
+    return quoted[1 : quoted.index(quoted[0], 1)]
+
+
+def open_deck(deck_file):
+    # text stream of a deck, decks written with deck_output="gzip" (<part>.nas.gz) are decompressed
+    if deck_file.endswith(".gz"):
+        return gzip.open(deck_file, "rt", encoding=DECK_ENCODING, newline="")
+    return open(deck_file, "r", encoding=DECK_ENCODING, newline="")
+
+
+def iter_deck_lines(deck_file):
+    # lines of a deck with the INCLUDE lines replaced by the lines of the included files
+    # (relative include paths are relative to the directory of the deck)
+    with open_deck(deck_file) as deck:
+        for line in deck:
+            name = include_file(line)
+            if name is None:
+                yield line
+                continue
+            path = os.path.join(os.path.dirname(os.path.abspath(deck_file)), name)
+            for include_line in iter_deck_lines(path):
+                yield include_line
+
+
+def inline_includes(deck_file, output_file=None):
+    # writes the deck with its includes inlined to output_file (default: replaces deck_file)
+    temp_file = (output_file or deck_file) + ".tmp"
+    with open(temp_file, "w", encoding=DECK_ENCODING, newline="") as f:
+        f.writelines(iter_deck_lines(deck_file))
+    os.replace(temp_file, output_file or deck_file)
+
+
+def iter_cards(lines):
+    # group deck lines into cards
+    # continuation lines start with '+', '*', ',' or a blank first field, comment lines start with '$'
+    comments = []
+    card = None
+    for line in lines:
+        if line.startswith("$"):
+            comments.append(line)
+            continue
+        if not line.strip():
+            continue
+        if card is not None and line[0] in "+*, \t":
+            card.lines.append(line)
+            continue
+        if card is not None:
+            yield card
+        card = Card(card_name(line), [line], comments)
+        comments = []
+    if card is not None:
+        yield card
+    if comments:
+        yield Card("", [], comments)
+
+
+def validate_deck(deck_file):
+    # returns the problems found in a written deck: no ENDDATA, elements with GRIDs or PSHELLs with
+    # materials that are not in the deck (or its includes)
+    problems = []
+    grids = set()
+    used_grids = set()
+    mids = set()
+    used_mids = set()
+    has_enddata = False
+    for card in iter_cards(iter_deck_lines(deck_file)):
+        if card.name == "GRID":
+            grids.add(field_int(card_fields(card.lines[0])[1]))
+        elif card.name in SHELL_CARDS:
+            used_grids.update(element_grids(card)[2])
+        elif card.name == "PSHELL":
+            used_mids.update(pshell_mids(card))
+        elif _MATERIAL_DEFINITION.match(card.name):
+            mids.add(field_int(card_fields(card.lines[0])[1]))
+        elif card.name == "ENDDATA":
+            has_enddata = True
+    if not has_enddata:
+        problems.append("no ENDDATA card")
+    missing = used_grids - grids - {None}
+    if missing:
+        problems.append("%d GRIDs used by elements are not defined" % len(missing))
+    missing = used_mids - mids
+    if missing:
+        problems.append("%d materials used by PSHELLs are not defined" % len(missing))
+    return problems
+
+
+def element_grids(card):
+    # element id, pid and grid ids of a shell element card, in large field format the last grids are
+    # on the continuation line
+    data = card_data(card)
+    data += [""] * (2 + SHELL_CARDS[card.name] - len(data))
+    eid = field_int(data[0])
+    pid = field_int(data[1], eid)  # a blank PID defaults to the element id
+    grids = [field_int(field) for field in data[2 : 2 + SHELL_CARDS[card.name]]]
+    return eid, pid, grids
+
+
+def split_nastran_deck(
+    deck_file,
+    part_pids,
+    output_dir,
+    buffer_size=1 << 16,
+    interface_includes=None,
+    memory_budget=1 << 24,
+    log=None,
+):
+    # deck_file: full Nastran deck, part_pids: {part name: ids of the PSHELLs of the part}
+    # interface_includes: {pid: include name} of the PIDs written to output_dir/interfaces/<name>.inc
+    # buffer_size: characters buffered per part, memory_budget: characters buffered for all parts
+    # log: logger that gets a warning with the cards that are not written to any part deck
+    # writes output_dir/<part>.nas for every part and returns {part name: file path}
+    pid_parts = {}
+    for part, pids in part_pids.items():
+        for pid in pids:
+            parts = pid_parts.setdefault(pid, [])
+            if part not in parts:
+                parts.append(part)
+    interface_includes = dict(
+        (pid, name)
+        for pid, name in (interface_includes or {}).items()
+        if pid in pid_parts
+    )
+    # the cards of an interface PID go to its include file only
+    include_targets = dict((pid, [name]) for pid, name in interface_includes.items())
+
+    # pass 1: grids of the routed elements and materials of the routed PSHELLs
+    grid_pids = {}  # grid id -> pid, or tuple of pids for grids shared by several PIDs
+    mat_parts = {}
+    has_begin_bulk = False
+    with open(deck_file, "r", encoding=DECK_ENCODING, newline="") as deck:
+        for card in iter_cards(deck):
+            if card.name in SHELL_CARDS:
+                eid, pid, grids = element_grids(card)
+                if pid not in pid_parts:
+                    continue
+                for grid in grids:
+                    if grid is None:
+                        continue
+                    current = grid_pids.get(grid)
+                    if current is None:
+                        grid_pids[grid] = pid
+                    elif isinstance(current, tuple):
+                        if pid not in current:
+                            grid_pids[grid] = current + (pid,)
+                    elif current != pid:
+                        grid_pids[grid] = (current, pid)
+            elif card.name == "PSHELL":
+                pid = field_int(card_fields(card.lines[0])[1])
+                if pid not in pid_parts:
+                    continue
+                for mid in pshell_mids(card):
+                    mat_parts.setdefault(mid, set()).update(pid_parts[pid])
+            elif card.lines and is_begin_bulk(card.lines[0]):
+                has_begin_bulk = True
+
+    # pass 2: route the cards to the part decks
+    files = _PartFiles(output_dir, part_pids, buffer_size, memory_budget)
+    includes = None
+    if interface_includes:
+        include_dir = os.path.join(output_dir, INCLUDE_DIR)
+        if not os.path.isdir(include_dir):
+            os.makedirs(include_dir)
+        includes = _PartFiles(
+            include_dir,
+            set(interface_includes.values()),
+            buffer_size,
+            memory_budget,
+            ".inc",
+        )
+        includes.start([])
+    with open(deck_file, "r", encoding=DECK_ENCODING, newline="") as deck:
+        header = []
+        if has_begin_bulk:
+            for line in deck:
+                header.append(line)
+                if is_begin_bulk(line):
+                    break
+        files.start(header)
+        part_includes = {}  # PIDs with the same name share one include file
+        for pid, name in sorted(interface_includes.items()):
+            for part in pid_parts[pid]:
+                names = part_includes.setdefault(part, [])
+                if name not in names:
+                    names.append(name)
+        for part, names in part_includes.items():
+            files.write(
+                [part],
+                ["INCLUDE '%s/%s.inc'\n" % (INCLUDE_DIR, name) for name in names],
+            )
+
+        trailer = []
+        dropped = {}  # card name: number of cards of a type that is not routed
+        for card in iter_cards(deck):
+            text = card.comments + card.lines
+            if card.name == "ENDDATA" or trailer:
+                trailer.extend(text)
+                continue
+            if card.name in SHELL_CARDS:
+                eid, pid, grids = element_grids(card)
+                if pid in include_targets:
+                    includes.write(include_targets[pid], text)
+                else:
+                    files.write(pid_parts.get(pid, ()), text)
+            elif card.name == "GRID":
+                pids = grid_pids.get(field_int(card_fields(card.lines[0])[1]))
+                if pids is None:
+                    continue
+                if pids in include_targets:
+                    includes.write(include_targets[pids], text)
+                elif isinstance(pids, tuple):
+                    parts = []
+                    for pid in pids:
+                        parts.extend(
+                            part for part in pid_parts[pid] if part not in parts
+                        )
+                    files.write(parts, text)
+                else:
+                    files.write(pid_parts[pids], text)
+            elif card.name == "PSHELL":
+                pid = field_int(card_fields(card.lines[0])[1])
+                if pid in include_targets:
+                    includes.write(include_targets[pid], text)
+                else:
+                    files.write(pid_parts.get(pid, ()), text)
+            elif is_material(card.name):
+                mid = field_int(card_fields(card.lines[0])[1])
+                files.write(mat_parts.get(mid, ()), text)
+            elif card.name in GLOBAL_CARDS:
+                files.write(part_pids, text)
+            elif card.name:
+                dropped[card.name] = dropped.get(card.name, 0) + 1
+        files.finish(trailer)
+        if includes is not None:
+            includes.finish([])
+    if dropped and log is not None:
+        log.warning(
+            "%d cards are not written to the part decks: %s",
+            sum(dropped.values()),
+            ", ".join("%d %s" % (dropped[name], name) for name in sorted(dropped)),
+        )
+    return files.paths
+
+
+class _PartFiles:
+    # buffered output of the part decks, a file is only open while its buffer is written
+    # a buffer is written out when it holds buffer_size characters, and when all buffers together hold
+    # more than memory_budget characters the largest ones are written out until half of it is left
+    def __init__(self, output_dir, parts, buffer_size, memory_budget, extension=".nas"):
+        self.paths = {
+            part: os.path.join(output_dir, part + extension) for part in parts
+        }
+        self.buffer_size = buffer_size
+        self.memory_budget = memory_budget
+        self.buffered = 0  # characters in all buffers
+        self.peak_buffered = 0
+        self._buffers = {}
+        self._sizes = {}
+
+    def start(self, header):
+        for path in self.paths.values():
+            with open(path, "w", encoding=DECK_ENCODING, newline="") as f:
+                f.writelines(header)
+
+    def write(self, parts, lines):
+        length = sum(len(line) for line in lines)
+        for part in parts:
+            buffer = self._buffers.setdefault(part, [])
+            buffer.extend(lines)
+            size = self._sizes.get(part, 0) + length
+            self._sizes[part] = size
+            self.buffered += length
+            if size >= self.buffer_size:
+                self._flush(part)
+            elif self.buffered > self.memory_budget:
+                self.peak_buffered = max(self.peak_buffered, self.buffered)
+                self._flush_largest()
+        self.peak_buffered = max(self.peak_buffered, self.buffered)
+
+    def _flush_largest(self):
+        for part in sorted(self._sizes, key=self._sizes.get, reverse=True):
+            if self.buffered <= self.memory_budget // 2:
+                break
+            self._flush(part)
+
+    def _flush(self, part):
+        with open(self.paths[part], "a", encoding=DECK_ENCODING, newline="") as f:
+            f.writelines(self._buffers.pop(part, []))
+        self.buffered -= self._sizes.pop(part, 0)
+
+    def finish(self, trailer):
+        for part in self.paths:
+            self._buffers.setdefault(part, []).extend(trailer)
+            self._flush(part)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Run OutputPIDtoNastran.py in several ANSA batch sessions at once.
+
+Example:
+    python parallel_export.py C:/exports/vehicle --db C:/models/vehicle.ansa --workers 16
+
+The output directory must contain Unique_PIDs.xlsx, like for the interactive script. Every worker opens
+the database in its own ANSA session, exports every n-th part of the list into output_dir/nastran_files
+and writes its summary rows to output_dir/shards. If output_dir has an export plan (export_plan.json,
+written by a dry run of OutputPIDtoNastran.py with plan_only), the parts are split into lists of about
+the same cost instead, every worker exports its most expensive parts first. When all workers are done the rows are merged into
+Unique_PIDs_Summary.xlsx in the order of the input list, their phase timing traces into
+export_trace.json and, with deck_output = "bundle", their nastran_files_<n>.tar bundles into
+nastran_files.tar.
+
+The command used to start a worker can be changed with --worker-command. It is split like a shell
+command and {python}, {script}, {db}, {job} and {shard} are replaced in every argument. The job file is
+also passed in the ANSA_EXPORT_JOB environment variable, which is how OutputPIDtoNastran.main() knows
+it runs as a worker. To run the workers without ANSA, e.g. with a stand-in ansa package on PYTHONPATH:
+    --worker-command "{python} {script}"
+"""
+
+import os
+import sys
+import json
+import shlex
+import argparse
+import subprocess
+
+from deck_sinks import bundle_file_name, merge_bundles
+from export_manifest import ExportManifest
+from summary_writer import merge_shard_summaries
+from phase_timing import merge_traces, trace_file_name
+
+JOB_ENV = "ANSA_EXPORT_JOB"
+DEFAULT_WORKER_COMMAND = (
+    "ansa64.sh -b -nolauncher -i {db} -exec load_script:{script} -exec main"
+)
+EXPORT_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "OutputPIDtoNastran.py"
+)
+
+
+def read_job():
+    # returns the job of this worker, or None if the script was not started by the coordinator
+    job_file = os.environ.get(JOB_ENV)
+    if not job_file:
+        return None
+    with open(job_file, "r") as f:
+        return json.load(f)
+
+
+def worker_command(template, job_file, shard_index, db):
+    values = {
+        "python": sys.executable,
+        "script": EXPORT_SCRIPT,
+        "db": db or "",
+        "job": job_file,
+        "shard": str(shard_index),
+    }
+    return [arg.format(**values) for arg in shlex.split(template)]
+
+
+def run_parallel_export(
+    output_dir, db, workers, command_template=DEFAULT_WORKER_COMMAND
+):
+    shard_dir = os.path.join(output_dir, "shards")
+    if not os.path.isdir(shard_dir):
+        os.makedirs(shard_dir)
+
+    processes = []
+    summary_files = []
+    for shard_index in range(workers):
+        job_file = os.path.join(shard_dir, "job_%d.json" % shard_index)
+        summary_file = os.path.join(shard_dir, "summary_%d.jsonl" % shard_index)
+        if os.path.isfile(summary_file):
+            os.remove(summary_file)
+        with open(job_file, "w") as f:
+            json.dump(
+                {
+                    "output_dir": output_dir,
+                    "shard_index": shard_index,
+                    "shard_count": workers,
+                    "summary_file": summary_file,
+                },
+                f,
+            )
+        env = dict(os.environ)
+        env[JOB_ENV] = job_file
+        log = open(os.path.join(shard_dir, "worker_%d.log" % shard_index), "w")
+        command = worker_command(command_template, job_file, shard_index, db)
+        print("Starting worker %d: %s" % (shard_index, " ".join(command)))
+        processes.append(
+            (
+                subprocess.Popen(
+                    command, env=env, stdout=log, stderr=subprocess.STDOUT
+                ),
+                log,
+            )
+        )
+        summary_files.append(summary_file)
+
+    failed = []
+    for shard_index, (process, log) in enumerate(processes):
+        return_code = process.wait()
+        log.close()
+        if return_code != 0 or not os.path.isfile(summary_files[shard_index]):
+            failed.append(shard_index)
+    if failed:
+        raise RuntimeError(
+            "Workers %s failed, see the worker logs in %s"
+            % (", ".join(str(n) for n in failed), shard_dir)
+        )
+
+    output_xl_file = os.path.join(output_dir, "Unique_PIDs_Summary.xlsx")
+    num_rows = merge_shard_summaries(summary_files, output_xl_file)
+    print("%d summary rows written to %s" % (num_rows, output_xl_file))
+    # merge the manifest files written by the workers
+    ExportManifest(output_dir).compact()
+    trace_files = [trace_file_name(output_dir, n) for n in range(workers)]
+    trace_files = [
+        trace_file for trace_file in trace_files if os.path.isfile(trace_file)
+    ]
+    if trace_files:
+        merge_traces(trace_files, trace_file_name(output_dir))
+    bundle_files = [bundle_file_name(output_dir, n) for n in range(workers)]
+    bundle_files = [
+        bundle_file for bundle_file in bundle_files if os.path.isfile(bundle_file)
+    ]
+    if bundle_files:
+        num_decks = merge_bundles(bundle_files, bundle_file_name(output_dir))
+        print("%d decks merged into %s" % (num_decks, bundle_file_name(output_dir)))
+    return output_xl_file
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the parts of Unique_PIDs.xlsx with several ANSA sessions."
+    )
+    parser.add_argument("output_dir", help="directory that contains Unique_PIDs.xlsx")
+    parser.add_argument("--db", help="ANSA database opened by every worker")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="number of sessions"
+    )
+    parser.add_argument(
+        "--worker-command",
+        default=DEFAULT_WORKER_COMMAND,
+        help="command that starts one worker (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    run_parallel_export(
+        os.path.abspath(args.output_dir), args.db, args.workers, args.worker_command
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Export order of the parts that keeps the visibility changes between consecutive parts small.
+
+An interface PID PART_A.I.PART_B belongs to both parts, so exporting PART_B right after PART_A only has
+to hide the PIDs of PART_A that are not in PART_B and show the other PIDs of PART_B, instead of showing
+the whole model (base.All()) and then the PIDs of PART_B.
+
+The order is a greedy walk: the next part is the not yet exported part that shares the most PIDs with
+the current one (the first one in the list on ties), or the next part of the list if none shares any.
+"""
+
+from collections import defaultdict
+
+
+def schedule_parts(part_numbers, part_pids):
+    # part_numbers: parts in list order, part_pids: {part number: ids of its PIDs}
+    # returns the part numbers in export order
+    pid_parts = defaultdict(list)
+    for part_num in part_numbers:
+        for pid in part_pids.get(part_num, ()):
+            pid_parts[pid].append(part_num)
+    position = dict((part_num, n) for n, part_num in enumerate(part_numbers))
+
+    order = []
+    done = set()
+    next_in_list = 0
+    current = None
+    while len(order) < len(position):
+        best = None
+        if current is not None:
+            shared = defaultdict(int)
+            for pid in part_pids.get(current, ()):
+                for part_num in pid_parts[pid]:
+                    if part_num not in done:
+                        shared[part_num] += 1
+            if shared:
+                best = min(
+                    shared, key=lambda part_num: (-shared[part_num], position[part_num])
+                )
+        if best is None:
+            while part_numbers[next_in_list] in done:
+                next_in_list += 1
+            best = part_numbers[next_in_list]
+        order.append(best)
+        done.add(best)
+        current = best
+    return order
+
+
+def visibility_delta(visible, entities):
+    # visible: {id: entity} of the shown PIDs, entities: PIDs to show next
+    # returns the entities to show and the entities to hide
+    ids = set(entity._id for entity in entities)
+    show = []
+    shown = set(visible)
+    for entity in entities:
+        if entity._id not in shown:
+            shown.add(entity._id)
+            show.append(entity)
+    hide = [entity for id, entity in visible.items() if id not in ids]
+    return show, hide
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Per-phase timing of the export loop of OutputPIDtoNastran.py.
+
+Every step of a part export is timed in a "with timer.phase(name):" block. The timer keeps:
+    - the times of the current part, added as columns to the summary workbook (part_times())
+    - the sorted times of every phase, for running percentiles (percentiles(), report())
+    - one event per phase and part, written as a Chrome trace file (write_trace()) that can be opened
+      in chrome://tracing or https://ui.perfetto.dev, the part name is in the arguments of every event
+
+Sessions of parallel_export.py write their own trace file, merge_traces() combines them with one row
+(thread) per worker. A timer created with enabled=False keeps nothing, its phases only run their block.
+"""
+
+import os
+import json
+import time
+from contextlib import contextmanager
+
+# phases of one part export, in the order they run
+PHASES = [
+    "matching",
+    "visibility",
+    "output_nastran",
+    "volumes_detect",
+    "single_bounds",
+    "volumes_delete",
+    "delete_volume_pids",
+]
+PHASE_HEADERS = [
+    "Matching Time (s)",
+    "Visibility Time (s)",
+    "OutputNastran Time (s)",
+    "VolumesDetect Time (s)",
+    "SingleBounds Time (s)",
+    "VolumesDelete Time (s)",
+    "deleteVolumePIDs Time (s)",
+]
+TRACE_NAME = "export_trace"
+
+
+class PhaseTimer:
+    def __init__(self, phases=PHASES, thread_id=0, enabled=True):
+        self.phases = phases
+        self.thread_id = thread_id
+        self.enabled = enabled
+        self.durations = dict((phase, []) for phase in phases)  # in seconds
+        self.part_totals = []  # (total seconds, part) of every finished part
+        # (phase, part, start, duration) in seconds since the timer was created
+        self.events = []
+        self._start = time.perf_counter()
+        self._part = None
+        self._part_times = {}
+
+    def start_part(self, part):
+        if not self.enabled:
+            return
+        self.end_part()
+        self._part = part
+        self._part_times = {}
+
+    def end_part(self):
+        if self._part is not None and self._part_times:
+            self.part_totals.append((sum(self._part_times.values()), self._part))
+        self._part = None
+
+    @contextmanager
+    def phase(self, name, part=None):
+        # part: for phases outside of a part export, e.g. the export of the full model
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if part is None:
+                part = self._part
+                self._part_times[name] = self._part_times.get(name, 0.0) + duration
+            if name in self.durations:
+                self.durations[name].append(duration)
+            self.events.append((name, part, start - self._start, duration))
+
+    def part_times(self):
+        # times of the current part in the order of the phases, None for phases that did not run
+        return [
+            "%.3f" % self._part_times[phase] if phase in self._part_times else None
+            for phase in self.phases
+        ]
+
+    def percentiles(self, phase, quantiles=(50, 90, 99)):
+        durations = sorted(self.durations[phase])
+        if not durations:
+            return [None] * len(quantiles)
+        return [
+            durations[min(len(durations) - 1, int(len(durations) * q / 100.0))]
+            for q in quantiles
+        ]
+
+    def slowest_parts(self, n=5):
+        return sorted(self.part_totals, reverse=True)[:n]
+
+    def report(self):
+        # lines with the count, total, median, 90th and 99th percentile and maximum of every phase
+        lines = [
+            "%-20s %8s %10s %9s %9s %9s %9s"
+            % ("phase", "count", "total(s)", "p50(s)", "p90(s)", "p99(s)", "max(s)")
+        ]
+        for phase in self.phases:
+            durations = self.durations[phase]
+            if not durations:
+                continue
+            lines.append(
+                "%-20s %8d %10.2f %9.3f %9.3f %9.3f %9.3f"
+                % (
+                    (phase, len(durations), sum(durations))
+                    + tuple(self.percentiles(phase))
+                    + (max(durations),)
+                )
+            )
+        return lines
+
+    def write_trace(self, trace_file):
+        self.end_part()
+        summary = {}
+        for phase in self.phases:
+            durations = self.durations[phase]
+            if durations:
+                p50, p90, p99 = self.percentiles(phase)
+                summary[phase] = {
+                    "count": len(durations),
+                    "total": sum(durations),
+                    "p50": p50,
+                    "p90": p90,
+                    "p99": p99,
+                    "max": max(durations),
+                }
+        trace = {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "cat": "export",
+                    "ph": "X",
+                    "ts": round(start * 1e6, 1),
+                    "dur": round(duration * 1e6, 1),
+                    "pid": 0,
+                    "tid": self.thread_id,
+                    "args": {"part": part},
+                }
+                for name, part, start, duration in self.events
+            ],
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "phases": summary,
+                "slowest_parts": [
+                    [part, total] for total, part in self.slowest_parts(20)
+                ],
+            },
+        }
+        with open(trace_file, "w") as f:
+            json.dump(trace, f)
+
+
+def trace_file_name(output_dir, shard_index=None):
+    if shard_index is None:
+        return os.path.join(output_dir, TRACE_NAME + ".json")
+    return os.path.join(output_dir, TRACE_NAME + "_" + str(shard_index) + ".json")
+
+
+def merge_traces(trace_files, output_file):
+    # events of every file are kept with the tid of their worker, the statistics are kept per worker
+    events = []
+    workers = {}
+    for trace_file in trace_files:
+        with open(trace_file, "r") as f:
+            trace = json.load(f)
+        events.extend(trace["traceEvents"])
+        workers[os.path.basename(trace_file)] = trace.get("otherData", {})
+    with open(output_file, "w") as f:
+        json.dump(
+            {
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": {"workers": workers},
+            },
+            f,
+        )
+    for trace_file in trace_files:
+        os.remove(trace_file)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Unique part list of the PSHELL names of a model, used by CollectPIDNames.py.
+"""
+
+# Every PSHELL name is read once. Names with leading/trailing whitespace are reported so that only
+# those are renamed in ANSA, and the unique part names are collected in a dict (insertion ordered),
+# splitting interface names PART_1_NAME.I.PART_2_NAME into both parts. The order of the parts is the
+# same as the order in which they were first found.
+
+from pid_matching import INTERFACE_SEPARATOR
+
+
+class PidCatalog:
+    def __init__(self):
+        self.pid_names = []  # stripped names of all PIDs, in model order
+        self._parts = {}  # dict used as insertion ordered set
+
+    @property
+    def unique_pid_list(self):
+        return list(self._parts)
+
+    def add(self, name):
+        # returns the stripped name
+        clean_name = name.strip()
+        self.pid_names.append(clean_name)
+        if INTERFACE_SEPARATOR in clean_name:
+            for part in clean_name.split(INTERFACE_SEPARATOR):
+                self._parts.setdefault(part, None)
+        else:
+            self._parts.setdefault(clean_name, None)
+        return clean_name
+
+
+def build_catalog(pids, rename=None):
+    # pids: PSHELL entities (anything with a _name)
+    # rename: called as rename(pid, clean name) for the PIDs whose name has whitespace to strip
+    catalog = PidCatalog()
+    for pid in pids:
+        name = pid._name
+        clean_name = catalog.add(name)
+        if rename is not None and clean_name != name:
+            rename(pid, clean_name)
+    return catalog
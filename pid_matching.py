@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+PID name classification and part -> PID index used by OutputPIDtoNastran.py.
+"""
+
+# The export script used to loop over every PSHELL for every part and run one re.search per
+# ignore suffix and per side of the name. Here every PSHELL name is parsed once with patterns that
+# are compiled once, and the result is a dict from part name to the PIDs that belong to it.
+#
+# The matching rules are the same as the original loop:
+#   - a PID name is split on '.I.', names with more than one '.I.' are invalid and never match
+#   - a side of the name matches a part if it is equal to the part name, or if
+#     re.search(part + "(_AUX\d*)*" + suffix + "+(\d*\w*)*$", side) matches for any ignore suffix
+#   - a PID is added once per matching side (so PART.I.PART_CS is added twice to PART)
+#   - PIDs keep the order in which they were collected from the model
+#
+# Since re.search is not anchored at the start, the part name may sit anywhere in the side as long as
+# it is directly followed by the (_AUX#)(suffix)(anything) tail. The tail can only start at a '_', so
+# the classifier records every '_' position where the tail matches ("cut" positions) and the part
+# names that end at one of those positions are looked up in a dict instead of running a regex.
+# A '.' in a part name is a regex wildcard in the original pattern, so part names are grouped by the
+# positions of their dots and the same positions are masked in the name before the lookup. Part names
+# with any other regex characters fall back to the original patterns.
+
+import re
+from collections import namedtuple
+
+INTERFACE_SEPARATOR = ".I."
+# regex characters other than '.' that would change the meaning of the original pattern
+_SPECIAL_CHARS = set("\\^$*+?{}[]|()")
+
+# one side of a PSHELL name
+# text: full side of the name
+# base: part name in front of the leftmost (_AUX#)(suffix) tail, or the full text if there is no tail
+# aux: the _AUX index ('' for _AUX without a number), None if there is no _AUX source
+# suffix: ignore suffix found after the base part, None if there is no tail
+# partner: the other side of an interface name, None for non interface names
+# cuts: every position in text where a (_AUX#)(suffix)(anything) tail starts
+PidSide = namedtuple("PidSide", ["text", "base", "aux", "suffix", "partner", "cuts"])
+
+# classification of a PSHELL name, sides is empty if the name is invalid
+PidName = namedtuple("PidName", ["name", "sides", "valid"])
+
+
+class PidClassifier:
+    def __init__(self, ignore_suffix_list, ignore_prefix_list=(), ignore_pid_list=()):
+        self.ignore_suffix_list = list(ignore_suffix_list)
+        self.ignore_prefix_list = list(ignore_prefix_list)
+        self.ignore_pid_list = set(ignore_pid_list)
+        # part name: result of ignore_reason(), also read from and saved to name_cache.py
+        self.ignore_reasons = {}
+
+        # same patterns as the export loop, with all suffixes in one alternation
+        suffixes = "|".join("(?:" + suffix + "+)" for suffix in self.ignore_suffix_list)
+        self._tail = re.compile(r"(_AUX(\d*))*(" + suffixes + r")(\d*\w*)*$")
+        self._ignored_suffix = re.compile(r"\w+(?:" + suffixes + r")(\d*\w*)*$")
+        self._ignored_prefix = [
+            re.compile("^" + prefix + r"\w+") for prefix in self.ignore_prefix_list
+        ]
+
+    def ignore_reason(self, part_name):
+        # returns the message printed by the export loop if the part should not be exported, else None
+        if part_name not in self.ignore_reasons:
+            self.ignore_reasons[part_name] = self._ignore_reason(part_name)
+        return self.ignore_reasons[part_name]
+
+    def precompute_ignore_reasons(self, part_names):
+        # fills ignore_reasons for all part names, e.g. before they are saved to the name cache
+        for part_name in part_names:
+            self.ignore_reason(part_name)
+
+    def _ignore_reason(self, part_name):
+        if self.ignore_suffix_list and self._ignored_suffix.search(part_name):
+            return part_name + " contains an ignored suffix."
+        if any(prefix.search(part_name) for prefix in self._ignored_prefix):
+            return part_name + " begins with an ignored prefix."
+        if part_name in self.ignore_pid_list:
+            return part_name + " is an ignored PID."
+        return None
+
+    def classify_side(self, text, partner=None):
+        cuts = ()
+        if self.ignore_suffix_list:
+            cuts = tuple(
+                i
+                for i, char in enumerate(text)
+                if char == "_" and i > 0 and self._tail.match(text, i)
+            )
+        if not cuts:
+            return PidSide(text, text, None, None, partner, cuts)
+        # describe the longest tail, i.e. the shortest base part
+        cut = cuts[0]
+        tail = self._tail.match(text, cut)
+        aux = tail.group(2) if tail.group(1) is not None else None
+        return PidSide(text, text[:cut], aux, tail.group(3), partner, cuts)
+
+    def classify(self, name):
+        split_name = name.split(INTERFACE_SEPARATOR)
+        if len(split_name) > 2:
+            return PidName(name, (), False)
+        if len(split_name) == 1:
+            return PidName(name, (self.classify_side(name),), True)
+        return PidName(
+            name,
+            (
+                self.classify_side(split_name[0], split_name[1]),
+                self.classify_side(split_name[1], split_name[0]),
+            ),
+            True,
+        )
+
+    def build_part_index(self, pids, part_names, names=None):
+        # pids: PSHELL entities (anything with a _name), part_names: parts that will be looked up
+        # names: optional list of already classified PidName for the pids (same order)
+        # returns {part name: [matching pids]} and the list of invalid pid names
+        index = PartIndex(part_names)
+        invalid = []
+        for n, pid in enumerate(pids):
+            parsed = names[n] if names is not None else self.classify(pid._name)
+            if not parsed.valid:
+                invalid.append(pid._name)
+                continue
+            for side in parsed.sides:
+                for part in index.parts_for_side(side):
+                    index.matches[part].append(pid)
+
+        # part names with regex characters are matched with the original patterns
+        for part in index.regex_parts:
+            patterns = [
+                re.compile(part + r"(_AUX\d*)*" + suffix + r"+(\d*\w*)*$")
+                for suffix in self.ignore_suffix_list
+            ]
+            matches = index.matches[part]
+            for n, pid in enumerate(pids):
+                parsed = names[n] if names is not None else self.classify(pid._name)
+                for side in parsed.sides:
+                    if side.text == part or any(
+                        pattern.search(side.text) for pattern in patterns
+                    ):
+                        matches.append(pid)
+        return index.matches, invalid
+
+
+class PartIndex:
+    # lookup tables for the part names, grouped by length and by the positions of their '.'
+    def __init__(self, part_names):
+        self.matches = {}
+        self.regex_parts = []
+        self._groups = {}  # (length, dot positions) -> set of part names
+        for part in part_names:
+            if part in self.matches or not part:
+                continue
+            self.matches[part] = []
+            if any(char in _SPECIAL_CHARS for char in part):
+                self.regex_parts.append(part)
+                continue
+            dots = tuple(i for i, char in enumerate(part) if char == ".")
+            self._groups.setdefault((len(part), dots), set()).add(part)
+        self._literal = set(self.matches).difference(self.regex_parts)
+
+    def parts_for_side(self, side):
+        # set of part names that match this side of a pid name
+        found = set()
+        if side.text in self._literal:
+            found.add(side.text)
+        for cut in side.cuts:
+            for (length, dots), parts in self._groups.items():
+                if length > cut:
+                    continue
+                candidate = side.text[cut - length : cut]
+                if dots:
+                    chars = list(candidate)
+                    if any(chars[i] == "\n" for i in dots):
+                        continue  # '.' does not match a newline
+                    for i in dots:
+                        chars[i] = "."
+                    candidate = "".join(chars)
+                if candidate in parts:
+                    found.add(candidate)
+        return found
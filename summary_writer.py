@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Buffered output of the export summary (Unique_PIDs_Summary.xlsx).
+
+The export loop adds one row per part to a SummaryWriter. Rows are kept in memory and handed to a sink
+every flush_every rows (0: only at the end), so writing the summary is not part of the per-part work.
+If the parts are not exported in list order, row_order gives the order of the rows in the file: a row
+is held back until the rows before it were added.
+Sinks:
+    AnsaXlsxSink: the ANSA xlsx functions (utils.XlsxCreate/XlsxSetCellValue/XlsxSave), like before,
+        rows are spooled to a .rows.jsonl file until the workbook is saved
+    XlsxSink: pure Python xlsx writer, rows are spooled to a .rows.jsonl file until the workbook is saved
+    CsvSink: csv file, rows are appended at every flush
+    ShardSummarySink: json rows of a parallel_export.py worker, merged by the coordinator
+        (merge_shard_summaries)
+    MemorySummarySink: rows kept in memory, returned by the jobs of export_daemon.py
+Flushing a sink makes the rows written so far survive a crash: the xlsx sinks flush their spool file,
+the csv and shard sinks their file. The workbooks are only written by close(), XlsxSave writes the
+whole workbook every time.
+"""
+
+import os
+import csv
+import json
+from collections import namedtuple
+
+from xlsx_writer import write_xlsx
+
+SummaryRow = namedtuple(
+    "SummaryRow",
+    [
+        "part_name",
+        "num_volumes",
+        "num_volumes_deleted",
+        "free_edges",
+        "num_matching",
+        "matching_entities",
+    ],
+)
+SUMMARY_HEADERS = [
+    "Part Name",
+    "Number of Volumes Identified",
+    "Number of Volumes Deleted",
+    "Free Edges Detected",
+    "Number of Matching Entities",
+    "Matching Entities",
+]
+
+
+class SummaryWriter:
+    def __init__(self, sink, headers, trace, flush_every=0, row_order=None):
+        # trace: list of [name, value] rows of the traceability sheet
+        # row_order: indices of the rows in the order they are written, None: in the order they are added
+        self.sink = sink
+        self.flush_every = flush_every
+        self._rows = []
+        self._row_order = list(row_order) if row_order is not None else None
+        self._next_row = 0
+        self._held_rows = {}
+        self.sink.start(headers, trace)
+
+    def add(self, index, row):
+        # index: position of the part in the input list, row: list of cell values (None: empty cell)
+        if self._row_order is None:
+            self._rows.append((index, list(row)))
+        else:
+            self._held_rows[index] = list(row)
+            while (
+                self._next_row < len(self._row_order)
+                and self._row_order[self._next_row] in self._held_rows
+            ):
+                next_index = self._row_order[self._next_row]
+                self._rows.append((next_index, self._held_rows.pop(next_index)))
+                self._next_row += 1
+        if self.flush_every and len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self.sink.write_rows(self._rows)
+            self._rows = []
+        self.sink.flush()
+
+    def close(self):
+        # rows missing from row_order do not hold back the rows after them at the end
+        self._rows.extend(sorted(self._held_rows.items()))
+        self._held_rows = {}
+        if self._rows:
+            self.sink.write_rows(self._rows)
+            self._rows = []
+        self.sink.close()
+
+
+class AnsaXlsxSink:
+    def __init__(self, output_xl_file):
+        from ansa import utils
+
+        self.utils = utils
+        self.output_xl_file = output_xl_file
+        self.spool_file = os.path.splitext(output_xl_file)[0] + ".rows.jsonl"
+        self._xl_summary = None
+        self._spool = None
+
+    def start(self, headers, trace):
+        self._xl_summary = self.utils.XlsxCreate()
+        for col in range(len(headers)):
+            self.utils.XlsxSetCellValue(
+                self._xl_summary, "Sheet1", 0, col, headers[col]
+            )
+        self.utils.XlsxInsertSheet(self._xl_summary)
+        for xl_row in range(len(trace)):
+            for col in range(len(trace[xl_row])):
+                self.utils.XlsxSetCellValue(
+                    self._xl_summary, "Sheet2", xl_row, col, trace[xl_row][col]
+                )
+        self._spool = open(self.spool_file, "w", encoding="utf-8")
+
+    def write_rows(self, rows):
+        for index, row in rows:
+            self._spool.write(json.dumps(row) + "\n")
+
+    def flush(self):
+        self._spool.flush()
+
+    def close(self):
+        self._spool.close()
+        with open(self.spool_file, "r", encoding="utf-8") as f:
+            for excel_row, line in enumerate(f, 1):
+                row = json.loads(line)
+                for col in range(len(row)):
+                    if row[col] is not None:
+                        self.utils.XlsxSetCellValue(
+                            self._xl_summary, "Sheet1", excel_row, col, row[col]
+                        )
+        self.utils.XlsxSave(self._xl_summary, self.output_xl_file)
+        self.utils.XlsxClose(self._xl_summary)
+        os.remove(self.spool_file)
+
+
+class XlsxSink:
+    def __init__(self, output_xl_file):
+        self.output_xl_file = output_xl_file
+        self.spool_file = os.path.splitext(output_xl_file)[0] + ".rows.jsonl"
+        self._headers = None
+        self._trace = None
+        self._spool = None
+
+    def start(self, headers, trace):
+        self._headers = headers
+        self._trace = trace
+        self._spool = open(self.spool_file, "w", encoding="utf-8")
+
+    def write_rows(self, rows):
+        for index, row in rows:
+            self._spool.write(json.dumps(row) + "\n")
+
+    def flush(self):
+        self._spool.flush()
+
+    def _spooled_rows(self):
+        yield self._headers
+        with open(self.spool_file, "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def close(self):
+        self._spool.close()
+        write_xlsx(
+            self.output_xl_file,
+            [("Sheet1", self._spooled_rows()), ("Sheet2", self._trace)],
+        )
+        os.remove(self.spool_file)
+
+
+class CsvSink:
+    def __init__(self, output_csv_file):
+        self.output_csv_file = output_csv_file
+        self.trace_file = os.path.splitext(output_csv_file)[0] + "_Trace.csv"
+        self._file = None
+        self._writer = None
+
+    def start(self, headers, trace):
+        with open(self.trace_file, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(trace)
+        self._file = open(self.output_csv_file, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(headers)
+
+    def write_rows(self, rows):
+        self._writer.writerows(
+            ["" if value is None else value for value in row] for index, row in rows
+        )
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ShardSummarySink:
+    # rows are appended to <shard_summary_file>.partial as json lines, close() renames it to
+    # shard_summary_file, which tells the coordinator that the worker finished
+    def __init__(self, shard_summary_file):
+        self.shard_summary_file = shard_summary_file
+        self.partial_file = shard_summary_file + ".partial"
+        self._file = None
+
+    def start(self, headers, trace):
+        self._file = open(self.partial_file, "w", encoding="utf-8")
+        self._file.write(json.dumps({"headers": headers, "trace": trace}) + "\n")
+
+    def write_rows(self, rows):
+        for index, row in rows:
+            self._file.write(json.dumps([index, row]) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        os.replace(self.partial_file, self.shard_summary_file)
+
+
+class MemorySummarySink:
+    def __init__(self):
+        self.headers = None
+        self.trace = None
+        self.rows = []  # [index, row] in the order they were written
+
+    def start(self, headers, trace):
+        self.headers = headers
+        self.trace = trace
+
+    def write_rows(self, rows):
+        self.rows.extend([index, row] for index, row in rows)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def read_shard_summary(summary_file):
+    # returns headers, trace and the [index of the part in the input list, row values] of a worker
+    with open(summary_file, "r", encoding="utf-8") as f:
+        shard = json.loads(f.readline())
+        rows = [json.loads(line) for line in f]
+    return shard["headers"], shard["trace"], rows
+
+
+def merge_shard_summaries(summary_files, output_xl_file):
+    # writes the rows of the workers to output_xl_file in the order of the input list
+    headers = None
+    trace = None
+    rows = []
+    for summary_file in summary_files:
+        shard_headers, shard_trace, shard_rows = read_shard_summary(summary_file)
+        headers = headers or shard_headers
+        trace = trace or shard_trace
+        rows.extend(shard_rows)
+    rows.sort(key=lambda row: row[0])
+    trace = trace + [["Workers", str(len(summary_files))]]
+    write_xlsx(
+        output_xl_file,
+        [("Sheet1", [headers] + [row[1] for row in rows]), ("Sheet2", trace)],
+    )
+    return len(rows)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import importlib.util
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_ANSA_DIR = os.path.join(REPO_DIR, "benchmarks", "fake_ansa")
+for path in (REPO_DIR, FAKE_ANSA_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+PSHELLS = [
+    [1, "PART_A"],
+    [2, "PART_A_C"],
+    [3, "PART_A_VS"],
+    [4, "PART_B"],
+    [5, "PART_A.I.PART_B"],
+    [6, "PART_C_SI"],
+    [7, "INLET"],
+]
+
+
+def write_model(model_file, pshells=PSHELLS, db_name="test_model.ansa"):
+    with open(model_file, "w") as f:
+        json.dump({"db_name": db_name, "pshells": pshells, "elements_per_pid": 2}, f)
+    return model_file
+
+
+def load_script(module_dir, **settings):
+    # copy of OutputPIDtoNastran.py with other values of the settings at the start of
+    # output_pid_to_nastran (e.g. deck_output="gzip"), imported from module_dir
+    with open(os.path.join(REPO_DIR, "OutputPIDtoNastran.py"), encoding="utf-8") as f:
+        source = f.read()
+    for name, value in settings.items():
+        source, count = re.subn(
+            r"(?m)^(    %s = ).*$" % name, r"\g<1>%r" % (value,), source, count=1
+        )
+        assert count == 1, "no setting " + name
+    name = "OutputPIDtoNastran_%s" % "_".join(sorted(settings))
+    script = os.path.join(str(module_dir), name + ".py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location(name, script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def fake_model(tmp_path, monkeypatch):
+    # model file of the stand-in ansa package, loaded by the next ansa call
+    from ansa import _model
+
+    model_file = write_model(str(tmp_path / "model.json"))
+    monkeypatch.setenv("FAKE_ANSA_MODEL", model_file)
+    monkeypatch.setattr(_model, "_model", None)
+    return model_file
+
+
+@pytest.fixture(autouse=True)
+def keep_cwd():
+    cwd = os.getcwd()
+    yield
+    os.chdir(cwd)
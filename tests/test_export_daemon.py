@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import socket
+import threading
+
+import pytest
+
+from export_daemon import serve_jobs, send_job
+
+
+def start_daemon(target, socket_path):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not os.path.exists(socket_path):
+        assert thread.is_alive() and time.time() < deadline
+        time.sleep(0.01)
+    return thread
+
+
+@pytest.fixture
+def daemon(tmp_path, fake_model):
+    # OutputPIDtoNastran.serve() with the stand-in ansa package
+    import OutputPIDtoNastran
+
+    socket_path = str(tmp_path / "daemon.sock")
+    thread = start_daemon(lambda: OutputPIDtoNastran.serve(socket_path), socket_path)
+    yield socket_path
+    send_job({"command": "shutdown"}, socket_path, timeout=10)
+    thread.join(10)
+    assert not thread.is_alive()
+    assert not os.path.exists(socket_path)
+
+
+def test_status(daemon):
+    response = send_job({"command": "status"}, daemon, timeout=10)
+    assert response["ok"]
+    assert response["database"] == "test_model.ansa"
+    assert response["jobs"] == 0
+
+
+def test_export(daemon, tmp_path):
+    output_dir = str(tmp_path / "export")
+    os.makedirs(output_dir)
+    job = {"command": "export", "output_dir": output_dir, "parts": ["PART_A", "PART_B"]}
+    response = send_job(job, daemon, timeout=60)
+    assert response["ok"], response.get("error")
+    assert response["headers"][0] == "Part Name"
+    rows = dict((row[0], row) for row in response["rows"])
+    assert sorted(rows) == ["PART_A", "PART_B"]
+    assert rows["PART_A"][4] == "3"
+    assert rows["PART_B"][4] == "2"
+    for part in ("PART_A", "PART_B"):
+        assert os.path.isfile(os.path.join(output_dir, "nastran_files", part + ".nas"))
+    assert response["classified"] == 7
+
+    # same model and parts: nothing is classified again
+    response = send_job(job, daemon, timeout=60)
+    assert response["ok"], response.get("error")
+    assert response["classified"] == 0
+    status = send_job({"command": "status"}, daemon, timeout=10)
+    assert status["jobs"] == 2
+    assert status["pids"] == 7
+
+
+def test_failing_job(daemon, tmp_path, monkeypatch):
+    from ansa import base
+
+    def output_nastran(filename, **kwargs):
+        raise RuntimeError("disk full")
+
+    output_dir = str(tmp_path / "export")
+    os.makedirs(output_dir)
+    job = {"command": "export", "output_dir": output_dir, "parts": ["PART_A"]}
+    cwd = os.getcwd()
+    original = base.OutputNastran
+    monkeypatch.setattr(base, "OutputNastran", output_nastran)
+    response = send_job(job, daemon, timeout=60)
+    assert not response["ok"]
+    assert "disk full" in response["error"]
+    # the export returned to the start directory
+    assert os.getcwd() == cwd
+
+    # an unknown command and a missing part list fail as well
+    response = send_job({"command": "export_all"}, daemon, timeout=10)
+    assert not response["ok"]
+    assert "Unknown command" in response["error"]
+    missing = {"command": "export", "output_dir": str(tmp_path), "parts": None}
+    assert not send_job(missing, daemon, timeout=10)["ok"]
+
+    # the daemon still serves
+    monkeypatch.setattr(base, "OutputNastran", original)
+    response = send_job(job, daemon, timeout=60)
+    assert response["ok"], response.get("error")
+    assert [row[0] for row in response["rows"]] == ["PART_A"]
+    assert send_job({"command": "status"}, daemon, timeout=10)["ok"]
+
+
+def test_idle_client_is_dropped(tmp_path):
+    socket_path = str(tmp_path / "daemon.sock")
+    messages = []
+    handlers = {"status": lambda job: {"jobs": 0}}
+    thread = start_daemon(
+        lambda: serve_jobs(socket_path, handlers, messages.append, timeout=0.2),
+        socket_path,
+    )
+    idle = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with idle:
+        idle.connect(socket_path)
+        response = send_job({"command": "status"}, socket_path, timeout=10)
+    assert response["ok"]
+    assert any("connection is dropped" in message for message in messages)
+    send_job({"command": "shutdown"}, socket_path, timeout=10)
+    thread.join(10)
+    assert not thread.is_alive()
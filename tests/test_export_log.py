@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from export_log import setup_logger, close_logger
+
+
+def read_lines(log_file):
+    if not os.path.isfile(log_file):
+        return []
+    with open(log_file, encoding="utf-8") as f:
+        return [line.split(" ", 2)[2].rstrip("\n") for line in f]
+
+
+def test_records_are_written_in_blocks(tmp_path):
+    log_file = str(tmp_path / "OutputPIDtoNastran.log")
+    log = setup_logger(log_file, buffer_records=3)
+    log.debug("not written")
+    log.info("part 1")
+    log.info("part 2")
+    assert read_lines(log_file) == []
+    log.info("part 3")
+    assert read_lines(log_file) == [
+        "INFO    part 1",
+        "INFO    part 2",
+        "INFO    part 3",
+    ]
+    log.info("part 4")
+    # a warning is written at once, with the records in front of it
+    log.warning("no matching surfaces")
+    assert read_lines(log_file)[3:] == [
+        "INFO    part 4",
+        "WARNING no matching surfaces",
+    ]
+    log.info("part 5")
+    close_logger(log)
+    assert read_lines(log_file)[-1] == "INFO    part 5"
+    assert threading.active_count() == 1
+
+
+def test_log_file_is_rotated(tmp_path):
+    log_file = str(tmp_path / "OutputPIDtoNastran.log")
+    log = setup_logger(log_file, max_bytes=400, backup_count=2, buffer_records=2)
+    for n in range(35):
+        log.info("part %02d" % n)
+    close_logger(log)
+    # 10 lines of 40 characters per file, the oldest file was dropped
+    lines = read_lines(log_file + ".2") + read_lines(log_file + ".1")
+    assert lines + read_lines(log_file) == [
+        "INFO    part %02d" % n for n in range(10, 35)
+    ]
+    assert not os.path.exists(log_file + ".3")
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+
+from deck_sinks import GzipDeckSink
+from export_manifest import ExportManifest, fingerprint
+
+PID_DATA = [(1, "PART_A", 2, 6), (5, "PART_A.I.PART_B", 2, 6)]
+OPTIONS = {"format": "short"}
+
+
+def row(part):
+    return [part, "0", "0", "True", "2", str([part])]
+
+
+def write_deck(output_filepath, part, text="CQUAD4 1\n"):
+    part_filename = os.path.join(output_filepath, part + ".nas")
+    with open(part_filename, "w") as f:
+        f.write(text)
+    return part_filename
+
+
+def test_skip_and_export_again(tmp_path):
+    output_dir = str(tmp_path)
+    part_filename = write_deck(output_dir, "PART_A")
+    part_fingerprint = fingerprint(PID_DATA, OPTIONS)
+    manifest = ExportManifest(output_dir)
+    # a part that was never exported
+    assert manifest.summary_row("PART_A", part_fingerprint, part_filename) is None
+    manifest.record("PART_A", part_fingerprint, part_filename, row("PART_A"))
+    manifest.close()
+
+    # same PIDs and file: skipped with the stored summary row
+    manifest = ExportManifest(output_dir)
+    assert manifest.summary_row("PART_A", part_fingerprint, part_filename) == row(
+        "PART_A"
+    )
+    # other PIDs, element counts or output options: exported again
+    for changed in (
+        fingerprint(PID_DATA[:1], OPTIONS),
+        fingerprint([(1, "PART_A", 3, 8), PID_DATA[1]], OPTIONS),
+        fingerprint(PID_DATA, {"format": "long"}),
+    ):
+        assert manifest.summary_row("PART_A", changed, part_filename) is None
+    # the file was changed or removed
+    write_deck(output_dir, "PART_A", "CQUAD4 2\n")
+    assert manifest.summary_row("PART_A", part_fingerprint, part_filename) is None
+    os.remove(part_filename)
+    assert manifest.summary_row("PART_A", part_fingerprint, part_filename) is None
+
+
+def test_compressed_decks(tmp_path):
+    output_dir = str(tmp_path)
+    part_filename = write_deck(output_dir, "PART_A")
+    part_fingerprint = fingerprint(PID_DATA, OPTIONS)
+    manifest = ExportManifest(output_dir)
+    manifest.record("PART_A", part_fingerprint, part_filename, row("PART_A"))
+    deck_sink = GzipDeckSink(output_dir)
+    deck_sink.add("PART_A.nas", part_filename)
+    deck_sink.close()
+    assert not os.path.exists(part_filename)
+    # the hash of the gzip deck is the hash of the deck it holds
+    assert manifest.summary_row(
+        "PART_A", part_fingerprint, part_filename, deck_sink
+    ) == row("PART_A")
+    assert manifest.summary_row("PART_A", part_fingerprint, part_filename) is None
+
+
+def test_latest_entry_and_killed_run(tmp_path):
+    output_dir = str(tmp_path)
+    part_filename = write_deck(output_dir, "PART_A")
+    part_fingerprint = fingerprint(PID_DATA, OPTIONS)
+    manifest = ExportManifest(output_dir)
+    manifest.record("PART_A", "old", part_filename, row("old"))
+    manifest.record("PART_A", part_fingerprint, part_filename, row("PART_A"))
+    manifest.close()
+    with open(manifest.path, "a") as f:
+        f.write('{"part": "PART_B", "fing')
+    manifest = ExportManifest(output_dir)
+    assert sorted(manifest.entries) == ["PART_A"]
+    assert manifest.summary_row("PART_A", part_fingerprint, part_filename) == row(
+        "PART_A"
+    )
+
+
+def test_shard_journals_are_compacted(tmp_path):
+    output_dir = str(tmp_path)
+    part_fingerprint = fingerprint(PID_DATA, OPTIONS)
+    for shard_index, part in enumerate(["PART_A", "PART_B"]):
+        manifest = ExportManifest(output_dir, shard_index)
+        assert manifest.journal.endswith(
+            "nastran_files_manifest_%d.jsonl" % shard_index
+        )
+        part_filename = write_deck(output_dir, part)
+        manifest.record(part, part_fingerprint, part_filename, row(part))
+        manifest.close()
+    # a later session reads the entries of every shard
+    manifest = ExportManifest(output_dir)
+    assert sorted(manifest.entries) == ["PART_A", "PART_B"]
+    manifest.compact()
+    assert sorted(os.listdir(output_dir)) == [
+        "PART_A.nas",
+        "PART_B.nas",
+        "nastran_files_manifest.jsonl",
+    ]
+    with open(manifest.path) as f:
+        assert sorted(json.loads(line)["part"] for line in f) == ["PART_A", "PART_B"]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from free_edges import free_edge_index
+
+# two quads of PID 1 and one of PID 2 in a row: the edge 2-6 is shared by both PIDs, the outline of
+# the three quads is free in the whole model
+DECK = """BEGIN BULK
+GRID           1              0.      0.      0.
+GRID           2              1.      0.      0.
+GRID           3              2.      0.      0.
+GRID           4              3.      0.      0.
+GRID           5              0.      1.      0.
+GRID           6              1.      1.      0.
+GRID           7              2.      1.      0.
+GRID           8              3.      1.      0.
+CQUAD4        11       1       2       3       7       6
+CQUAD4        12       1       3       4       8       7
+CQUAD4        21       2       1       2       6       5
+ENDDATA
+"""
+
+
+def write_deck(tmp_path):
+    deck_file = str(tmp_path / "full_model.nas")
+    with open(deck_file, "w") as f:
+        f.write(DECK)
+    return deck_file
+
+
+def test_free_edges_of_parts(tmp_path):
+    index = free_edge_index(write_deck(tmp_path))
+    assert index.free_pids == {1, 2}
+    assert index.signatures == [(1, 2)]
+    assert index.part_has_free_edges([1])
+    assert index.part_has_free_edges([2])
+    assert index.part_has_free_edges([1, 2])
+    assert not index.part_has_free_edges([3])
+
+
+def test_free_pids_are_added_to_the_deck(tmp_path):
+    # SingleBounds did not map its issues to PID 2 (or to any PID): the PIDs of the deck are kept,
+    # otherwise the shared edge hides the free outline of the part with both PIDs
+    for free_pids in (set(), {1}, {5}):
+        index = free_edge_index(write_deck(tmp_path), free_pids)
+        assert index.free_pids == {1, 2} | free_pids
+        assert index.part_has_free_edges([1, 2])
+        assert index.part_has_free_edges([2])
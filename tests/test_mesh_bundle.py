@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mesh_bundle import (
+    read_mesh_bundle,
+    save_mesh_bundle,
+    load_mesh_bundle,
+    write_nastran,
+    bundles_equal,
+    check_round_trip,
+    short_real,
+)
+
+DECK = """\
+$ deck with comments above every kind of card
+BEGIN BULK
+$ANSA_NAME_COMMENT;1;PSHELL;PART_A;
+PSHELL         1       1      1.       1
+MAT1           1 210000.              .3
+$ first GRID of the part
+GRID         101             0.0     0.0     0.0
+GRID         102            1.50     0.0     0.0
+GRID         103             1.0     1.0-1.234-5
+$ GRID in another coordinate system
+GRID         104       2     0.0     1.0     0.0       2
+$ element comment
+$ over two lines
+CQUAD4        11       1     101     102     103     104
+CTRIA3        12       1     101     102     103
+$ comment in front of ENDDATA
+ENDDATA
+"""
+
+
+def write_deck(path, text=DECK):
+    with open(path, "w", newline="") as f:
+        f.write(text)
+    return path
+
+
+def test_comments_are_kept(tmp_path):
+    bundle = read_mesh_bundle(write_deck(str(tmp_path / "part.nas")))
+    assert bundle.grid_ids.tolist() == [101, 102, 103, 104]
+    assert bundle.grid_comment_ids.tolist() == [101, 104]
+    assert bundle.element_comment_ids.tolist() == [11]
+    assert bundle.element_comments[0] == "$ element comment\n$ over two lines\n"
+    assert bundle.pid_names.tolist() == ["PART_A"]
+
+    written = str(tmp_path / "written.nas")
+    write_nastran(bundle, written)
+    with open(written) as f:
+        lines = f.read().splitlines()
+    n = lines.index("$ first GRID of the part")
+    assert lines[n + 1].startswith("GRID         101")
+    n = lines.index("$ over two lines")
+    assert lines[n - 1] == "$ element comment"
+    assert lines[n + 1].startswith("CQUAD4        11")
+    assert lines[-2:] == ["$ comment in front of ENDDATA", "ENDDATA"]
+
+
+def test_round_trip(tmp_path):
+    deck = write_deck(str(tmp_path / "part.nas"))
+    assert check_round_trip(deck)
+
+    bundle = read_mesh_bundle(deck)
+    for compress in (True, False):
+        npz_file = str(tmp_path / ("part_%s.npz" % compress))
+        save_mesh_bundle(bundle, npz_file, compress)
+        loaded = load_mesh_bundle(npz_file)
+        assert bundles_equal(bundle, loaded)
+    assert loaded.grid_coords[2].tolist() == [1.0, 1.0, -1.234e-5]
+    assert loaded.grid_cp.tolist() == [0, 0, 0, 2]
+    assert loaded.connectivity.tolist() == [[101, 102, 103, 104], [101, 102, 103, -1]]
+
+    # the written deck is the normalized deck, writing it again gives the same file
+    first = str(tmp_path / "first.nas")
+    second = str(tmp_path / "second.nas")
+    write_nastran(loaded, first)
+    write_nastran(read_mesh_bundle(first), second)
+    with open(first) as f, open(second) as g:
+        assert f.read() == g.read()
+
+
+def test_exported_deck_is_written_back_unchanged(tmp_path, fake_model):
+    from ansa import base
+
+    deck = str(tmp_path / "model.nas")
+    base.OutputNastran(deck)
+    written = str(tmp_path / "written.nas")
+    write_nastran(read_mesh_bundle(deck), written)
+    with open(deck) as f, open(written) as g:
+        assert f.read() == g.read()
+
+
+def test_bundle_without_comments(tmp_path):
+    # bundles written before the comments were kept
+    bundle = read_mesh_bundle(write_deck(str(tmp_path / "part.nas")))
+    npz_file = str(tmp_path / "old.npz")
+    arrays = dict(
+        (name, value)
+        for name, value in bundle._asdict().items()
+        if "comment" not in name
+    )
+    arrays["header"] = np.array(bundle.header)
+    np.savez(npz_file, **arrays)
+    loaded = load_mesh_bundle(npz_file)
+    assert len(loaded.grid_comment_ids) == 0
+    assert len(loaded.element_comments) == 0
+    write_nastran(loaded, str(tmp_path / "old.nas"))
+    assert read_mesh_bundle(str(tmp_path / "old.nas")).grid_ids.tolist() == [
+        101,
+        102,
+        103,
+        104,
+    ]
+
+
+@pytest.mark.parametrize(
+    "value, text",
+    [
+        (0.0, "0."),
+        (1.5, "1.5"),
+        (-0.5, "-.5"),
+        (1234567.0, "1234567."),
+        (-1234567.0, "-1.235+6"),
+        (1.234e-5, "1.234-5"),
+        (12345.678, "12345.68"),
+    ],
+)
+def test_short_real(value, text):
+    assert short_real(value) == text
+    assert len(text) <= 8
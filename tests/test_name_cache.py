@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+import gzip
+
+import name_cache
+from name_cache import NameCache, classifier_key, pid_fingerprint
+from pid_matching import PidClassifier
+
+SUFFIXES = ["_CS", "_VS"]
+PARTS = ["PART_A", "PART_B", "PART_B_CS"]
+
+
+class Pid:
+    # stand-in for a PSHELL entity
+    def __init__(self, id, name):
+        self._id = id
+        self._name = name
+
+
+def model(names=("PART_A", "PART_A_CS", "PART_A.I.PART_B", "PART_B_AUX_VS")):
+    return [Pid(n + 1, name) for n, name in enumerate(names)]
+
+
+def export(output_dir, pids, classifier, db_name="model.ansa"):
+    # what ModelSession does: the cached part index or a new one from the classified names
+    cache = NameCache(output_dir, db_name)
+    fingerprint = pid_fingerprint(pids)
+    cached = cache.part_index(classifier, fingerprint, PARTS)
+    if cached is None:
+        names = cache.classify(classifier, pids)
+        matches, invalid = classifier.build_part_index(pids, PARTS, names)
+        cache.set_part_index(classifier, fingerprint, PARTS, matches, invalid)
+    classifier.precompute_ignore_reasons(PARTS)
+    cache.save()
+    return cache, cached
+
+
+def test_cache_hit(tmp_path):
+    output_dir = str(tmp_path)
+    pids = model()
+    cache, cached = export(output_dir, pids, PidClassifier(SUFFIXES))
+    assert cached is None
+    assert cache.num_classified == len(pids)
+    assert os.path.isfile(cache.cache_file) and os.path.isfile(cache.names_file)
+
+    # same database, PSHELLs and part list: the index is taken as it is, no name is parsed
+    cache, cached = export(output_dir, pids, PidClassifier(SUFFIXES))
+    assert cached == ({"PART_A": [1, 2, 3], "PART_B": [3, 4], "PART_B_CS": []}, [])
+    assert cache.num_classified == 0
+    # the ignore reasons of the part names come from the cache
+    classifier = PidClassifier(SUFFIXES)
+    NameCache(output_dir, "model.ansa").part_index(
+        classifier, pid_fingerprint(pids), PARTS
+    )
+    assert classifier.ignore_reasons == {
+        "PART_A": None,
+        "PART_B": None,
+        "PART_B_CS": "PART_B_CS contains an ignored suffix.",
+    }
+
+
+def test_cache_miss_classifies_new_names_only(tmp_path):
+    output_dir = str(tmp_path)
+    export(output_dir, model(), PidClassifier(SUFFIXES))
+
+    # a renamed PSHELL changes the fingerprint, only its name is parsed again
+    pids = model(("PART_A", "PART_A_CS", "PART_A.I.PART_B", "PART_B_VS"))
+    cache, cached = export(output_dir, pids, PidClassifier(SUFFIXES))
+    assert cached is None
+    assert cache.num_classified == 1
+
+    # another database with the same PSHELLs: the index is built again from the cached names
+    cache, cached = export(output_dir, pids, PidClassifier(SUFFIXES), "other.ansa")
+    assert cached is None
+    assert cache.num_classified == 0
+
+
+def test_cache_invalidation(tmp_path, monkeypatch):
+    output_dir = str(tmp_path)
+    pids = model()
+    export(output_dir, pids, PidClassifier(SUFFIXES))
+
+    # other ignore lists have their own section
+    classifier = PidClassifier(SUFFIXES + ["_MI"])
+    assert classifier_key(classifier) != classifier_key(PidClassifier(SUFFIXES))
+    cache, cached = export(output_dir, pids, classifier)
+    assert cached is None
+    assert cache.num_classified == len(pids)
+    assert len(cache.data["classifiers"]) == 2
+
+    # another part list
+    cache = NameCache(output_dir, "model.ansa")
+    assert cache.part_index(classifier, pid_fingerprint(pids), ["PART_A"]) is None
+
+    # a damaged cache file or a cache of another version is built again
+    with open(cache.cache_file, "wb") as f:
+        f.write(b"not gzip")
+    cache, cached = export(output_dir, pids, PidClassifier(SUFFIXES))
+    assert cached is None
+    monkeypatch.setattr(name_cache, "CACHE_VERSION", name_cache.CACHE_VERSION + 1)
+    cache, cached = export(output_dir, pids, PidClassifier(SUFFIXES))
+    assert cached is None
+    assert cache.num_classified == len(pids)
+    with gzip.open(cache.cache_file, "rt", encoding="utf-8") as f:
+        assert '"version":%d' % name_cache.CACHE_VERSION in f.read()
+
+
+def test_unique_pid_list(tmp_path):
+    output_dir = str(tmp_path)
+    pids = model()
+    fingerprint = pid_fingerprint(pids)
+    cache = NameCache(output_dir, "model.ansa")
+    assert cache.unique_pid_list(fingerprint) is None
+    cache.set_unique_pid_list(fingerprint, PARTS)
+    cache.save()
+    assert NameCache(output_dir, "model.ansa").unique_pid_list(fingerprint) == PARTS
+    assert NameCache(output_dir, "other.ansa").unique_pid_list(fingerprint) is None
+    renamed = pid_fingerprint(pids, [pid._name + "_1" for pid in pids])
+    assert NameCache(output_dir, "model.ansa").unique_pid_list(renamed) is None
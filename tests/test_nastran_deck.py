@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import logging
+import tracemalloc
+
+import pytest
+
+import nastran_deck
+from nastran_deck import (
+    INCLUDE_DIR,
+    SHELL_CARDS,
+    card_data,
+    element_grids,
+    field_float,
+    inline_includes,
+    iter_cards,
+    iter_deck_lines,
+    pshell_mids,
+    split_nastran_deck,
+    validate_deck,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# PART_A: PID 1 and PID 3 (PART_A.I.PART_B), PART_B: PID 2 and PID 3. PID 4 is not exported
+SAMPLE_DECK = os.path.join(DATA_DIR, "sample_deck.nas")
+PART_PIDS = {"PART_A": [1, 3], "PART_B": [2, 3]}
+INTERFACE = "PART_A.I.PART_B"
+
+
+def read(path):
+    with open(path, "r", encoding="latin-1", newline="") as f:
+        return f.read()
+
+
+def deck_files(directory):
+    # {path relative to directory: text} of every file below directory
+    files = {}
+    for root, dirs, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, directory).replace(os.sep, "/")] = read(path)
+    return files
+
+
+def test_split(tmp_path):
+    paths = split_nastran_deck(SAMPLE_DECK, PART_PIDS, str(tmp_path))
+    assert sorted(paths) == ["PART_A", "PART_B"]
+    assert deck_files(str(tmp_path)) == deck_files(
+        os.path.join(DATA_DIR, "sample_deck_split")
+    )
+
+
+def write_parts_deck(deck_file, num_parts, elements_per_part):
+    # deck of num_parts PIDs with 4 GRIDs and elements_per_part CQUAD4s each, all with MAT1 1
+    with open(deck_file, "w") as f:
+        f.write("BEGIN BULK\nMAT1           1 210000.              .3\n")
+        for pid in range(1, num_parts + 1):
+            grids = [4 * pid + n for n in range(4)]
+            f.write("PSHELL  %8d       1      1.       1\n" % pid)
+            for n, grid in enumerate(grids):
+                f.write("GRID    %8d        %8d.      0.      0.\n" % (grid, n))
+            for n in range(elements_per_part):
+                f.write(
+                    "CQUAD4  %8d%8d%8d%8d%8d%8d\n"
+                    % tuple([1000 * pid + n, pid] + grids)
+                )
+        f.write("ENDDATA\n")
+    return dict(("PART_%d" % pid, [pid]) for pid in range(1, num_parts + 1))
+
+
+def test_split_with_small_buffers(tmp_path):
+    # the part decks are written through buffers of buffer_size characters
+    split_nastran_deck(SAMPLE_DECK, PART_PIDS, str(tmp_path), buffer_size=10)
+    assert deck_files(str(tmp_path)) == deck_files(
+        os.path.join(DATA_DIR, "sample_deck_split")
+    )
+
+
+def test_split_memory_budget(tmp_path, monkeypatch):
+    # many small parts: no part fills its own buffer, the budget for all buffers writes them out
+    deck_file = str(tmp_path / "deck.nas")
+    part_pids = write_parts_deck(deck_file, 500, 10)
+    part_files = []
+    base_class = nastran_deck._PartFiles
+
+    class PartFiles(base_class):
+        def __init__(self, *args):
+            base_class.__init__(self, *args)
+            part_files.append(self)
+
+    monkeypatch.setattr(nastran_deck, "_PartFiles", PartFiles)
+    peaks = []
+    for name, memory_budget in (("budget", 1 << 14), ("unbounded", 1 << 30)):
+        os.makedirs(str(tmp_path / name))
+        tracemalloc.start()
+        split_nastran_deck(
+            deck_file, part_pids, str(tmp_path / name), memory_budget=memory_budget
+        )
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    # the budget is only exceeded by the card written last
+    assert part_files[0].peak_buffered <= (1 << 14) + 100
+    assert part_files[1].peak_buffered > 1 << 18
+    assert peaks[0] < peaks[1] / 2
+    assert deck_files(str(tmp_path / "budget")) == deck_files(
+        str(tmp_path / "unbounded")
+    )
+
+
+def test_split_warns_about_dropped_cards(tmp_path, caplog):
+    log = logging.getLogger("test_nastran_deck")
+    with caplog.at_level(logging.WARNING):
+        split_nastran_deck(SAMPLE_DECK, PART_PIDS, str(tmp_path), log=log)
+    assert caplog.messages == [
+        "2 cards are not written to the part decks: 1 PSOLID, 1 RBE2"
+    ]
+
+
+def test_split_interface_includes(tmp_path):
+    split_nastran_deck(
+        SAMPLE_DECK, PART_PIDS, str(tmp_path), interface_includes={3: INTERFACE}
+    )
+    assert deck_files(str(tmp_path)) == deck_files(
+        os.path.join(DATA_DIR, "sample_deck_interface_includes")
+    )
+
+
+def test_inline_includes(tmp_path):
+    # a deck with its include inlined holds the cards of the deck split without includes
+    split_nastran_deck(
+        SAMPLE_DECK, PART_PIDS, str(tmp_path), interface_includes={3: INTERFACE}
+    )
+    for part in PART_PIDS:
+        deck = str(tmp_path / (part + ".nas"))
+        inline_includes(deck)
+        expected = read(os.path.join(DATA_DIR, "sample_deck_split", part + ".nas"))
+        assert sorted(read(deck).splitlines()) == sorted(expected.splitlines())
+
+
+def test_validate_deck(tmp_path):
+    for name in ("sample_deck_split", "sample_deck_interface_includes"):
+        for part in PART_PIDS:
+            assert validate_deck(os.path.join(DATA_DIR, name, part + ".nas")) == []
+
+    lines = read(os.path.join(DATA_DIR, "sample_deck_split", "PART_B.nas")).splitlines(
+        True
+    )
+    no_enddata = str(tmp_path / "no_enddata.nas")
+    with open(no_enddata, "w", newline="") as f:
+        f.writelines(line for line in lines if line != "ENDDATA\n")
+    assert validate_deck(no_enddata) == ["no ENDDATA card"]
+
+    # GRID 6 is large field (two lines) and GRID 9 is only used by the large field CTRIA3
+    missing_grids = str(tmp_path / "missing_grids.nas")
+    with open(missing_grids, "w", newline="") as f:
+        f.writelines(
+            line
+            for line in lines
+            if not line.startswith(
+                ("GRID*", "*                     0.", "GRID           9")
+            )
+        )
+    assert validate_deck(missing_grids) == ["2 GRIDs used by elements are not defined"]
+
+    # MAT4 5 is the MID4 of PSHELL 2, MATT1 1 has the id of MAT1 1 but does not define it
+    missing_materials = str(tmp_path / "missing_materials.nas")
+    for prefix, num_missing in (("MAT4", 1), ("MAT1           1", 1), ("MAT1", 2)):
+        with open(missing_materials, "w", newline="") as f:
+            f.writelines(line for line in lines if not line.startswith(prefix))
+        assert validate_deck(missing_materials) == [
+            "%d materials used by PSHELLs are not defined" % num_missing
+        ]
+
+
+def test_validate_deck_reads_includes(tmp_path):
+    # GRID 9 of the interface element is only defined in the include file
+    directory = str(tmp_path / "decks")
+    shutil.copytree(os.path.join(DATA_DIR, "sample_deck_interface_includes"), directory)
+    include = os.path.join(directory, INCLUDE_DIR, INTERFACE + ".inc")
+    lines = read(include).splitlines(True)
+    with open(include, "w", newline="") as f:
+        f.writelines(line for line in lines if not line.startswith("GRID"))
+    for part in PART_PIDS:
+        assert validate_deck(os.path.join(directory, part + ".nas")) == [
+            "1 GRIDs used by elements are not defined"
+        ]
+
+
+def test_card_formats():
+    cards = list(iter_cards(iter_deck_lines(SAMPLE_DECK)))
+    cord = [card for card in cards if card.name == "CORD2R"][0]
+    assert card_data(cord)[:3] == ["1", "", "0."]
+    assert card_data(cord)[8:11] == ["1.", "0.", "0."]
+    # free field, large field with the last grid on the continuation line, short field
+    elements = [element_grids(card) for card in cards if card.name in SHELL_CARDS]
+    assert elements[1:4] == [(2, 2, [2, 5, 6, 3]), (3, 3, [5, 7, 9]), (4, 2, [7, 8, 6])]
+
+    free_field = list(iter_cards(["GRID,5,,2.,0.,0.\n"]))[0]
+    assert card_data(free_field) == ["5", "", "2.", "0.", "0."]
+    large_field = list(
+        iter_cards(
+            [
+                "GRID*                  6                              2.              1.\n",
+                "*                     0.\n",
+            ]
+        )
+    )[0]
+    assert card_data(large_field)[:5] == ["6", "", "2.", "1.", "0."]
+    pshells = [card for card in cards if card.name == "PSHELL"]
+    assert pshells[3].comments == ["$ANSA_NAME_COMMENT;4;PSHELL;PART_C;\n"]
+    # MID3 on the first line, MID4 on the continuation line
+    assert [pshell_mids(card) for card in pshells] == [
+        [1, 1, 6],
+        [2, 2, 5],
+        [1, 1],
+        [3, 3],
+    ]
+
+    free_field_continuation = list(
+        iter_cards(["PSHELL,7,1,1.,1,,,,,+P7\n", "+P7,,,8\n"])
+    )[0]
+    assert pshell_mids(free_field_continuation) == [1, 1, 8]
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [("1.5", 1.5), ("1.5-3", 1.5e-3), ("-2.+4", -2e4), ("1.5D-3", 1.5e-3), (".3", 0.3)],
+)
+def test_field_float(field, value):
+    assert field_float(field) == pytest.approx(value)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import os
+import gzip
+
+from conftest import load_script, write_model
+import OutputPIDtoNastran
+from OutputPIDtoNastran import output_pid_to_nastran
+from nastran_deck import include_file
+from phase_timing import PHASE_HEADERS
+from summary_writer import SUMMARY_HEADERS, MemorySummarySink
+
+PARTS = ["PART_A", "PART_B", "PART_C"]
+
+
+def export(output_dir, parts=PARTS):
+    summary_sink = MemorySummarySink()
+    output_pid_to_nastran(output_dir, part_names=parts, summary_sink=summary_sink)
+    return [row for index, row in sorted(summary_sink.rows)]
+
+
+def test_time_estimate_leaves_out_skipped_parts(tmp_path, fake_model, monkeypatch):
+    output_dir = str(tmp_path)
+    assert [row[0] for row in export(output_dir)] == PARTS
+    # PART_B is exported again, PART_A and PART_C are skipped by the manifest
+    os.remove(os.path.join(output_dir, "nastran_files", "PART_B.nas"))
+    estimates = []
+
+    def calc_process_time(start, done_cost, total_cost):
+        estimates.append((done_cost, total_cost))
+        return (0, 0, "00:00:00")
+
+    monkeypatch.setattr(OutputPIDtoNastran, "calcProcessTime", calc_process_time)
+    assert [row[0] for row in export(output_dir)] == PARTS
+    # before PART_C: PART_B was exported and PART_A is not part of the total any more
+    assert estimates == [(1, 2)]
+
+
+def test_gzip_decks_keep_their_include_files(tmp_path, fake_model):
+    script = load_script(tmp_path, deck_output="gzip", interface_includes=True)
+    output_dir = str(tmp_path / "export")
+    os.makedirs(output_dir)
+    summary_sink = MemorySummarySink()
+    script.output_pid_to_nastran(
+        output_dir, part_names=PARTS, summary_sink=summary_sink
+    )
+    nastran_files = os.path.join(output_dir, "nastran_files")
+    includes = []
+    for part in PARTS:
+        assert not os.path.exists(os.path.join(nastran_files, part + ".nas"))
+        with gzip.open(os.path.join(nastran_files, part + ".nas.gz"), "rt") as f:
+            includes.extend(include_file(line) for line in f if include_file(line))
+    assert includes == ["interfaces/PART_A.I.PART_B.inc"] * 2
+    assert os.path.isfile(os.path.join(nastran_files, includes[0]))
+
+
+def test_phase_timing_columns(tmp_path, fake_model):
+    script = load_script(tmp_path, phase_timing=True)
+    output_dir = str(tmp_path / "export")
+    os.makedirs(output_dir)
+    summary_sink = MemorySummarySink()
+    script.output_pid_to_nastran(
+        output_dir, part_names=PARTS, summary_sink=summary_sink
+    )
+    # the phase times follow the summary columns, in the order the phases run
+    assert summary_sink.headers == SUMMARY_HEADERS + PHASE_HEADERS
+    rows = [row for index, row in sorted(summary_sink.rows)]
+    assert [row[0] for row in rows] == PARTS
+    for row in rows:
+        assert len(row) == len(SUMMARY_HEADERS) + len(PHASE_HEADERS)
+        times = dict(zip(PHASE_HEADERS, row[len(SUMMARY_HEADERS) :]))
+        for header in PHASE_HEADERS[:3]:
+            assert float(times[header]) >= 0.0
+        # the volume PSOLIDs are deleted once at the end of the run, not per part
+        assert times["deleteVolumePIDs Time (s)"] is None
+    assert os.path.isfile(os.path.join(output_dir, "export_trace.json"))
+
+
+def test_phase_timing_off(tmp_path, fake_model):
+    output_dir = str(tmp_path)
+    summary_sink = MemorySummarySink()
+    output_pid_to_nastran(output_dir, part_names=PARTS, summary_sink=summary_sink)
+    assert summary_sink.headers == SUMMARY_HEADERS
+    assert all(len(row) == len(SUMMARY_HEADERS) for index, row in summary_sink.rows)
+    assert not os.path.exists(os.path.join(output_dir, "export_trace.json"))
+
+
+def test_visibility_deltas_write_the_same_decks(tmp_path, monkeypatch):
+    from ansa import _model
+
+    # parts that share interface PIDs, exported in another order with visibility_deltas
+    pshells = [
+        [1, "PART_A"],
+        [2, "PART_B"],
+        [3, "PART_A.I.PART_B"],
+        [4, "PART_C"],
+        [5, "PART_B.I.PART_C"],
+        [6, "PART_C_VS"],
+        [7, "PART_D"],
+    ]
+    model_file = write_model(str(tmp_path / "model.json"), pshells)
+    monkeypatch.setenv("FAKE_ANSA_MODEL", model_file)
+    parts = ["PART_A", "PART_D", "PART_C", "PART_B"]
+    exports = []
+    for name, settings in [
+        ("full", dict(visibility_deltas=False)),
+        ("deltas", dict(visibility_deltas=True)),
+        ("resync", dict(visibility_deltas=True, visibility_resync_parts=1)),
+    ]:
+        output_dir = str(tmp_path / name)
+        os.makedirs(output_dir)
+        script = load_script(output_dir, **settings)
+        monkeypatch.setattr(_model, "_model", None)
+        summary_sink = MemorySummarySink()
+        script.output_pid_to_nastran(
+            output_dir, part_names=parts, summary_sink=summary_sink
+        )
+        nastran_files = os.path.join(output_dir, "nastran_files")
+        decks = {}
+        for part in parts:
+            with open(os.path.join(nastran_files, part + ".nas")) as f:
+                decks[part] = f.read()
+        exports.append((decks, [row for index, row in sorted(summary_sink.rows)]))
+    assert exports[1] == exports[0]
+    assert exports[2] == exports[0]
+    # every deck holds the elements of its own PIDs only
+    assert "PART_D" in exports[0][0]["PART_D"]
+    assert "PART_A" not in exports[0][0]["PART_D"]
+
+
+def test_rejected_job_names_are_listed(tmp_path, fake_model):
+    output_dir = str(tmp_path)
+    assert [row[0] for row in export(output_dir, ["PART_A", "PART..B"])] == ["PART_A"]
+    # a job has no reject report, the warning names the rejected parts
+    assert not os.path.exists(os.path.join(output_dir, "Unique_PIDs_Rejected.csv"))
+    with open(os.path.join(output_dir, "OutputPIDtoNastran.log")) as f:
+        log = f.read()
+    assert (
+        "1 part names of the job are invalid and skipped: "
+        "PART..B (empty segment between '.' separators)"
+    ) in log
+    assert "Unique_PIDs_Rejected.csv" not in log
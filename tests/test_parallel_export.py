@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from conftest import FAKE_ANSA_DIR, REPO_DIR, load_script
+from parallel_export import run_parallel_export
+from xlsx_writer import write_xlsx
+
+PARTS = ["PART_A", "PART_A_C", "PART_B", "PART_C", "INLET"]
+
+
+def summary_rows(output_dir):
+    # the summary columns without the phase times, as read by ANSA
+    from ansa import utils
+
+    cells = utils.XlsxOpen(os.path.join(output_dir, "Unique_PIDs_Summary.xlsx")).sheets
+    cells = cells["Sheet1"]
+    num_rows = max(row for row, col in cells) + 1
+    return [[cells.get((row, col)) for col in range(6)] for row in range(num_rows)]
+
+
+def decks(output_dir):
+    directory = os.path.join(output_dir, "nastran_files")
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name)) as f:
+            files[name] = f.read()
+    return files
+
+
+@pytest.fixture
+def export_dirs(tmp_path, fake_model, monkeypatch):
+    # output directories of a single process run and of the coordinator, with the same part list
+    monkeypatch.setenv(
+        "PYTHONPATH",
+        os.pathsep.join([FAKE_ANSA_DIR, REPO_DIR, os.environ.get("PYTHONPATH", "")]),
+    )
+    dirs = []
+    for name in ("single", "parallel"):
+        output_dir = str(tmp_path / name)
+        os.makedirs(output_dir)
+        write_xlsx(
+            os.path.join(output_dir, "Unique_PIDs.xlsx"),
+            [("Sheet1", [[part] for part in PARTS])],
+        )
+        dirs.append(output_dir)
+    return dirs
+
+
+def test_parallel_export_matches_single_process(export_dirs):
+    from OutputPIDtoNastran import output_pid_to_nastran
+
+    single_dir, parallel_dir = export_dirs
+    output_pid_to_nastran(single_dir)
+    output_xl_file = run_parallel_export(parallel_dir, None, 3, "{python} {script}")
+    assert output_xl_file == os.path.join(parallel_dir, "Unique_PIDs_Summary.xlsx")
+
+    rows = summary_rows(parallel_dir)
+    assert [row[0] for row in rows] == ["Part Name"] + PARTS[:4]
+    assert rows == summary_rows(single_dir)
+    assert decks(parallel_dir) == decks(single_dir)
+    for shard_index in range(3):
+        assert os.path.isfile(
+            os.path.join(parallel_dir, "OutputPIDtoNastran_%d.log" % shard_index)
+        )
+    # phase timing is off by default, no trace files
+    assert not os.path.exists(os.path.join(parallel_dir, "export_trace.json"))
+
+
+def test_failing_worker(export_dirs):
+    parallel_dir = export_dirs[1]
+    # worker 1 fails before it exports anything, the others run the script
+    command = (
+        "{python} -c \"import sys, runpy; sys.exit(3) if '{shard}' == '1' "
+        "else runpy.run_path('{script}', run_name='__main__')\""
+    )
+    with pytest.raises(RuntimeError, match="Workers 1 failed"):
+        run_parallel_export(parallel_dir, None, 3, command)
+    shard_dir = os.path.join(parallel_dir, "shards")
+    assert os.path.isfile(os.path.join(shard_dir, "summary_0.jsonl"))
+    assert not os.path.isfile(os.path.join(shard_dir, "summary_1.jsonl"))
+    assert os.path.isfile(os.path.join(shard_dir, "worker_1.log"))
+    # no summary is written from the rows of the other workers
+    assert not os.path.isfile(os.path.join(parallel_dir, "Unique_PIDs_Summary.xlsx"))
+
+
+def test_worker_bundles_are_merged(export_dirs, tmp_path, monkeypatch):
+    import parallel_export
+    from deck_sinks import read_bundle_index, read_bundled_deck
+
+    parallel_dir = export_dirs[1]
+    script = load_script(tmp_path, deck_output="bundle")
+    monkeypatch.setattr(parallel_export, "EXPORT_SCRIPT", script.__file__)
+    run_parallel_export(parallel_dir, None, 3, "{python} {script}")
+    assert not os.path.exists(os.path.join(parallel_dir, "nastran_files_0.tar"))
+    bundle_file = os.path.join(parallel_dir, "nastran_files.tar")
+    index = read_bundle_index(bundle_file)
+    assert sorted(index) == [part + ".nas" for part in sorted(PARTS[:4])]
+    deck = read_bundled_deck(bundle_file, "PART_B.nas", index).decode("latin-1")
+    assert "ENDDATA" in deck
+
+    # a second run skips the parts of the merged bundle, no deck is added
+    size = os.path.getsize(bundle_file)
+    run_parallel_export(parallel_dir, None, 3, "{python} {script}")
+    assert os.path.getsize(bundle_file) == size
+    assert summary_rows(parallel_dir)[1][0] == "PART_A"
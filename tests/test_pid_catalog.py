@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import random
+
+from pid_catalog import build_catalog
+
+
+class Pid:
+    # stand-in for a PSHELL entity
+    def __init__(self, id, name):
+        self._id = id
+        self._name = name
+
+
+def original_unique_pid_list(names):
+    # the loop of the original CollectPIDNames.py
+    pid_list = [name.strip() for name in names]
+    unique_pid_list = []
+    for pid_name in pid_list:
+        if ".I." in pid_name:
+            for name in pid_name.split(".I."):
+                if name not in unique_pid_list:
+                    unique_pid_list.append(name)
+        elif pid_name not in unique_pid_list:
+            unique_pid_list.append(pid_name)
+    return unique_pid_list
+
+
+def test_catalog():
+    names = [
+        "PART_B",
+        " PART_A ",
+        "PART_A.I.PART_C",
+        "PART_C_VS",
+        "PART_B",
+        "PART_D.I.PART_B\t",
+        "PART_E.I.PART_F.I.PART_E",
+    ]
+    pids = [Pid(n + 1, name) for n, name in enumerate(names)]
+    renamed = []
+    catalog = build_catalog(pids, lambda pid, name: renamed.append((pid._id, name)))
+    assert catalog.pid_names == [name.strip() for name in names]
+    # parts in the order they are first found, both sides of an interface
+    assert catalog.unique_pid_list == [
+        "PART_B",
+        "PART_A",
+        "PART_C",
+        "PART_C_VS",
+        "PART_D",
+        "PART_E",
+        "PART_F",
+    ]
+    assert catalog.unique_pid_list == original_unique_pid_list(names)
+    # only the names with whitespace are renamed
+    assert renamed == [(2, "PART_A"), (6, "PART_D.I.PART_B")]
+    assert build_catalog(pids).unique_pid_list == catalog.unique_pid_list
+
+
+def test_same_parts_for_random_names():
+    rng = random.Random(0)
+    tokens = ["PART_A", "PART_B", "PART_C", "_VS", ".I.", " ", "X", "."]
+    names = [
+        "".join(rng.choice(tokens) for n in range(rng.randint(1, 5)))
+        for n in range(500)
+    ]
+    pids = [Pid(n + 1, name) for n, name in enumerate(names)]
+    assert build_catalog(pids).unique_pid_list == original_unique_pid_list(names)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import re
+import random
+
+import pytest
+
+from pid_matching import PidClassifier
+
+# the lists of OutputPIDtoNastran.py
+IGNORE_PREFIX_LIST = ["AIR_EXT"]
+IGNORE_PID_LIST = ["INLET", "OUTLET", "AIR_EXT"]
+IGNORE_SUFFIX_LIST = [
+    "_CS",
+    "_VS",
+    "_MI",
+    "_INLET",
+    "_OUTLET",
+    "_Q",
+    "_CR",
+    "_AIR_EXT_",
+]
+
+
+class Pid:
+    # stand-in for a PSHELL entity
+    def __init__(self, id, name):
+        self._id = id
+        self._name = name
+
+    def __repr__(self):
+        return "Pid(%d, %r)" % (self._id, self._name)
+
+
+NAMES = [
+    # suffixes, regions and _AUX sources
+    "PART_A",
+    "PART_A_C",
+    "PART_A_VS",
+    "PART_A_C_VS",
+    "PART_A_SI_CS",
+    "PART_A_AUX_CS",
+    "PART_A_AUX2_VS",
+    "PART_A_AUX_AUX3_MI1A",
+    "PART_A_AUX_CVTMS_CS",
+    "PART_A_MI2B",
+    "PART_A_Q4X",
+    "PART_A_CSCS",
+    "PART_A_VS_CS",
+    "PART_AB_VS",
+    "XPART_A_VS",
+    "PART_B_INLET",
+    "PART_B_OUTLET2",
+    "PART_B_AIR_EXT_1",
+    # dots
+    "PART.A",
+    "PART.A_VS",
+    "PARTXA_VS",
+    "PART..A",
+    "P.1.X_CS",
+    "P21X_CR",
+    # regex characters
+    "PART(1)",
+    "PART(1)_CS",
+    "PART1_CS",
+    "PART+A_VS",
+    "PARTTTA_VS",
+    "PARTA[1]_MI",
+    "A{2}_Q",
+    "AA_Q",
+    "A|B_VS",
+    "B_VS",
+    # interfaces, duplicates and invalid names
+    "PART_A.I.PART_B",
+    "PART_A_CS.I.PART_A",
+    "PART_A.I.PART_A",
+    "PART_B_VS.I.PART.A_CS",
+    "PART_A.I.PART_B.I.PART_C",
+    "PART_A_VS",
+    "PART_B",
+    # ignored names
+    "INLET",
+    "OUTLET",
+    "AIR_EXT",
+    "AIR_EXT_TOP",
+]
+PARTS = [
+    "PART_A",
+    "PART_A_C",
+    "PART_AB",
+    "PART_B",
+    "PART.A",
+    "PART..A",
+    "P.1.X",
+    "PART(1)",
+    "PART+A",
+    "PARTA[1]",
+    "A{2}",
+    "A|B",
+    "PART_A_VS",
+    "INLET",
+    "OUTLET",
+    "AIR_EXT",
+    "AIR_EXT_TOP",
+    "PART_C",
+]
+
+
+def original_ignore_reason(part_to_export):
+    # the checks of the original export loop
+    if any(
+        re.search(r"\w+" + suffix + r"+(\d*\w*)*$", part_to_export)
+        for suffix in IGNORE_SUFFIX_LIST
+    ):
+        return part_to_export + " contains an ignored suffix."
+    elif any(
+        re.search("^" + prefix + r"\w+", part_to_export)
+        for prefix in IGNORE_PREFIX_LIST
+    ):
+        return part_to_export + " begins with an ignored prefix."
+    elif part_to_export in IGNORE_PID_LIST:
+        return part_to_export + " is an ignored PID."
+    return None
+
+
+def original_matches(part_to_export, all_pids):
+    # the PID loop of the original export loop, for one part
+    def matches(side):
+        return side == part_to_export or any(
+            re.search(part_to_export + r"(_AUX\d*)*" + suffix + r"+(\d*\w*)*$", side)
+            for suffix in IGNORE_SUFFIX_LIST
+        )
+
+    matching_entities = []
+    for pid in all_pids:
+        split_pid = pid._name.split(".I.")
+        if len(split_pid) > 2:
+            continue
+        for side in split_pid:
+            if matches(side):
+                matching_entities.append(pid)
+    return matching_entities
+
+
+def check_same_matches(names, parts):
+    all_pids = [Pid(n + 1, name) for n, name in enumerate(names)]
+    classifier = PidClassifier(IGNORE_SUFFIX_LIST, IGNORE_PREFIX_LIST, IGNORE_PID_LIST)
+    part_index, invalid = classifier.build_part_index(all_pids, parts)
+    assert invalid == [name for name in names if name.count(".I.") > 1]
+    for part in parts:
+        reason = original_ignore_reason(part)
+        assert classifier.ignore_reason(part) == reason
+        if reason is None:
+            assert part_index[part] == original_matches(part, all_pids), part
+
+
+def test_same_matches_as_the_export_loop():
+    check_same_matches(NAMES, PARTS)
+    part_index = PidClassifier(IGNORE_SUFFIX_LIST).build_part_index(
+        [Pid(1, "PART_A_CS.I.PART_A"), Pid(2, "PART.A_VS")], ["PART_A", "PART.A"]
+    )[0]
+    # a PID is added once per matching side, a '.' of the part name matches any character
+    assert [pid._id for pid in part_index["PART_A"]] == [1, 1]
+    assert [pid._id for pid in part_index["PART.A"]] == [1, 2]
+
+
+def test_classified_names_give_the_same_index():
+    all_pids = [Pid(n + 1, name) for n, name in enumerate(NAMES)]
+    classifier = PidClassifier(IGNORE_SUFFIX_LIST, IGNORE_PREFIX_LIST, IGNORE_PID_LIST)
+    names = [classifier.classify(pid._name) for pid in all_pids]
+    assert classifier.build_part_index(all_pids, PARTS, names) == (
+        classifier.build_part_index(all_pids, PARTS)
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_same_matches_for_random_names(seed):
+    rng = random.Random(seed)
+    tokens = ["PART", "A", "B", "1", "_", ".", "_AUX", "2", "_C", "X", "+", "(1)"]
+    tails = ["", "", "_CS", "_VS", "_MI1A", "_Q", "_INLET", "_AUX_CS", "_CSCS"]
+
+    def side():
+        return "".join(rng.choice(tokens) for n in range(rng.randint(1, 4)))
+
+    def valid_pattern(part):
+        # the export loop fails on part names that are not a valid pattern, e.g. '+A'
+        try:
+            re.compile(part)
+        except re.error:
+            return False
+        return True
+
+    parts = sorted(
+        set(part for part in (side() for n in range(60)) if valid_pattern(part))
+    )
+    names = []
+    for n in range(150):
+        name = rng.choice(parts + [side()]) + rng.choice(tails)
+        if rng.random() < 0.3:
+            name += ".I." + rng.choice(parts) + rng.choice(tails)
+        if rng.random() < 0.05:
+            name += ".I." + side()
+        names.append(name)
+    check_same_matches(names, parts)
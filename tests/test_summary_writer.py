@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+
+from summary_writer import (
+    SUMMARY_HEADERS,
+    SummaryWriter,
+    AnsaXlsxSink,
+    ShardSummarySink,
+    read_shard_summary,
+    merge_shard_summaries,
+)
+
+TRACE = [["Script Version", "07162024"]]
+
+
+def row(part):
+    return [part, "0", "0", "True", "1", str([part])]
+
+
+def test_shard_rows_are_written_through(tmp_path):
+    summary_file = str(tmp_path / "summary_0.jsonl")
+    sink = ShardSummarySink(summary_file)
+    summary = SummaryWriter(sink, SUMMARY_HEADERS, TRACE, flush_every=2)
+    summary.add(0, row("PART_A"))
+    summary.add(2, row("PART_C"))
+    # the flushed rows survive a crash of the worker, the coordinator only merges finished shards
+    assert not os.path.exists(summary_file)
+    headers, trace, rows = read_shard_summary(sink.partial_file)
+    assert headers == SUMMARY_HEADERS
+    assert rows == [[0, row("PART_A")], [2, row("PART_C")]]
+
+    summary.add(4, row("PART_E"))
+    summary.close()
+    assert not os.path.exists(sink.partial_file)
+    assert read_shard_summary(summary_file)[2][-1] == [4, row("PART_E")]
+
+
+def test_merge_shard_summaries(tmp_path):
+    from ansa import utils
+
+    summary_files = []
+    for shard_index, parts in enumerate([["PART_A", "PART_C"], ["PART_B"]]):
+        summary_file = str(tmp_path / ("summary_%d.jsonl" % shard_index))
+        summary = SummaryWriter(ShardSummarySink(summary_file), SUMMARY_HEADERS, TRACE)
+        for part in parts:
+            summary.add(ord(part[-1]) - ord("A"), row(part))
+        summary.close()
+        summary_files.append(summary_file)
+    output_xl_file = str(tmp_path / "Unique_PIDs_Summary.xlsx")
+    assert merge_shard_summaries(summary_files, output_xl_file) == 3
+
+    sheets = utils.XlsxOpen(output_xl_file).sheets
+    assert [sheets["Sheet1"][(n, 0)] for n in range(4)] == [
+        "Part Name",
+        "PART_A",
+        "PART_B",
+        "PART_C",
+    ]
+    assert sheets["Sheet2"][(1, 0)] == "Workers"
+    assert sheets["Sheet2"][(1, 1)] == "2"
+
+
+def test_ansa_workbook_is_saved_at_close(tmp_path, monkeypatch):
+    from ansa import utils
+
+    saved = []
+    xlsx_save = utils.XlsxSave
+    monkeypatch.setattr(
+        utils, "XlsxSave", lambda *args: saved.append(args) or xlsx_save(*args)
+    )
+    output_xl_file = str(tmp_path / "Unique_PIDs_Summary.xlsx")
+    summary = SummaryWriter(
+        AnsaXlsxSink(output_xl_file), SUMMARY_HEADERS, TRACE, flush_every=1
+    )
+    for n, part in enumerate(["PART_A", "PART_B", "PART_C"]):
+        summary.add(n, row(part))
+    assert saved == []
+    # the flushed rows survive a crash in the spool file
+    with open(summary.sink.spool_file, "r", encoding="utf-8") as f:
+        assert [json.loads(line)[0] for line in f] == ["PART_A", "PART_B", "PART_C"]
+    summary.close()
+    assert len(saved) == 1
+    assert not os.path.exists(summary.sink.spool_file)
+    sheets = utils.XlsxOpen(output_xl_file).sheets
+    assert sheets["Sheet1"][(3, 0)] == "PART_C"
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import gzip
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from volume_analysis import VolumeReport, analyse_directory
+
+# unit cube: 8 GRIDs and 6 CQUAD4s, a watertight shell
+GRIDS = [(x, y, z) for z in (0, 1) for y in (0, 1) for x in (0, 1)]
+FACES = [
+    (1, 3, 4, 2),
+    (5, 6, 8, 7),
+    (1, 2, 6, 5),
+    (3, 7, 8, 4),
+    (1, 5, 7, 3),
+    (2, 4, 8, 6),
+]
+
+
+def cube_deck(faces=FACES):
+    lines = ["BEGIN BULK\n"]
+    for n, (x, y, z) in enumerate(GRIDS, 1):
+        lines.append("GRID    %8d        %8.1f%8.1f%8.1f\n" % (n, x, y, z))
+    for n, grids in enumerate(faces, 1):
+        lines.append(
+            "CQUAD4  %8d       1" % n + "".join("%8d" % g for g in grids) + "\n"
+        )
+    lines.append("ENDDATA\n")
+    return "".join(lines)
+
+
+def test_plain_and_gzip_decks(tmp_path):
+    with open(str(tmp_path / "CLOSED.nas"), "w") as f:
+        f.write(cube_deck())
+    with gzip.open(str(tmp_path / "OPEN.nas.gz"), "wt") as f:
+        f.write(cube_deck(FACES[:5]))
+    (tmp_path / "OTHER.txt").write_text("not a deck")
+    assert analyse_directory(str(tmp_path)) == [
+        ("CLOSED", VolumeReport(1, 1, 0)),
+        ("OPEN", VolumeReport(1, 0, 4)),
+    ]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from ansa import base, mesh, _model
+from ansa._model import Entity
+
+from OutputPIDtoNastran import (
+    AUTO_VOLUME_NAME,
+    VolumePidTracker,
+    deleteVolumePIDs,
+    output_pid_to_nastran,
+)
+from summary_writer import MemorySummarySink
+
+
+def detect_volumes(num_volumes):
+    # VolumesDetect of a model where every part is closed: one PSOLID per volume
+    def volumes_detect(*args, **kwargs):
+        volumes = []
+        for n in range(num_volumes):
+            psolid_id = 900000 + len(_model.model().psolids)
+            _model.model().psolids.append(Entity("PSOLID", psolid_id, AUTO_VOLUME_NAME))
+            volumes.append(Entity("VOLUME", psolid_id))
+        return volumes
+
+    return volumes_detect
+
+
+def psolid_names():
+    return [psolid._name for psolid in base.CollectEntities(0, None, "PSOLID")]
+
+
+def test_deferred_cleanup_when_no_volume_is_deleted(tmp_path, fake_model, monkeypatch):
+    _model.model().psolids.append(Entity("PSOLID", 77, "SOLID_PART"))
+    monkeypatch.setattr(mesh, "VolumesDetect", detect_volumes(2))
+    # the volumes are not deleted, their PSOLIDs still are
+    monkeypatch.setattr(mesh, "VolumesDelete", lambda volume: 0)
+    summary_sink = MemorySummarySink()
+    output_pid_to_nastran(
+        str(tmp_path), part_names=["PART_A", "PART_B"], summary_sink=summary_sink
+    )
+    rows = [row for index, row in sorted(summary_sink.rows)]
+    assert [row[:3] for row in rows] == [["PART_A", "2", "0"], ["PART_B", "2", "0"]]
+    assert psolid_names() == ["SOLID_PART"]
+
+
+def test_delete_volume_pids(fake_model, caplog):
+    psolids = _model.model().psolids
+    psolids.append(Entity("PSOLID", 77, "SOLID_PART"))
+    # left by an earlier run
+    psolids.append(Entity("PSOLID", 78, AUTO_VOLUME_NAME))
+    volume_pids = VolumePidTracker()
+    assert volume_pids.num_leftover == 1
+
+    detect_volumes(3)()
+    volume_pids.add(3)
+    log = logging.getLogger("test_volume_pids")
+    assert deleteVolumePIDs(volume_pids, log) == 4
+    assert psolid_names() == ["SOLID_PART"]
+    assert volume_pids.num_volumes_detected == 0
+
+    # a PSOLID of a detected volume is missing
+    detect_volumes(1)()
+    volume_pids.add(2)
+    with caplog.at_level(logging.WARNING):
+        assert deleteVolumePIDs(volume_pids, log) == 1
+    assert "1 'Auto Detected Volume' PSOLIDs deleted for 2 detected volumes" in (
+        caplog.text
+    )
+    assert psolid_names() == ["SOLID_PART"]
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import os
+import zipfile
+
+import pytest
+
+from xlsx_reader import (
+    iter_first_column,
+    part_list_file,
+    read_part_list,
+    write_reject_report,
+)
+
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Other" sheetId="2" r:id="rId2"/><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="/xl/worksheets/other.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="strings.xml"/>
+</Relationships>"""
+SHARED_STRINGS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<si><t>PART_A</t></si>
+<si><t>not used</t></si>
+<si><r><rPr><b/></rPr><t>PART</t></r><r><t xml:space="preserve">_B</t></r><rPh sb="0" eb="1"><t>PA</t></rPh></si>
+<si><t>B column</t></si>
+</sst>"""
+
+
+def sheet(rows):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        "<sheetData>" + "".join(rows) + "</sheetData></worksheet>"
+    )
+
+
+def write_workbook(xlsx_file, rows, other_rows=()):
+    with zipfile.ZipFile(xlsx_file, "w") as xlsx:
+        xlsx.writestr("xl/workbook.xml", WORKBOOK)
+        xlsx.writestr("xl/_rels/workbook.xml.rels", RELS)
+        xlsx.writestr("xl/strings.xml", SHARED_STRINGS)
+        xlsx.writestr("xl/worksheets/sheet1.xml", sheet(rows))
+        xlsx.writestr("xl/worksheets/other.xml", sheet(other_rows))
+    return xlsx_file
+
+
+def test_cell_forms(tmp_path):
+    rows = [
+        # shared string, with a shared string in column B
+        '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>3</v></c></row>',
+        # rich text shared string, the phonetic run is left out
+        '<row r="2"><c r="B2"><v>1</v></c><c r="A2" t="s"><v>2</v></c></row>',
+        # inline string
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>PART_C</t></is></c></row>',
+        # formula string, number and boolean
+        '<row r="4"><c r="A4" t="str"><f>"PART_"&amp;"D"</f><v>PART_D</v></c></row>',
+        '<row r="5"><c r="A5"><v>12</v></c></row>',
+        '<row r="6"><c r="A6" t="b"><v>1</v></c></row>',
+        # no r attributes on the row and its cells: the first cell is column A
+        '<row><c t="inlineStr"><is><t>PART_E</t></is></c><c><v>3</v></c></row>',
+        '<row><c t="s"><v>0</v></c></row>',
+    ]
+    xlsx_file = write_workbook(str(tmp_path / "Unique_PIDs.xlsx"), rows)
+    assert list(iter_first_column(xlsx_file)) == [
+        "PART_A",
+        "PART_B",
+        "PART_C",
+        "PART_D",
+        "12",
+        "TRUE",
+        "PART_E",
+        "PART_A",
+    ]
+
+
+@pytest.mark.parametrize(
+    "gap",
+    [
+        # a row missing from the sheet
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>PART_C</t></is></c></row>',
+        # a row without a cell in column A
+        '<row r="2"><c r="B2" t="s"><v>3</v></c></row>'
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>PART_C</t></is></c></row>',
+        # an empty cell in column A
+        '<row r="2"><c r="A2" t="inlineStr"><is><t></t></is></c></row>'
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>PART_C</t></is></c></row>',
+        '<row r="2"><c r="A2" s="1"/></row>'
+        '<row r="3"><c r="A3" t="inlineStr"><is><t>PART_C</t></is></c></row>',
+        # a cell without r attribute that is not the first of its row
+        '<row r="2"><c r="A2" s="1"/><c t="s"><v>0</v></c></row>',
+    ],
+)
+def test_reading_stops_at_the_first_gap(tmp_path, gap):
+    rows = ['<row r="1"><c r="A1" t="s"><v>0</v></c></row>', gap]
+    xlsx_file = write_workbook(str(tmp_path / "Unique_PIDs.xlsx"), rows)
+    assert list(iter_first_column(xlsx_file)) == ["PART_A"]
+
+
+def test_other_sheet(tmp_path):
+    xlsx_file = write_workbook(
+        str(tmp_path / "Unique_PIDs.xlsx"),
+        [],
+        ['<row r="1"><c r="A1" t="s"><v>2</v></c></row>'],
+    )
+    assert list(iter_first_column(xlsx_file)) == []
+    assert list(iter_first_column(xlsx_file, "Other")) == ["PART_B"]
+    with pytest.raises(KeyError):
+        list(iter_first_column(xlsx_file, "Missing"))
+
+
+def test_rejected_names(tmp_path):
+    names = ["PART_A", "PART..A", "PART_A.I.PART_B", "PART_B.", "PART_C"]
+    rows = [
+        '<row r="%d"><c r="A%d" t="inlineStr"><is><t>%s</t></is></c></row>'
+        % (n, n, name)
+        for n, name in enumerate(names, 1)
+    ]
+    xlsx_file = write_workbook(str(tmp_path / "Unique_PIDs.xlsx"), rows)
+    reason = "empty segment between '.' separators"
+    assert read_part_list(xlsx_file) == (
+        ["PART_A", "PART_A.I.PART_B", "PART_C"],
+        [(2, "PART..A", reason), (4, "PART_B.", reason)],
+    )
+    report_file = str(tmp_path / "Unique_PIDs_Rejected.csv")
+    write_reject_report(report_file, read_part_list(xlsx_file)[1])
+    with open(report_file) as f:
+        assert f.readline().strip() == "Row,Name,Reason"
+    write_reject_report(report_file, [])
+    assert not os.path.exists(report_file)
+
+
+def test_csv_part_list(tmp_path):
+    input_xl_file = str(tmp_path / "Unique_PIDs.xlsx")
+    assert part_list_file(input_xl_file) is None
+    csv_file = str(tmp_path / "Unique_PIDs.csv")
+    with open(csv_file, "w", encoding="utf-8-sig") as f:
+        f.write("PART_A,1\nPART..B\nPART_C\n\nPART_D\n")
+    assert part_list_file(input_xl_file) == csv_file
+    assert read_part_list(csv_file) == (
+        ["PART_A", "PART_C"],
+        [(2, "PART..B", "empty segment between '.' separators")],
+    )
+    write_workbook(input_xl_file, [])
+    assert part_list_file(input_xl_file) == input_xl_file
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Closed volume check of exported Nastran files, without ANSA.
+
+mesh.VolumesDetect creates "Auto Detected Volume" PSOLIDs that have to be deleted again, so checking a
+part changes the database and is one of the slowest steps of the export. Here the written .nas file is
+read into NumPy arrays, the shell elements are grouped into connected components (elements that share
+an edge) and a component is counted as a closed volume if every one of its edges is shared by exactly
+two elements, i.e. it is a watertight shell.
+
+Run over a whole nastran_files directory (.nas and .nas.gz decks):
+    python volume_analysis.py C:/exports/vehicle/nastran_files --csv volumes.csv
+"""
+
+import os
+import sys
+import glob
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from nastran_deck import (
+    SHELL_CARDS,
+    iter_cards,
+    iter_deck_lines,
+    card_data,
+    field_int,
+    field_float,
+)
+
+# node_ids: (n,) grid ids, coords: (n, 3) basic coordinates as written (CP is not applied)
+# element_ids, pids: (m,) element ids and property ids
+# connectivity: (m, 4) grid ids of the elements, -1 for the 4th grid of triangles
+ShellMesh = namedtuple(
+    "ShellMesh", ["node_ids", "coords", "element_ids", "pids", "connectivity"]
+)
+# num_components: connected shells, num_closed: watertight shells, num_free_edges: edges with one element
+VolumeReport = namedtuple(
+    "VolumeReport", ["num_components", "num_closed", "num_free_edges"]
+)
+
+
+def read_shell_mesh(nas_file):
+    node_ids = []
+    coords = []
+    element_ids = []
+    pids = []
+    connectivity = []
+    # interface include files (see nastran_deck.py) are read as part of the deck
+    for card in iter_cards(iter_deck_lines(nas_file)):
+        if card.name == "GRID":
+            data = card_data(card) + [""] * 5
+            node_ids.append(field_int(data[0]))
+            coords.append([field_float(data[n], 0.0) for n in (2, 3, 4)])
+        elif card.name in SHELL_CARDS:
+            num_grids = SHELL_CARDS[card.name]
+            data = card_data(card) + [""] * 6
+            eid = field_int(data[0])
+            element_ids.append(eid)
+            pids.append(field_int(data[1], eid))
+            grids = [field_int(field, -1) for field in data[2 : 2 + num_grids]]
+            connectivity.append(grids + [-1] * (4 - num_grids))
+    return ShellMesh(
+        np.array(node_ids, dtype=np.int64),
+        np.array(coords, dtype=np.float64).reshape(-1, 3),
+        np.array(element_ids, dtype=np.int64),
+        np.array(pids, dtype=np.int64),
+        np.array(connectivity, dtype=np.int64).reshape(-1, 4),
+    )
+
+
+def element_edges(connectivity):
+    # returns the element index and a single int64 key of every element edge
+    # (edges are undirected, so the key is built from the smaller and the larger grid id)
+    starts = connectivity
+    ends = np.roll(connectivity, -1, axis=1)
+    triangles = connectivity[:, 3] < 0
+    ends[triangles, 2] = connectivity[triangles, 0]
+    valid = (starts >= 0) & (ends >= 0)
+    element = np.repeat(np.arange(len(connectivity)), 4)[valid.ravel()]
+    low = np.minimum(starts, ends)[valid]
+    high = np.maximum(starts, ends)[valid]
+    keys = low * (int(connectivity.max(initial=0)) + 1) + high
+    return element, keys
+
+
+def shell_components(connectivity):
+    # connected components of the elements, two elements are connected if they share an edge
+    # returns the component of every element, the number of components and the edge data used
+    num_elements = len(connectivity)
+    element, keys = element_edges(connectivity)
+    unique_keys, edge, edge_counts = np.unique(
+        keys, return_inverse=True, return_counts=True
+    )
+    edge = edge.ravel()
+
+    # union-find by label propagation: every element takes the smallest label of the elements it
+    # shares an edge with, followed by pointer jumping, until nothing changes
+    edge_order = np.argsort(edge, kind="stable")
+    edge_starts = np.flatnonzero(np.r_[True, np.diff(edge[edge_order]) != 0])
+    element_starts = np.flatnonzero(np.r_[True, np.diff(element) != 0])
+    element_with_edges = element[element_starts]
+    labels = np.arange(num_elements)
+    while num_elements:
+        edge_min = np.minimum.reduceat(labels[element[edge_order]], edge_starts)
+        new_labels = labels.copy()
+        new_labels[element_with_edges] = np.minimum(
+            labels[element_with_edges],
+            np.minimum.reduceat(edge_min[edge], element_starts),
+        )
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    component_labels, components = np.unique(labels, return_inverse=True)
+    return components.ravel(), len(component_labels), element, edge, edge_counts
+
+
+def analyse_shell_volumes(nas_file):
+    shell_mesh = read_shell_mesh(nas_file)
+    if len(shell_mesh.connectivity) == 0:
+        return VolumeReport(0, 0, 0)
+    components, num_components, element, edge, edge_counts = shell_components(
+        shell_mesh.connectivity
+    )
+    # a component is open if any of its edges is not shared by exactly two elements
+    open_edge = edge_counts[edge] != 2
+    open_component = np.zeros(num_components, dtype=bool)
+    open_component[components[element[open_edge]]] = True
+    return VolumeReport(
+        num_components,
+        int(num_components - open_component.sum()),
+        int((edge_counts == 1).sum()),
+    )
+
+
+def deck_part_name(nas_file):
+    name = os.path.basename(nas_file)
+    if name.endswith(".gz"):
+        name = name[: -len(".gz")]
+    return os.path.splitext(name)[0]
+
+
+def analyse_directory(nastran_dir, processes=1):
+    # returns [(part name, VolumeReport)] for every .nas and .nas.gz file in nastran_dir
+    nas_files = sorted(
+        glob.glob(os.path.join(nastran_dir, "*.nas"))
+        + glob.glob(os.path.join(nastran_dir, "*.nas.gz"))
+    )
+    if processes > 1:
+        from multiprocessing import Pool
+
+        with Pool(processes) as pool:
+            reports = pool.map(analyse_shell_volumes, nas_files, chunksize=8)
+    else:
+        reports = [analyse_shell_volumes(nas_file) for nas_file in nas_files]
+    parts = [deck_part_name(nas_file) for nas_file in nas_files]
+    return list(zip(parts, reports))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count the closed shell volumes of exported Nastran files."
+    )
+    parser.add_argument(
+        "nastran_dir", help="directory with the exported .nas or .nas.gz files"
+    )
+    parser.add_argument("--csv", help="write the results to this csv file")
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    results = analyse_directory(args.nastran_dir, args.processes)
+    out = open(args.csv, "w") if args.csv else sys.stdout
+    out.write("Part Name,Number of Volumes Identified,Shells,Free Edges\n")
+    for part, report in results:
+        out.write(
+            "%s,%d,%d,%d\n"
+            % (part, report.num_closed, report.num_components, report.num_free_edges)
+        )
+    if args.csv:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Reader of the part list (first column of Sheet1 of Unique_PIDs.xlsx) used by OutputPIDtoNastran.py.
+
+utils.XlsxGetCellValue is one ANSA call per cell. Here the sheet XML is streamed from the xlsx zip
+with expat and only the cells of column A are kept, the shared strings they use are looked up in a
+second pass over xl/sharedStrings.xml. Like the ANSA loop, reading stops at the first empty cell of
+column A. A part list saved as CSV (Unique_PIDs.csv, first column) is read if there is no xlsx file.
+
+Names with an empty segment between dots (e.g. "PART..A" or a trailing ".") are rejected, like the
+ANSA loop did. They are returned with their row and written to a reject report by the export script.
+"""
+
+import os
+import re
+import csv
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ElementTree
+from xml.parsers import expat
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CELL_REFERENCE = re.compile(r"([A-Z]+)(\d+)$")
+# element names reported by expat with namespace_separator="}"
+_ROW = _MAIN_NS[1:] + "row"
+_CELL = _MAIN_NS[1:] + "c"
+_VALUE = _MAIN_NS[1:] + "v"
+_TEXT = _MAIN_NS[1:] + "t"
+_STRING = _MAIN_NS[1:] + "si"
+_PHONETIC = _MAIN_NS[1:] + "rPh"
+
+REJECT_REPORT_HEADERS = ["Row", "Name", "Reason"]
+
+
+def invalid_reason(name):
+    # the check of the ANSA loop: every part of the name between dots must be non-empty
+    if any(len(segment) == 0 for segment in name.split(".")):
+        return "empty segment between '.' separators"
+    return None
+
+
+def part_list_file(input_xl_file):
+    # returns the xlsx file, or the CSV file with the same name if there is no xlsx, else None
+    if os.path.isfile(input_xl_file):
+        return input_xl_file
+    csv_file = os.path.splitext(input_xl_file)[0] + ".csv"
+    if os.path.isfile(csv_file):
+        return csv_file
+    return None
+
+
+def read_part_list(input_file, sheet_name="Sheet1"):
+    # returns the valid part names and [(row, name, reason)] of the rejected ones, rows start at 1
+    if input_file.lower().endswith(".csv"):
+        return check_part_names(iter_csv_first_column(input_file))
+    return check_part_names(iter_first_column(input_file, sheet_name))
+
+
+def check_part_names(names):
+    # splits names into the valid ones and [(row, name, reason)] of the rejected ones
+    part_names = []
+    rejected = []
+    for row, name in enumerate(names, 1):
+        reason = invalid_reason(name)
+        if reason is None:
+            part_names.append(name)
+        else:
+            rejected.append((row, name, reason))
+    return part_names, rejected
+
+
+def iter_csv_first_column(csv_file):
+    with open(csv_file, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0]:
+                return
+            yield row[0]
+
+
+def iter_first_column(xlsx_file, sheet_name="Sheet1"):
+    # values of column A from the first row down to the first empty cell
+    with zipfile.ZipFile(xlsx_file) as xlsx:
+        sheet_path, shared_strings_path = _workbook_parts(xlsx, sheet_name)
+        cells = _parse(xlsx, sheet_path, _FirstColumnParser()).cells
+        indices = set(int(value) for kind, value in cells if kind == "s")
+        shared_strings = {}
+        if indices:
+            shared_strings = _parse(
+                xlsx, shared_strings_path, _SharedStringsParser(indices)
+            ).strings
+    for kind, value in cells:
+        yield shared_strings[int(value)] if kind == "s" else value
+
+
+def _workbook_parts(xlsx, sheet_name):
+    # paths in the zip of the worksheet and of the shared strings, from the workbook relationships
+    workbook = ElementTree.fromstring(xlsx.read("xl/workbook.xml"))
+    rel_id = None
+    for sheet in workbook.iter(_MAIN_NS + "sheet"):
+        if sheet.get("name") == sheet_name:
+            rel_id = sheet.get(_REL_NS + "id")
+    if rel_id is None:
+        raise KeyError("No sheet named %s in the workbook" % sheet_name)
+    targets = {}
+    shared_strings_path = "xl/sharedStrings.xml"
+    rels = ElementTree.fromstring(xlsx.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(_PACKAGE_REL_NS + "Relationship"):
+        target = rel.get("Target")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = target
+        if rel.get("Type", "").endswith("/sharedStrings"):
+            shared_strings_path = target
+    if rel_id not in targets:
+        raise KeyError("No worksheet for sheet %s in the workbook" % sheet_name)
+    return targets[rel_id], shared_strings_path
+
+
+class _FirstColumnParser:
+    # expat handlers that keep [(cell type, value)] of column A down to the first empty cell, "s"
+    # values are shared string indices. expat is used directly because the sheet has several elements
+    # per row that are not needed, building Elements for them takes most of the time of iterparse
+    def __init__(self):
+        self.cells = []
+        self._row_num = 0
+        # position of the cell in its row, for cells without a reference
+        self._column = 0
+        self._cell = None  # [row, type, value] of the current column A cell
+        self._text = None  # text of the current <v> or inline <t> of a column A cell
+
+    def start(self, name, attrs):
+        if name == _CELL:
+            self._column += 1
+            reference = attrs.get("r")
+            if reference:
+                match = _CELL_REFERENCE.match(reference)
+                if match.group(1) != "A":
+                    return
+                row = int(match.group(2))
+            elif self._column == 1:
+                row = self._row_num
+            else:
+                return
+            kind = attrs.get("t", "n")
+            self._cell = [row, "str" if kind == "inlineStr" else kind, None]
+        elif name == _ROW:
+            self._row_num = int(attrs.get("r") or self._row_num + 1)
+            self._column = 0
+        elif self._cell is not None and name in (_VALUE, _TEXT):
+            self._text = []
+
+    def end(self, name):
+        if self._text is not None and name in (_VALUE, _TEXT):
+            self._cell[2] = (self._cell[2] or "") + "".join(self._text)
+            self._text = None
+        elif name == _CELL and self._cell is not None:
+            row, kind, value = self._cell
+            self._cell = None
+            if kind == "b" and value is not None:
+                kind, value = "str", "TRUE" if value == "1" else "FALSE"
+            if row != len(self.cells) + 1 or value is None or value == "":
+                raise _StopParsing
+            self.cells.append((kind, value))
+        elif name == _ROW and len(self.cells) < self._row_num:
+            raise _StopParsing  # row without a value in column A
+
+    def text(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+
+class _StopParsing(Exception):
+    # raised by the handlers when the rest of the part is not needed
+    pass
+
+
+class _SharedStringsParser:
+    # expat handlers that keep {index: text} of the wanted shared strings, the text of a string is
+    # its <t> or the <t> of its rich text runs (phonetic runs are left out)
+    def __init__(self, indices):
+        self.strings = {}
+        self._indices = indices
+        self._last = max(indices)
+        self._index = -1
+        self._text = None  # text parts of the current wanted string
+        self._in_t = False
+        self._phonetic = 0
+
+    def start(self, name, attrs):
+        if name == _STRING:
+            self._index += 1
+            self._text = [] if self._index in self._indices else None
+        elif name == _PHONETIC:
+            self._phonetic += 1
+        elif name == _TEXT and self._text is not None and not self._phonetic:
+            self._in_t = True
+
+    def end(self, name):
+        if name == _TEXT:
+            self._in_t = False
+        elif name == _PHONETIC:
+            self._phonetic -= 1
+        elif name == _STRING:
+            if self._text is not None:
+                self.strings[self._index] = "".join(self._text)
+                self._text = None
+            if self._index == self._last:
+                raise _StopParsing
+
+    def text(self, data):
+        if self._in_t:
+            self._text.append(data)
+
+
+def _parse(xlsx, path, handler):
+    # feeds a part of the xlsx zip to handler block by block, until the handler raises _StopParsing
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.text
+    with xlsx.open(path) as f:
+        try:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                parser.Parse(block, False)
+            parser.Parse(b"", True)
+        except _StopParsing:
+            pass
+    return handler
+
+
+def write_reject_report(report_file, rejected):
+    # rejected: [(row, name, reason)], the report of an earlier run is removed if nothing was rejected
+    if not rejected:
+        if os.path.isfile(report_file):
+            os.remove(report_file)
+        return
+    with open(report_file, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(REJECT_REPORT_HEADERS)
+        writer.writerows(rejected)
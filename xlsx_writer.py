@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal xlsx writer for summary workbooks written outside of ANSA.
+
+Only text cells are written (the ANSA scripts write every summary value as a string), as shared strings
+so any xlsx reader can open the file. Rows are streamed into the zip file, so large sheets are never
+held in memory as XML, only the table of distinct strings is.
+"""
+
+import zipfile
+from xml.sax.saxutils import escape
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    "{sheets}"
+    "</Types>"
+)
+_CONTENT_TYPE_SHEET = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    "<sheets>{sheets}</sheets></workbook>"
+)
+_WORKBOOK_SHEET = '<sheet name="{name}" sheetId="{n}" r:id="rId{n}"/>'
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rIdSharedStrings" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+    'Target="sharedStrings.xml"/>'
+    "{sheets}</Relationships>"
+)
+_WORKBOOK_RELS_SHEET = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = "</sheetData></worksheet>"
+_SHARED_STRINGS_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'count="{count}" uniqueCount="{count}">'
+)
+_SHARED_STRINGS_END = "</sst>"
+
+
+def column_letter(col):
+    # 0 -> A, 25 -> Z, 26 -> AA
+    letters = ""
+    col += 1
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def row_xml(row_num, values, shared_strings):
+    # row_num starts at 0 like utils.XlsxSetCellValue, None values are left empty
+    # shared_strings: {string: index}, new strings are added
+    cells = []
+    for col, value in enumerate(values):
+        if value is None:
+            continue
+        value = str(value)
+        index = shared_strings.get(value)
+        if index is None:
+            index = shared_strings[value] = len(shared_strings)
+        cells.append(
+            '<c r="%s%d" t="s"><v>%d</v></c>' % (column_letter(col), row_num + 1, index)
+        )
+    return '<row r="%d">%s</row>' % (row_num + 1, "".join(cells))
+
+
+def write_xlsx(path, sheets):
+    # sheets: list of (sheet name, iterable of rows), a row is a list of cell values
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as xlsx:
+        names = []
+        shared_strings = {}
+        for n, (name, rows) in enumerate(sheets, 1):
+            names.append(name)
+            with xlsx.open("xl/worksheets/sheet%d.xml" % n, "w") as sheet:
+                sheet.write(_SHEET_START.encode("utf-8"))
+                for row_num, values in enumerate(rows):
+                    sheet.write(
+                        row_xml(row_num, values, shared_strings).encode("utf-8")
+                    )
+                sheet.write(_SHEET_END.encode("utf-8"))
+        with xlsx.open("xl/sharedStrings.xml", "w") as sst:
+            sst.write(
+                _SHARED_STRINGS_START.format(count=len(shared_strings)).encode("utf-8")
+            )
+            for value in shared_strings:
+                sst.write(
+                    ('<si><t xml:space="preserve">%s</t></si>' % escape(value)).encode(
+                        "utf-8"
+                    )
+                )
+            sst.write(_SHARED_STRINGS_END.encode("utf-8"))
+        numbers = range(1, len(names) + 1)
+        xlsx.writestr(
+            "[Content_Types].xml",
+            _CONTENT_TYPES.format(
+                sheets="".join(_CONTENT_TYPE_SHEET.format(n=n) for n in numbers)
+            ),
+        )
+        xlsx.writestr("_rels/.rels", _ROOT_RELS)
+        xlsx.writestr(
+            "xl/workbook.xml",
+            _WORKBOOK.format(
+                sheets="".join(
+                    _WORKBOOK_SHEET.format(name=escape(name), n=n)
+                    for n, name in zip(numbers, names)
+                )
+            ),
+        )
+        xlsx.writestr(
+            "xl/_rels/workbook.xml.rels",
+            _WORKBOOK_RELS.format(
+                sheets="".join(_WORKBOOK_RELS_SHEET.format(n=n) for n in numbers)
+            ),
+        )